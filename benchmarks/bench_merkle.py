@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark de construcción del árbol de Merkle (coatlicue.merkle)
+
+Mide hojas por segundo y memoria pico de MerkleTree sobre un búfer
+contiguo de digests aleatorios, de 10^4 a 10^7 hojas, con uno o varios
+procesos. El tiempo se mide sin tracemalloc (su rastreo distorsiona la
+velocidad) y la memoria en una segunda construcción.
+
+tracemalloc sólo ve el proceso padre: con varios procesos no cuenta la
+memoria de los trabajadores. Por eso se reporta también el RSS máximo
+(getrusage) del padre más el del mayor trabajador. ru_maxrss es el máximo
+de toda la vida del proceso, así que esa columna nunca baja entre filas;
+para cifras aisladas, medir una configuración por ejecución.
+
+Uso:
+  python benchmarks/bench_merkle.py [--max 7] [--workers 1 4] [--repeticiones 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.merkle import MAX_WORKERS, TAMAÑO_HASH, MerkleTree
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ru_maxrss está en KiB en Linux y en bytes en macOS
+UNIDAD_MAXRSS = 1 if sys.platform == "darwin" else 1024
+
+
+def rss_maximo():
+    """RSS máximo en bytes del proceso más el del mayor hijo ya terminado, o None."""
+    if resource is None:
+        return None
+    return UNIDAD_MAXRSS * (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def medir(digests: bytes, workers: int, repeticiones: int):
+    """
+    Retorna (mejor tiempo en segundos, pico de memoria del padre en bytes,
+    RSS máximo en bytes de padre + trabajadores o None).
+    """
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        arbol = MerkleTree(digests, workers=workers)
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+        del arbol
+
+    tracemalloc.start()
+    arbol = MerkleTree(digests, workers=workers)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del arbol
+    return mejor, pico, rss_maximo()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de MerkleTree")
+    parser.add_argument("--min", type=int, default=4, help="Exponente mínimo (10^min hojas)")
+    parser.add_argument("--max", type=int, default=7, help="Exponente máximo (10^max hojas)")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, MAX_WORKERS}),
+                        help="Números de procesos a comparar")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="Construcciones por medición (se reporta la mejor)")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'hojas':>10} {'procesos':>8} {'segundos':>9} {'hojas/s':>12} "
+          f"{'pico padre MiB':>14} {'bytes/hoja':>10} {'RSS máx MiB':>11}")
+    for exponente in range(args.min, args.max + 1):
+        n = 10 ** exponente
+        # Los digests de entrada no cuentan en el pico: se crean antes de medir
+        digests = os.urandom(n * TAMAÑO_HASH)
+        for workers in args.workers:
+            segundos, pico, rss = medir(digests, workers,
+                                        args.repeticiones if n < 10 ** 6 else 1)
+            rss_mib = "-" if rss is None else f"{rss / 2 ** 20:.1f}"
+            print(f"{n:>10} {workers:>8} {segundos:>9.3f} {n / segundos:>12,.0f} "
+                  f"{pico / 2 ** 20:>14.1f} {pico / n:>10.1f} {rss_mib:>11}")
+        del digests
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,15 @@ Hash Genesis: e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855
 """
 
 import hashlib
-import json
 from datetime import datetime, timezone
+from pathlib import Path
 import sys
 
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.chain import ChainOfCustody
+
 # Hash genesis esperado (SHA-256 de cadena vacía)
 HASH_GENESIS_ESPERADO = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
 
@@ -72,9 +77,9 @@ def inicializar_cadena_custodia():
     return cadena_custodia
 
 def guardar_cadena_custodia(cadena_custodia, ruta_salida):
-    """Guarda la cadena de custodia en formato JSON"""
-    with open(ruta_salida, 'w', encoding='utf-8') as f:
-        json.dump(cadena_custodia, f, indent=2, ensure_ascii=False)
+    """Inicia la bitácora de custodia y exporta el documento JSON"""
+    ChainOfCustody.crear(cadena_custodia["eventos"][0], ruta_salida,
+                         proyecto=cadena_custodia["proyecto"])
     
     print(f"\n✓ Cadena de custodia inicializada:")
     print(f"  {ruta_salida}")
@@ -7,44 +7,53 @@ Este script descarga todos los formatos oficiales del sitio gob.mx,
 calcula hashes SHA-256, y registra todo en la cadena de custodia.
 """
 
-import requests
-import hashlib
+import argparse
 import json
 import os
-import time
+import sys
 from datetime import datetime, timezone
 from pathlib import Path
 from urllib.parse import urlparse
 
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.chain import ChainOfCustody
+from coatlicue.downloads.backends import USER_AGENT, crear_router
+from coatlicue.downloads.discovery import PAGINA_CATALOGO, descubrir_enlaces
+from coatlicue.downloads.engine import ConcurrentDownloader, DownloadTask
+from coatlicue.downloads.manifest import DownloadManifest
+from coatlicue.downloads.snapshots import (
+    DIR_SNAPSHOTS, cargar_snapshot, crear_snapshot, diff_snapshots, ultimo_snapshot
+)
+from coatlicue.downloads.store import ContentStore, MODOS_ENLACE
+from coatlicue.downloads.retry import (
+    CircuitBreaker, RetryPolicy
+)
+from coatlicue.hash_cache import CACHE_HASHES, HashCache
+from coatlicue.hashing import hash_archivo, normalizar_algoritmos
+
 # Configuración
 ENLACES_JSON = "enlaces_descarga.json"
 CADENA_CUSTODIA_JSON = "cadena_custodia.json"
 DIR_DESCARGAS = "formatos_descargados"
-USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
+MANIFIESTO_DESCARGAS_JSON = "manifiesto_descargas.json"
+DIR_PARCIALES = "descargas_parciales"  # Cuarentena de descargas incompletas
+DIR_ALMACEN = "almacen_objetos"  # Almacén direccionado por contenido (SHA-256)
+ALGORITMOS = "sha256"  # Digests por archivo, separados por comas (sha256 siempre incluido)
+MAX_WORKERS = 8
+MAX_POR_HOST = 2
+INTERVALO_HOST = 0.5  # Segundos entre inicios contra el mismo host
+MAX_INTENTOS = 4
+ESPERA_BASE = 1.0  # Segundos antes del primer reintento (crece exponencialmente)
+UMBRAL_CIRCUITO = 5  # Fallos consecutivos que abren el circuito de un host
+ENFRIAMIENTO_CIRCUITO = 30.0  # Segundos antes de probar de nuevo un host
 
 def cargar_enlaces():
     """Carga los enlaces de descarga desde el archivo JSON"""
     with open(ENLACES_JSON, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def cargar_cadena_custodia():
-    """Carga la cadena de custodia existente"""
-    with open(CADENA_CUSTODIA_JSON, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def guardar_cadena_custodia(cadena):
-    """Guarda la cadena de custodia actualizada"""
-    with open(CADENA_CUSTODIA_JSON, 'w', encoding='utf-8') as f:
-        json.dump(cadena, f, indent=2, ensure_ascii=False)
-
-def calcular_hash_archivo(ruta_archivo):
-    """Calcula el hash SHA-256 de un archivo"""
-    sha256_hash = hashlib.sha256()
-    with open(ruta_archivo, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
-
 def obtener_nombre_archivo_limpio(url, texto):
     """Genera un nombre de archivo limpio y descriptivo"""
     # Extraer nombre del archivo de la URL
@@ -64,40 +73,129 @@ def obtener_nombre_archivo_limpio(url, texto):
     
     return nombre_original
 
-def descargar_archivo(url, ruta_destino):
-    """Descarga un archivo desde una URL"""
-    headers = {'User-Agent': USER_AGENT}
+def crear_sesion(max_conexiones=MAX_WORKERS):
+    """Crea una sesión HTTP con un pool de conexiones compartido"""
+    import requests
+    from requests.adapters import HTTPAdapter
     
-    try:
-        response = requests.get(url, headers=headers, timeout=30, stream=True)
-        response.raise_for_status()
-        
-        with open(ruta_destino, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        return True, response.headers.get('content-type', 'unknown')
-    except Exception as e:
-        return False, str(e)
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def descargar_archivo(url, ruta_destino, session=None, manifiesto=None,
+                      dir_parciales=None, backend=None, algoritmos=None):
+    """
+    Descarga un archivo desde una URL.
+    
+    El hash SHA-256 y el tamaño se calculan mientras se escribe el archivo,
+    sin volver a leerlo del disco. En caso de éxito retorna
+    (True, {"content_type", "hash_sha256", "hashes", "tamaño", "etag",
+    "last_modified", "no_modificado", "reanudado_desde"}); si no,
+    (False, DownloadFailure). `algoritmos` agrega digests (p. ej. sha512,
+    sha3_256) calculados en la misma pasada sobre los bytes.
+    
+    Si se proporciona un manifiesto con una entrada para la URL, la petición
+    es condicional y un 304 deja el archivo local intacto.
+    
+    La descarga se escribe en un archivo .part (en `dir_parciales` si se
+    indica) y sólo se renombra al destino cuando está completa. Si un .part
+    previo de la misma URL quedó interrumpido, se pide el resto con Range.
+    
+    El backend (http, file://, espejo local) se elige por el esquema de la
+    URL; ver coatlicue.downloads.backends.
+    """
+    backend = backend or crear_router(session, algoritmos=algoritmos)
+    return backend.fetch(url, ruta_destino, manifiesto, dir_parciales)
+
+def verificar_en_disco(ruta_archivo, hash_esperado, tamaño_esperado, calculado=None):
+    """
+    Relee el archivo del disco y confirma hash y tamaño (modo auditor).
+    `calculado` permite pasar un (hash, tamaño) ya obtenido en paralelo.
+    """
+    hash_disco, tamaño_disco = calculado or hash_archivo(ruta_archivo)
+    
+    if hash_disco != hash_esperado or tamaño_disco != tamaño_esperado:
+        return False, (f"El archivo en disco no coincide con la descarga "
+                       f"(hash {hash_disco}, {tamaño_disco} bytes)")
+    return True, "OK"
 
-def agregar_evento_cadena(cadena, accion, hash_actual, metadata):
-    """Agrega un evento a la cadena de custodia"""
-    ultimo_evento = cadena["eventos"][-1]
-    nuevo_id = ultimo_evento["event_id"] + 1
-    
-    evento = {
-        "event_id": nuevo_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "action": accion,
-        "hash_anterior": ultimo_evento["hash_actual"],
-        "hash_actual": hash_actual,
-        "metadata": metadata
+def registrar_snapshot(cadena, entradas, snapshot_anterior, ruta_anterior, urls_catalogo):
+    """
+    Escribe el snapshot de esta ejecución y agrega un evento SNAPSHOT_DIFF
+    con las diferencias respecto al snapshot anterior.
+    
+    Las URLs del catálogo que fallaron en esta ejecución conservan su
+    entrada anterior (marcada como no verificada) para no reportarlas como
+    eliminadas; las que ya no están en el catálogo sí se reportan.
+    """
+    anterior = snapshot_anterior or {"entradas": []}
+    urls = {e["url"] for e in entradas}
+    arrastradas = [dict(e, verificado=False) for e in anterior["entradas"]
+                   if e["url"] in urls_catalogo and e["url"] not in urls]
+    
+    ruta_snapshot = crear_snapshot(entradas + arrastradas, DIR_SNAPSHOTS)
+    snapshot = cargar_snapshot(ruta_snapshot)
+    diff = diff_snapshots(anterior, snapshot)
+    
+    metadata = {
+        "descripcion": "Diferencias del catálogo respecto al snapshot anterior",
+        "snapshot": ruta_snapshot,
+        "snapshot_anterior": ruta_anterior,
+        "hash_snapshot_anterior": anterior.get("hash_snapshot"),
+        "num_formatos": snapshot["num_entradas"],
+        "agregados": [e["nombre"] for e in diff["agregados"]],
+        "eliminados": [e["nombre"] for e in diff["eliminados"]],
+        "modificados": [e["nombre"] for e in diff["modificados"]],
+        "sin_cambios": diff["sin_cambios"]
     }
+    cadena.agregar("SNAPSHOT_DIFF", snapshot["hash_snapshot"], metadata)
     
-    cadena["eventos"].append(evento)
+    return ruta_snapshot, diff
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(
+        description="Descarga concurrente de formatos oficiales de auditoría"
+    )
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="Descargas simultáneas en total")
+    parser.add_argument("--por-host", type=int, default=MAX_POR_HOST,
+                        help="Descargas simultáneas por host")
+    parser.add_argument("--intervalo-host", type=float, default=None,
+                        help=f"Segundos mínimos entre inicios contra el mismo host "
+                             f"(por defecto {INTERVALO_HOST}; 0 con --espejo)")
+    parser.add_argument("--intentos", type=int, default=MAX_INTENTOS,
+                        help="Intentos máximos por archivo ante fallos transitorios")
+    parser.add_argument("--espera-base", type=float, default=ESPERA_BASE,
+                        help="Segundos antes del primer reintento")
+    parser.add_argument("--algoritmos", default=ALGORITMOS,
+                        help="Digests a calcular en una sola lectura, separados por comas "
+                             "(p. ej. sha256,sha512,sha3_256)")
+    parser.add_argument("--verificar-disco", action="store_true",
+                        help="Releer cada archivo del disco y confirmar su hash")
+    parser.add_argument("--paranoid", action="store_true",
+                        help=f"Con --verificar-disco, ignorar {CACHE_HASHES} y releer todo")
+    parser.add_argument("--almacen", action="store_true",
+                        help=f"Guardar los archivos en {DIR_ALMACEN}/ por SHA-256 y "
+                             f"dejar {DIR_DESCARGAS}/ como vista de enlaces")
+    parser.add_argument("--modo-enlace", choices=MODOS_ENLACE, default="hardlink",
+                        help="Tipo de enlace de la vista cuando se usa --almacen")
+    parser.add_argument("--espejo", metavar="DIR",
+                        help="Servir las URLs http(s) desde un espejo local DIR/<host>/<ruta> "
+                             "en lugar de la red")
+    parser.add_argument("--descubrir", action="store_true",
+                        help=f"Regenerar {ENLACES_JSON} desde la página del catálogo antes de descargar")
+    parser.add_argument("--completo", action="store_true",
+                        help="Ignorar el manifiesto y descargar todos los archivos")
+    args = parser.parse_args()
+    try:
+        algoritmos = normalizar_algoritmos(args.algoritmos.split(","))
+    except ValueError as e:
+        parser.error(str(e))
+    
     print("\n" + "=" * 80)
     print("DESCARGA DE FORMATOS OFICIALES DE AUDITORÍA")
     print("Fuente: gob.mx - Secretaría Anticorrupción y Buen Gobierno")
@@ -106,72 +204,189 @@ def main():
     # Crear directorio de descargas
     Path(DIR_DESCARGAS).mkdir(exist_ok=True)
     
+    # Actualizar la lista de enlaces desde el catálogo (sólo si cambió)
+    if args.descubrir:
+        resumen = descubrir_enlaces([PAGINA_CATALOGO], ENLACES_JSON)
+        estado = "actualizado" if resumen["cambiado"] else "sin cambios"
+        print(f"\nDescubrimiento: {resumen['num_enlaces']} enlaces, {ENLACES_JSON} {estado} "
+              f"(+{len(resumen['agregados'])} -{len(resumen['eliminados'])})")
+    
     # Cargar enlaces y cadena de custodia
     enlaces = cargar_enlaces()
-    cadena = cargar_cadena_custodia()
+    cadena = ChainOfCustody(CADENA_CUSTODIA_JSON)
+    verificacion = cadena.verificar()
+    if not verificacion.valida:
+        print(f"\n✗ {verificacion}")
+        sys.exit(1)
+    print(f"✓ {verificacion}")
+    manifiesto = DownloadManifest(MANIFIESTO_DESCARGAS_JSON)
+    almacen = ContentStore(DIR_ALMACEN) if args.almacen else None
+    ruta_snapshot_anterior = ultimo_snapshot(DIR_SNAPSHOTS)
+    snapshot_anterior = cargar_snapshot(ruta_snapshot_anterior) if ruta_snapshot_anterior else None
     
     print(f"\nTotal de archivos a descargar: {len(enlaces)}")
     print(f"Directorio de destino: {DIR_DESCARGAS}/")
+    print(f"Trabajadores: {args.workers} (máx. {args.por_host} por host)")
+    print(f"Algoritmos: {', '.join(algoritmos)}")
+    if args.espejo:
+        print(f"Origen: espejo local {args.espejo}/")
     print()
     
+    # Preparar tareas en el orden del catálogo
+    tareas = []
+    for item in enlaces:
+        nombre_archivo = obtener_nombre_archivo_limpio(item['url'], item['text'])
+        tareas.append(DownloadTask(
+            url=item['url'],
+            destino=os.path.join(DIR_DESCARGAS, nombre_archivo),
+            descripcion=item['text'],
+            nombre_archivo=nombre_archivo
+        ))
+    
+    # Descargar en paralelo: por red con un pool de conexiones compartido,
+    # o desde el espejo local a velocidad de disco
+    intervalo_host = args.intervalo_host
+    if intervalo_host is None:
+        intervalo_host = 0.0 if args.espejo else INTERVALO_HOST
+    backend = crear_router(None if args.espejo else crear_sesion(args.workers), args.espejo,
+                           algoritmos)
+    downloader = ConcurrentDownloader(
+        lambda url, destino: descargar_archivo(
+            url, destino, manifiesto=None if args.completo else manifiesto,
+            dir_parciales=DIR_PARCIALES, backend=backend),
+        max_workers=args.workers,
+        max_por_host=args.por_host,
+        intervalo_host=intervalo_host,
+        politica=RetryPolicy(max_intentos=args.intentos, espera_base=args.espera_base),
+        crear_circuito=lambda: CircuitBreaker(UMBRAL_CIRCUITO, ENFRIAMIENTO_CIRCUITO)
+    )
+    try:
+        resultados = downloader.run(tareas)
+    finally:
+        backend.close()
+    
     # Estadísticas
     exitosos = 0
+    sin_cambios = 0
     fallidos = 0
+    objetos_nuevos = 0
     hashes_archivos = []
+    entradas_snapshot = []
     
-    # Descargar cada archivo
-    for i, item in enumerate(enlaces, 1):
-        url = item['url']
-        texto = item['text']
-        
-        # Generar nombre de archivo
-        nombre_archivo = obtener_nombre_archivo_limpio(url, texto)
-        ruta_destino = os.path.join(DIR_DESCARGAS, nombre_archivo)
+    # Modo auditor: releer en paralelo los archivos descargados; los que no
+    # cambiaron desde la última verificación salen de la caché de hashes
+    en_disco = {}
+    if args.verificar_disco:
+        with HashCache(CACHE_HASHES) as cache:
+            for r in cache.hash_archivos([res.task.destino for res in resultados if res.exito],
+                                         paranoid=args.paranoid):
+                if r.error is None:
+                    en_disco[r.ruta] = (r.hash, r.tamaño)
+    
+    # Registrar resultados en el orden del catálogo (cadena reproducible)
+    for i, resultado in enumerate(resultados, 1):
+        tarea = resultado.task
+        nombre_archivo = tarea.nombre_archivo
+        ruta_destino = tarea.destino
         
-        print(f"[{i}/{len(enlaces)}] Descargando: {nombre_archivo}")
-        print(f"  URL: {url}")
+        print(f"[{i}/{len(resultados)}] {nombre_archivo}")
+        print(f"  URL: {tarea.url}")
+        if resultado.intentos > 1:
+            print(f"  Intentos: {resultado.intentos} "
+                  f"(latencias: {', '.join(f'{l:.2f}s' for l in resultado.latencias)})")
         
-        # Descargar archivo
-        exito, info = descargar_archivo(url, ruta_destino)
+        if resultado.exito and args.verificar_disco:
+            verificado, mensaje = verificar_en_disco(
+                ruta_destino, resultado.info["hash_sha256"], resultado.info["tamaño"],
+                en_disco.get(ruta_destino))
+            if not verificado:
+                print(f"  ✗ Error de verificación: {mensaje}")
+                fallidos += 1
+                print()
+                continue
         
-        if exito:
-            # Calcular hash
-            hash_archivo = calcular_hash_archivo(ruta_destino)
-            tamaño = os.path.getsize(ruta_destino)
+        if resultado.exito:
+            # Hash y tamaño calculados durante la descarga
+            datos = resultado.info
+            hash_archivo = datos["hash_sha256"]
+            tamaño = datos["tamaño"]
             
-            print(f"  ✓ Descargado: {tamaño:,} bytes")
-            print(f"  Hash SHA-256: {hash_archivo}")
+            if datos["no_modificado"]:
+                # 304: el archivo local sigue vigente, evento ligero
+                print(f"  = Sin cambios (304): {tamaño:,} bytes")
+                print(f"  Hash SHA-256: {hash_archivo}")
+                
+                metadata = {
+                    "url": tarea.url,
+                    "nombre_archivo": nombre_archivo,
+                    "hash_sha256": hash_archivo,
+                    "hashes": datos["hashes"],
+                    "etag": datos["etag"],
+                    "last_modified": datos["last_modified"]
+                }
+                cadena.agregar("VERIFIED_UNCHANGED", hash_archivo, metadata)
+                manifiesto.marcar_verificado(tarea.url, datos["hashes"])
+                sin_cambios += 1
+            else:
+                print(f"  ✓ Descargado: {tamaño:,} bytes ({resultado.segundos:.2f} s)")
+                if datos["reanudado_desde"]:
+                    print(f"  Reanudado desde el byte {datos['reanudado_desde']:,}")
+                print(f"  Hash SHA-256: {hash_archivo}")
+                
+                # Registrar en cadena de custodia
+                metadata = {
+                    "descripcion": tarea.descripcion,
+                    "url": tarea.url,
+                    "nombre_archivo": nombre_archivo,
+                    "tamaño_bytes": tamaño,
+                    "content_type": datos["content_type"],
+                    "hash_sha256": hash_archivo,
+                    "hashes": datos["hashes"]
+                }
+                cadena.agregar("DOWNLOAD_FILE", hash_archivo, metadata)
+                manifiesto.actualizar(tarea.url, nombre_archivo, hash_archivo, tamaño,
+                                      datos["etag"], datos["last_modified"], datos["hashes"])
+                exitosos += 1
             
-            # Registrar en cadena de custodia
-            metadata = {
-                "descripcion": texto,
-                "url": url,
-                "nombre_archivo": nombre_archivo,
-                "tamaño_bytes": tamaño,
-                "content_type": info,
-                "hash_sha256": hash_archivo
-            }
+            for algoritmo, digest in datos["hashes"].items():
+                if algoritmo != "sha256":
+                    print(f"  Hash {algoritmo.upper().replace('_', '-')}: {digest}")
             
-            agregar_evento_cadena(cadena, "DOWNLOAD_FILE", hash_archivo, metadata)
+            if almacen is not None:
+                # Mover los bytes al almacén y dejar la vista como enlace
+                _, nuevo = almacen.ingresar(ruta_destino, hash_archivo)
+                modo = almacen.enlazar(hash_archivo, ruta_destino, args.modo_enlace)
+                objetos_nuevos += int(nuevo)
+                print(f"  Almacén: {'objeto nuevo' if nuevo else 'deduplicado'} ({modo})")
             
             hashes_archivos.append({
                 "nombre": nombre_archivo,
                 "hash": hash_archivo,
+                "hashes": datos["hashes"],
                 "tamaño": tamaño
             })
-            
-            exitosos += 1
+            entradas_snapshot.append({
+                "url": tarea.url,
+                "nombre": nombre_archivo,
+                "hash_sha256": hash_archivo,
+                "tamaño": tamaño,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "verificado": True
+            })
         else:
-            print(f"  ✗ Error: {info}")
+            print(f"  ✗ Error: {resultado.info}")
             fallidos += 1
         
         print()
-        
-        # Pequeña pausa para no sobrecargar el servidor
-        time.sleep(0.5)
     
-    # Guardar cadena de custodia actualizada
-    guardar_cadena_custodia(cadena)
+    # Registrar snapshot inmutable del catálogo y sus diferencias
+    ruta_snapshot, diff = registrar_snapshot(
+        cadena, entradas_snapshot, snapshot_anterior, ruta_snapshot_anterior,
+        {item['url'] for item in enlaces})
+    
+    # Confirmar los eventos de esta ejecución (un solo fsync)
+    cadena.commit()
+    manifiesto.guardar()
     
     # Guardar lista de hashes
     with open("hashes_archivos.json", 'w', encoding='utf-8') as f:
@@ -182,11 +397,18 @@ def main():
     print("RESUMEN DE DESCARGA")
     print("=" * 80)
     print(f"Archivos descargados exitosamente: {exitosos}")
+    print(f"Archivos sin cambios (304): {sin_cambios}")
     print(f"Archivos con error: {fallidos}")
-    print(f"Total de eventos en cadena de custodia: {len(cadena['eventos'])}")
+    if almacen is not None:
+        print(f"Objetos nuevos en el almacén: {objetos_nuevos} "
+              f"({almacen.tamaño_total():,} bytes en {DIR_ALMACEN}/)")
+    print(f"Total de eventos en cadena de custodia: {cadena.num_eventos}")
     print(f"\nArchivos guardados en: {DIR_DESCARGAS}/")
     print(f"Hashes guardados en: hashes_archivos.json")
     print(f"Cadena de custodia: {CADENA_CUSTODIA_JSON}")
+    print(f"Manifiesto de descargas: {MANIFIESTO_DESCARGAS_JSON}")
+    print(f"Snapshot: {ruta_snapshot} (+{len(diff['agregados'])} "
+          f"-{len(diff['eliminados'])} ~{len(diff['modificados'])})")
     print()
     print("Próximo paso: Ejecutar 03_blockchain_anchoring.py")
     print()
@@ -6,46 +6,35 @@ Parte del Sistema de Auditoría Gubernamental con Validez Legal
 Este script ancla los hashes de todos los archivos descargados en la
 blockchain de Bitcoin usando OpenTimestamps, proporcionando fecha cierta
 inmutable y verificable independientemente.
+
+Por defecto sella una sola vez la raíz del Merkle tree y deriva el .ots de
+cada archivo anteponiendo su ruta Merkle a la prueba de la raíz: un solo
+`ots stamp` sin importar el tamaño del catálogo. Con --por-archivo se
+sella cada archivo por separado, como antes.
 """
 
+import argparse
 import json
 import os
 import subprocess
-import hashlib
 from datetime import datetime, timezone
 from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue import merkle, mmr, ots
+from coatlicue.custody.chain import ChainOfCustody
 
 # Configuración
 DIR_DESCARGAS = "formatos_descargados"
 DIR_BLOCKCHAIN = "blockchain_proofs"
 CADENA_CUSTODIA_JSON = "cadena_custodia.json"
 HASHES_JSON = "hashes_archivos.json"
-
-def cargar_cadena_custodia():
-    """Carga la cadena de custodia existente"""
-    with open(CADENA_CUSTODIA_JSON, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def guardar_cadena_custodia(cadena):
-    """Guarda la cadena de custodia actualizada"""
-    with open(CADENA_CUSTODIA_JSON, 'w', encoding='utf-8') as f:
-        json.dump(cadena, f, indent=2, ensure_ascii=False)
-
-def agregar_evento_cadena(cadena, accion, hash_actual, metadata):
-    """Agrega un evento a la cadena de custodia"""
-    ultimo_evento = cadena["eventos"][-1]
-    nuevo_id = ultimo_evento["event_id"] + 1
-    
-    evento = {
-        "event_id": nuevo_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "action": accion,
-        "hash_anterior": ultimo_evento["hash_actual"],
-        "hash_actual": hash_actual,
-        "metadata": metadata
-    }
-    
-    cadena["eventos"].append(evento)
+MERKLE_TREE_JSON = "merkle_tree.json"
+MERKLE_PROOFS_JSON = "merkle_proofs.json"
+DIR_MMR = "merkle_mmr"
 
 def verificar_opentimestamps():
     """Verifica si OpenTimestamps está instalado"""
@@ -88,54 +77,15 @@ def crear_timestamp(ruta_archivo):
     except Exception as e:
         return False, str(e)
 
-def crear_merkle_tree(hashes):
-    """Crea un Merkle tree simple de todos los hashes"""
-    if not hashes:
-        return None
-    
-    # Ordenar hashes para consistencia
-    hashes_ordenados = sorted(hashes)
-    
-    # Concatenar todos los hashes y calcular hash raíz
-    concatenado = "".join(hashes_ordenados).encode('utf-8')
-    hash_raiz = hashlib.sha256(concatenado).hexdigest()
-    
-    return {
-        "hash_raiz": hash_raiz,
-        "num_hojas": len(hashes),
-        "hashes_hojas": hashes_ordenados
-    }
+def crear_merkle_tree(hashes_archivos):
+    """
+    Crea el Merkle tree binario (RFC 6962) de los hashes y la prueba de
+    inclusión de cada archivo
+    """
+    return merkle.construir(hashes_archivos)
 
-def main():
-    """Función principal"""
-    print("\n" + "=" * 80)
-    print("ANCLAJE EN BLOCKCHAIN BITCOIN")
-    print("Usando OpenTimestamps para fecha cierta inmutable")
-    print("=" * 80)
-    
-    # Crear directorio para pruebas blockchain
-    Path(DIR_BLOCKCHAIN).mkdir(exist_ok=True)
-    
-    # Verificar/instalar OpenTimestamps
-    if not verificar_opentimestamps():
-        print("\nOpenTimestamps no está instalado.")
-        if not instalar_opentimestamps():
-            print("\n✗ No se pudo instalar OpenTimestamps")
-            print("Instalación manual: sudo pip3 install opentimestamps-client")
-            return
-    else:
-        print("\n✓ OpenTimestamps está instalado")
-    
-    # Cargar datos
-    cadena = cargar_cadena_custodia()
-    
-    with open(HASHES_JSON, 'r', encoding='utf-8') as f:
-        hashes_archivos = json.load(f)
-    
-    print(f"\nTotal de archivos a anclar: {len(hashes_archivos)}")
-    print()
-    
-    # Crear timestamps para cada archivo
+def anclar_por_archivo(hashes_archivos):
+    """Un `ots stamp` por archivo; retorna (exitosos, fallidos, archivos_ots)"""
     exitosos = 0
     fallidos = 0
     archivos_ots = []
@@ -182,28 +132,174 @@ def main():
         
         print()
     
-    # Crear Merkle tree de todos los hashes
+    return exitosos, fallidos, archivos_ots
+
+def sellar_raiz_merkle(hash_raiz):
+    """
+    Sella la raíz Merkle con un solo `ots stamp` sobre un archivo con sus
+    32 bytes. Retorna (prueba .ots de la raíz o None, mensaje)
+    """
+    ruta_raiz = os.path.join(DIR_BLOCKCHAIN, ots.RAIZ_MERKLE_BIN)
+    ruta_ots = f"{ruta_raiz}.ots"
+    with open(ruta_raiz, 'wb') as f:
+        f.write(bytes.fromhex(hash_raiz))
+    # ots stamp no sobrescribe una prueba existente
+    if os.path.exists(ruta_ots):
+        os.remove(ruta_ots)
+    
+    exito, mensaje = crear_timestamp(ruta_raiz)
+    if not exito:
+        return None, mensaje
+    if not os.path.exists(ruta_ots):
+        return None, "Timestamp creado pero archivo .ots no encontrado"
+    return ots.cargar_ots(ruta_ots), mensaje
+
+def anclar_lote(hashes_archivos, resultado_merkle):
+    """
+    Un solo `ots stamp` de la raíz Merkle y un .ots derivado por archivo;
+    retorna (exitosos, fallidos, archivos_ots)
+    """
+    hash_raiz = resultado_merkle["arbol"]["hash_raiz"]
+    print(f"Anclando la raíz Merkle: {hash_raiz}")
+    ots_raiz, mensaje = sellar_raiz_merkle(hash_raiz)
+    if ots_raiz is None:
+        print(f"  ✗ Error: {mensaje}")
+        return 0, len(hashes_archivos), []
+    print(f"  ✓ Timestamp de la raíz creado: {ots.RAIZ_MERKLE_BIN}.ots")
+    print()
+    
+    exitosos = 0
+    fallidos = 0
+    archivos_ots = []
+    pruebas = resultado_merkle["pruebas"]["pruebas"]
+    
+    for i, item in enumerate(hashes_archivos, 1):
+        nombre = item['nombre']
+        ruta_archivo = os.path.join(DIR_DESCARGAS, nombre)
+        
+        if not os.path.exists(ruta_archivo):
+            print(f"[{i}/{len(hashes_archivos)}] ✗ Archivo no encontrado: {ruta_archivo}")
+            fallidos += 1
+            continue
+        
+        prueba = pruebas[nombre]
+        archivo_ots = ots.derivar_ots(item['hash'], prueba['ruta'], ots_raiz)
+        ots.guardar_ots(os.path.join(DIR_BLOCKCHAIN, f"{nombre}.ots"), archivo_ots)
+        print(f"[{i}/{len(hashes_archivos)}] ✓ {nombre}.ots "
+              f"({len(prueba['ruta'])} hashes de ruta Merkle)")
+        
+        archivos_ots.append({
+            "nombre": nombre,
+            "hash": item['hash'],
+            "ots_file": f"{nombre}.ots"
+        })
+        exitosos += 1
+    
+    print()
+    print("Nota: La confirmación en blockchain puede tardar 10-60 minutos")
+    return exitosos, fallidos, archivos_ots
+
+def actualizar_acumulador(hashes_archivos):
+    """
+    Anexa los hashes nuevos al acumulador Merkle persistente y registra su
+    raíz, con la prueba de consistencia respecto de la raíz anterior.
+    Retorna (registro de la raíz, hojas nuevas, ruta de la prueba o None)
+    """
+    acumulador = mmr.MerkleMountainRange(DIR_MMR)
+    historial = acumulador.historial()
+    nuevas = mmr.agregar_hashes(acumulador, hashes_archivos)
+    if historial and not nuevas:
+        return historial[-1], 0, None
+    
+    registro = acumulador.registrar_raiz()
+    ruta_prueba = None
+    if historial:
+        m, n = historial[-1]['num_hojas'], registro['num_hojas']
+        ruta_prueba = os.path.join(DIR_MMR, f"consistencia_{m:08d}_{n:08d}.json")
+        with open(ruta_prueba, 'w', encoding='utf-8') as f:
+            json.dump(mmr.documento_consistencia(acumulador, m, n), f,
+                      indent=2, ensure_ascii=False)
+    return registro, nuevas, ruta_prueba
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(
+        description="Anclaje de los hashes de archivos en Bitcoin con OpenTimestamps"
+    )
+    parser.add_argument("--por-archivo", action="store_true",
+                        help="Un `ots stamp` por archivo en lugar de sellar sólo la raíz Merkle")
+    args = parser.parse_args()
+    
+    print("\n" + "=" * 80)
+    print("ANCLAJE EN BLOCKCHAIN BITCOIN")
+    print("Usando OpenTimestamps para fecha cierta inmutable")
+    print("=" * 80)
+    
+    # Crear directorio para pruebas blockchain
+    Path(DIR_BLOCKCHAIN).mkdir(exist_ok=True)
+    
+    # Verificar/instalar OpenTimestamps
+    if not verificar_opentimestamps():
+        print("\nOpenTimestamps no está instalado.")
+        if not instalar_opentimestamps():
+            print("\n✗ No se pudo instalar OpenTimestamps")
+            print("Instalación manual: sudo pip3 install opentimestamps-client")
+            return
+    else:
+        print("\n✓ OpenTimestamps está instalado")
+    
+    # Cargar datos
+    cadena = ChainOfCustody(CADENA_CUSTODIA_JSON)
+    
+    with open(HASHES_JSON, 'r', encoding='utf-8') as f:
+        hashes_archivos = json.load(f)
+    
+    print(f"\nTotal de archivos a anclar: {len(hashes_archivos)}")
+    print()
+    
+    # Crear Merkle tree de todos los hashes (el modo por lotes sella su raíz)
     print("Creando Merkle tree de todos los hashes...")
-    hashes_lista = [item['hash'] for item in hashes_archivos]
-    merkle_tree = crear_merkle_tree(hashes_lista)
+    resultado_merkle = crear_merkle_tree(hashes_archivos)
+    merkle_tree = resultado_merkle["arbol"] if resultado_merkle else None
     
     if merkle_tree:
         print(f"✓ Merkle tree creado")
         print(f"  Hash raíz: {merkle_tree['hash_raiz']}")
         print(f"  Número de hojas: {merkle_tree['num_hojas']}")
+        print()
         
-        # Guardar Merkle tree
-        with open("merkle_tree.json", 'w', encoding='utf-8') as f:
+        # Guardar Merkle tree y pruebas de inclusión por archivo
+        with open(MERKLE_TREE_JSON, 'w', encoding='utf-8') as f:
             json.dump(merkle_tree, f, indent=2, ensure_ascii=False)
+        with open(MERKLE_PROOFS_JSON, 'w', encoding='utf-8') as f:
+            json.dump(resultado_merkle["pruebas"], f, indent=2, ensure_ascii=False)
+        
+        # Acumulador de solo-anexado: la raíz anterior es prefijo de la nueva
+        registro_mmr, nuevas, ruta_prueba = actualizar_acumulador(hashes_archivos)
+        print(f"✓ Acumulador Merkle actualizado ({nuevas} hojas nuevas)")
+        print(f"  Raíz acumulada: {registro_mmr['raiz']}")
+        print(f"  Hojas acumuladas: {registro_mmr['num_hojas']}")
+        if ruta_prueba:
+            print(f"  Prueba de consistencia: {ruta_prueba}")
+        print()
         
         # Registrar en cadena de custodia
         metadata = {
             "descripcion": "Creación de Merkle tree de todos los hashes",
             "hash_raiz": merkle_tree['hash_raiz'],
-            "num_archivos": merkle_tree['num_hojas']
+            "num_archivos": merkle_tree['num_hojas'],
+            "esquema": merkle_tree['esquema'],
+            "mmr_raiz": registro_mmr['raiz'],
+            "mmr_num_hojas": registro_mmr['num_hojas']
         }
-        agregar_evento_cadena(cadena, "CREATE_MERKLE_TREE", 
-                            merkle_tree['hash_raiz'], metadata)
+        cadena.agregar("CREATE_MERKLE_TREE", merkle_tree['hash_raiz'], metadata)
+    
+    # Crear timestamps
+    por_archivo = args.por_archivo or not merkle_tree
+    if por_archivo:
+        exitosos, fallidos, archivos_ots = anclar_por_archivo(hashes_archivos)
+    else:
+        exitosos, fallidos, archivos_ots = anclar_lote(hashes_archivos, resultado_merkle)
     
     # Guardar lista de archivos .ots
     with open("blockchain_timestamps.json", 'w', encoding='utf-8') as f:
@@ -215,14 +311,17 @@ def main():
         "archivos_anclados": exitosos,
         "archivos_fallidos": fallidos,
         "protocolo": "OpenTimestamps",
-        "blockchain": "Bitcoin"
+        "blockchain": "Bitcoin",
+        "modo": "por_archivo" if por_archivo else "raiz_merkle"
     }
-    agregar_evento_cadena(cadena, "BLOCKCHAIN_ANCHORING", 
-                        merkle_tree['hash_raiz'] if merkle_tree else "N/A", 
-                        metadata)
+    if not por_archivo:
+        metadata["ots_raiz"] = f"{ots.RAIZ_MERKLE_BIN}.ots"
+    cadena.agregar("BLOCKCHAIN_ANCHORING",
+                   merkle_tree['hash_raiz'] if merkle_tree else "N/A",
+                   metadata)
     
-    # Guardar cadena de custodia
-    guardar_cadena_custodia(cadena)
+    # Confirmar eventos en la cadena de custodia
+    cadena.commit()
     
     # Resumen
     print("\n" + "=" * 80)
@@ -231,14 +330,25 @@ def main():
     print(f"Archivos anclados exitosamente: {exitosos}")
     print(f"Archivos con error: {fallidos}")
     print(f"Archivos .ots generados: {len(archivos_ots)}")
+    if not por_archivo:
+        print(f"Sellos enviados a calendarios: 1 (raíz Merkle)")
     print(f"\nPruebas blockchain guardadas en: {DIR_BLOCKCHAIN}/")
-    print(f"Merkle tree guardado en: merkle_tree.json")
+    print(f"Merkle tree guardado en: {MERKLE_TREE_JSON}")
+    print(f"Pruebas de inclusión por archivo: {MERKLE_PROOFS_JSON}")
+    print(f"Acumulador Merkle y raíces históricas: {DIR_MMR}/")
     print(f"Lista de timestamps: blockchain_timestamps.json")
     print()
     print("IMPORTANTE:")
     print("- Los timestamps pueden tardar 10-60 minutos en confirmarse en blockchain")
     print("- Puedes verificar los timestamps con: ots verify <archivo>.ots")
     print("- Puedes actualizar los timestamps con: ots upgrade <archivo>.ots")
+    if not por_archivo:
+        print(f"  (o actualizar sólo {ots.RAIZ_MERKLE_BIN}.ots y volver a derivar con:")
+        print(f"   python -m coatlicue.ots derivar)")
+    print("- Puedes verificar la inclusión de un archivo en la raíz con:")
+    print(f"  python -m coatlicue.merkle verificar {DIR_DESCARGAS}/<archivo> --pruebas {MERKLE_PROOFS_JSON}")
+    print("- Puedes auditar que las raíces históricas sólo crecieron con:")
+    print(f"  python -m coatlicue.mmr auditar --dir {DIR_MMR}")
     print()
     print("Próximo paso: Ejecutar 04_nom151_certification.py")
     print()
@@ -11,6 +11,12 @@ import json
 import os
 from datetime import datetime, timezone
 from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.chain import ChainOfCustody
 
 # Configuración
 CADENA_CUSTODIA_JSON = "cadena_custodia.json"
@@ -305,28 +311,13 @@ def main():
     print(f"  Hash de la constancia: {hash_constancia}")
     
     # Actualizar cadena de custodia
-    cadena = cargar_json(CADENA_CUSTODIA_JSON)
-    
-    ultimo_evento = cadena["eventos"][-1]
-    nuevo_id = ultimo_evento["event_id"] + 1
-    
-    evento = {
-        "event_id": nuevo_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "action": "GENERATE_NOM151_CERTIFICATE",
-        "hash_anterior": ultimo_evento["hash_actual"],
-        "hash_actual": hash_constancia,
-        "metadata": {
-            "descripcion": "Generación de constancia de conservación NOM-151",
-            "archivo": CONSTANCIA_NOM151_MD,
-            "cumplimiento": "NOM-151-SCFI-2016"
-        }
-    }
-    
-    cadena["eventos"].append(evento)
-    
-    with open(CADENA_CUSTODIA_JSON, 'w', encoding='utf-8') as f:
-        json.dump(cadena, f, indent=2, ensure_ascii=False)
+    cadena = ChainOfCustody(CADENA_CUSTODIA_JSON)
+    cadena.agregar("GENERATE_NOM151_CERTIFICATE", hash_constancia, {
+        "descripcion": "Generación de constancia de conservación NOM-151",
+        "archivo": CONSTANCIA_NOM151_MD,
+        "cumplimiento": "NOM-151-SCFI-2016"
+    })
+    cadena.commit()
     
     print(f"✓ Cadena de custodia actualizada")
     
@@ -13,6 +13,12 @@ import json
 import os
 from datetime import datetime, timezone
 from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.chain import ChainOfCustody
 
 # Configuración
 DRIVE_REMOTE = "manus_google_drive:EVIDENCIA_PARA_NOTARIA/FORMATOS_OFICIALES_AUDITORIA"
@@ -26,32 +32,6 @@ DIRECTORIOS_SYNC = {
     ".": "03_certificaciones"  # Archivos raíz (constancia, hashes, etc.)
 }
 
-def cargar_cadena_custodia():
-    """Carga la cadena de custodia existente"""
-    with open(CADENA_CUSTODIA_JSON, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def guardar_cadena_custodia(cadena):
-    """Guarda la cadena de custodia actualizada"""
-    with open(CADENA_CUSTODIA_JSON, 'w', encoding='utf-8') as f:
-        json.dump(cadena, f, indent=2, ensure_ascii=False)
-
-def agregar_evento_cadena(cadena, accion, hash_actual, metadata):
-    """Agrega un evento a la cadena de custodia"""
-    ultimo_evento = cadena["eventos"][-1]
-    nuevo_id = ultimo_evento["event_id"] + 1
-    
-    evento = {
-        "event_id": nuevo_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "action": accion,
-        "hash_anterior": ultimo_evento["hash_actual"],
-        "hash_actual": hash_actual,
-        "metadata": metadata
-    }
-    
-    cadena["eventos"].append(evento)
-
 def ejecutar_rclone(comando):
     """Ejecuta un comando rclone"""
     cmd_completo = comando + [f"--config={RCLONE_CONFIG}"]
@@ -80,8 +60,10 @@ def sincronizar_directorio(origen, destino_remoto):
         # Para archivos raíz, copiar archivos específicos
         archivos_raiz = [
             "cadena_custodia.json",
+            "cadena_custodia.jsonl",
             "hashes_archivos.json",
             "merkle_tree.json",
+            "merkle_proofs.json",
             "blockchain_timestamps.json",
             "constancia_nom151.md"
         ]
@@ -148,7 +130,7 @@ def main():
     print("=" * 80)
     
     # Cargar cadena de custodia
-    cadena = cargar_cadena_custodia()
+    cadena = ChainOfCustody(CADENA_CUSTODIA_JSON)
     
     # Sincronizar cada directorio
     print("\nIniciando sincronización con Google Drive...")
@@ -183,8 +165,8 @@ def main():
         "enlaces_generados": len(enlaces)
     }
     
-    agregar_evento_cadena(cadena, "SYNC_GOOGLE_DRIVE", hash_sync, metadata)
-    guardar_cadena_custodia(cadena)
+    cadena.agregar("SYNC_GOOGLE_DRIVE", hash_sync, metadata)
+    cadena.commit()
     
     # Resumen
     print("\n" + "=" * 80)
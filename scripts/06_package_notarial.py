@@ -13,6 +13,12 @@ import hashlib
 import subprocess
 from datetime import datetime, timezone
 from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.chain import ChainOfCustody
 
 # Configuración
 CADENA_CUSTODIA_JSON = "cadena_custodia.json"
@@ -351,6 +357,7 @@ def main():
         "cadena_custodia.json",
         "hashes_archivos.json",
         "merkle_tree.json",
+        "merkle_proofs.json",
         "blockchain_timestamps.json",
         "constancia_nom151.md"
     ]
@@ -376,8 +383,9 @@ Este paquete contiene toda la documentación necesaria para la certificación no
 4. **cadena_custodia.json**: Cadena de custodia completa
 5. **hashes_archivos.json**: Hashes SHA-256 de todos los archivos
 6. **merkle_tree.json**: Merkle tree de los hashes
-7. **blockchain_timestamps.json**: Lista de timestamps blockchain
-8. **constancia_nom151.md**: Constancia de conservación NOM-151
+7. **merkle_proofs.json**: Prueba de inclusión de cada archivo en la raíz Merkle
+8. **blockchain_timestamps.json**: Lista de timestamps blockchain
+9. **constancia_nom151.md**: Constancia de conservación NOM-151
 
 ## Instrucciones
 
@@ -402,32 +410,16 @@ Repositorio: https://github.com/agentesecreto0007/coatlicue
     print(f"\n✓ README.md")
     
     # Actualizar cadena de custodia
-    cadena = cargar_json(CADENA_CUSTODIA_JSON)
-    
-    import hashlib
     hash_paquete = hashlib.sha256(str(documentos).encode('utf-8')).hexdigest()
     
-    ultimo_evento = cadena["eventos"][-1]
-    nuevo_id = ultimo_evento["event_id"] + 1
-    
-    evento = {
-        "event_id": nuevo_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "action": "GENERATE_NOTARIAL_PACKAGE",
-        "hash_anterior": ultimo_evento["hash_actual"],
-        "hash_actual": hash_paquete,
-        "metadata": {
-            "descripcion": "Generación de paquete notarial completo",
-            "directorio": DIR_PAQUETE,
-            "documentos_generados": len(documentos),
-            "destino": "Notaría 230 CDMX"
-        }
-    }
-    
-    cadena["eventos"].append(evento)
-    
-    with open(CADENA_CUSTODIA_JSON, 'w', encoding='utf-8') as f:
-        json.dump(cadena, f, indent=2, ensure_ascii=False)
+    cadena = ChainOfCustody(CADENA_CUSTODIA_JSON)
+    cadena.agregar("GENERATE_NOTARIAL_PACKAGE", hash_paquete, {
+        "descripcion": "Generación de paquete notarial completo",
+        "directorio": DIR_PAQUETE,
+        "documentos_generados": len(documentos),
+        "destino": "Notaría 230 CDMX"
+    })
+    cadena.commit()
     
     # Resumen
     print("\n" + "=" * 80)
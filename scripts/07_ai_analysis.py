@@ -11,6 +11,12 @@ import json
 import os
 from datetime import datetime, timezone
 from pathlib import Path
+import sys
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.chain import ChainOfCustody
 
 # Configuration
 CADENA_CUSTODIA_JSON = "cadena_custodia.json"
@@ -335,31 +341,18 @@ def main():
     print(f"✓ Report generated: {AI_REPORT_MD}")
     
     # Update chain of custody
-    cadena = cargar_json(CADENA_CUSTODIA_JSON)
-    
     import hashlib
     hash_analisis = hashlib.sha256(json.dumps(resultados).encode('utf-8')).hexdigest()
     
-    ultimo_evento = cadena["eventos"][-1]
-    nuevo_id = ultimo_evento["event_id"] + 1
-    
-    evento = {
-        "event_id": nuevo_id,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "action": "AI_ANALYSIS",
-        "hash_anterior": ultimo_evento["hash_actual"],
-        "hash_actual": hash_analisis,
-        "metadata": {
-            "descripcion": "Análisis automatizado con IA",
-            "total_formatos": resultados['total_formatos'],
-            "categorias": len(resultados['categorias']),
-            "archivo_resultados": AI_ANALYSIS_JSON,
-            "archivo_reporte": AI_REPORT_MD
-        }
-    }
-    
-    cadena["eventos"].append(evento)
-    guardar_json(CADENA_CUSTODIA_JSON, cadena)
+    cadena = ChainOfCustody(CADENA_CUSTODIA_JSON)
+    cadena.agregar("AI_ANALYSIS", hash_analisis, {
+        "descripcion": "Análisis automatizado con IA",
+        "total_formatos": resultados['total_formatos'],
+        "categorias": len(resultados['categorias']),
+        "archivo_resultados": AI_ANALYSIS_JSON,
+        "archivo_reporte": AI_REPORT_MD
+    })
+    cadena.commit()
     
     print(f"✓ Chain of custody updated")
     
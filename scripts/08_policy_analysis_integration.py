@@ -14,7 +14,8 @@ IMPROVEMENTS (Based on Professional Audit):
 - Structured logging with levels (INFO, WARNING, ERROR)
 - CLI with argparse (--verify-only, --dry-run)
 - PROV metadata for forensic compatibility
-- Verification of blockchain proofs (.ots files)
+- Offline verification of blockchain proofs (.ots files) against a local
+  Bitcoin block-header cache (see coatlicue.headers)
 """
 
 from __future__ import annotations
@@ -28,11 +29,19 @@ import sys
 import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue import ots
+from coatlicue.custody.chain import ChainOfCustody
+from coatlicue.headers import CABECERAS_JSONL, BlockHeaderStore
 
 # Configuration
 CADENA_CUSTODIA_JSON = "cadena_custodia.json"
 HASHES_JSON = "hashes_archivos.json"
+DIR_DESCARGAS = "formatos_descargados"
 STRATEGY_DOC = "docs/ESTRATEGIA_NORTEAMERICA_2025-2030.txt"
 POLICY_ANALYSIS_JSON = "policy_analysis_results.json"
 POLICY_REPORT_MD = "docs/politicas_publicas/ANALISIS_CUMPLIMIENTO_TMEC.md"
@@ -122,15 +131,27 @@ def hash_json_canonico(obj: Any) -> str:
     return h
 
 
-def verificar_archivos_ots(blockchain_dir: str = "blockchain_proofs") -> Dict[str, bool]:
+def verificar_archivos_ots(blockchain_dir: str = "blockchain_proofs",
+                           headers_cache: str = CABECERAS_JSONL,
+                           archivos_dir: str = DIR_DESCARGAS,
+                           workers: Optional[int] = None) -> Dict[str, Any]:
     """
-    Verify existence of OpenTimestamps proof files (.ots).
+    Verify OpenTimestamps proof files (.ots) offline: parse each proof,
+    replay its operations and check Bitcoin attestations against the local
+    block-header cache. No `ots verify` subprocess, node or network.
     Returns dict with verification results.
     """
     results = {
         "blockchain_dir_exists": False,
         "ots_files_found": 0,
-        "ots_files": []
+        "ots_files": [],
+        "ots_verified": 0,
+        "ots_pending": 0,
+        "ots_missing_headers": 0,
+        "ots_invalid": 0,
+        "ots_results": [],
+        "headers_cache": headers_cache,
+        "headers_cached": 0
     }
     
     if not os.path.exists(blockchain_dir):
@@ -139,14 +160,45 @@ def verificar_archivos_ots(blockchain_dir: str = "blockchain_proofs") -> Dict[st
     
     results["blockchain_dir_exists"] = True
     
-    ots_files = list(Path(blockchain_dir).glob("*.ots"))
+    ots_files = sorted(Path(blockchain_dir).glob("*.ots"))
     results["ots_files_found"] = len(ots_files)
     results["ots_files"] = [str(f) for f in ots_files]
     
-    if results["ots_files_found"] > 0:
-        logger.info(f"Encontrados {results['ots_files_found']} archivos .ots")
-    else:
+    if results["ots_files_found"] == 0:
         logger.warning("No se encontraron archivos .ots de blockchain")
+        return results
+    
+    logger.info(f"Encontrados {results['ots_files_found']} archivos .ots")
+    
+    cabeceras = BlockHeaderStore(headers_cache).como_dict()
+    results["headers_cached"] = len(cabeceras)
+    verificaciones = ots.verificar_lote(results["ots_files"], cabeceras, archivos_dir, workers)
+    
+    contadores = {
+        ots.VERIFICADO: "ots_verified",
+        ots.PENDIENTE: "ots_pending",
+        ots.SIN_CABECERA: "ots_missing_headers",
+        ots.INVALIDO: "ots_invalid"
+    }
+    for v in verificaciones:
+        if v.estado in contadores:
+            results[contadores[v.estado]] += 1
+        results["ots_results"].append({
+            "archivo": os.path.basename(v.ruta),
+            "estado": v.estado,
+            "altura": v.altura,
+            "fecha_bloque": v.fecha,
+            "detalle": v.detalle
+        })
+    
+    logger.info(
+        f"Pruebas .ots: {results['ots_verified']} verificadas, "
+        f"{results['ots_pending']} pendientes, "
+        f"{results['ots_missing_headers']} sin cabecera en caché, "
+        f"{results['ots_invalid']} inválidas"
+    )
+    if results["ots_invalid"]:
+        logger.warning(f"{results['ots_invalid']} pruebas .ots inválidas")
     
     return results
 
@@ -596,6 +648,12 @@ Examples:
         help="Don't update chain of custody (for testing)"
     )
     
+    parser.add_argument(
+        "--headers",
+        default=CABECERAS_JSONL,
+        help="Local Bitcoin block-header cache used to verify .ots proofs"
+    )
+    
     args = parser.parse_args()
     
     print("\n" + "=" * 80)
@@ -619,13 +677,14 @@ Examples:
         logger.info("✓ Todos los archivos requeridos están presentes")
         
         # Verify blockchain proofs
-        ots_verification = verificar_archivos_ots()
+        ots_verification = verificar_archivos_ots(headers_cache=args.headers)
         
         if args.verify_only:
             print("\n✓ Verificación completada exitosamente")
             print(f"  - {HASHES_JSON}: OK")
             print(f"  - {CADENA_CUSTODIA_JSON}: OK")
             print(f"  - Archivos .ots encontrados: {ots_verification['ots_files_found']}")
+            print(f"  - Archivos .ots verificados en Bitcoin: {ots_verification['ots_verified']}")
             return 0
         
         # Load data
@@ -640,7 +699,11 @@ Examples:
         print(f"\n✓ Análisis completado")
         print(f"  Áreas de política pública: {resultados['total_areas_politicas']}")
         print(f"  Formatos de auditoría: {resultados['total_formatos_auditoria']}")
-        print(f"  Archivos .ots verificados: {ots_verification['ots_files_found']}")
+        print(f"  Archivos .ots encontrados: {ots_verification['ots_files_found']}")
+        print(f"  Archivos .ots verificados en Bitcoin: {ots_verification['ots_verified']} "
+              f"(pendientes: {ots_verification['ots_pending']}, "
+              f"sin cabecera: {ots_verification['ots_missing_headers']}, "
+              f"inválidos: {ots_verification['ots_invalid']})")
         
         # Generate report
         print("\nGenerando reporte de cumplimiento...")
@@ -661,22 +724,16 @@ Examples:
             
             # Update chain of custody
             if not args.no_commit:
-                cadena = cargar_json(CADENA_CUSTODIA_JSON)
+                cadena = ChainOfCustody(CADENA_CUSTODIA_JSON)
                 
                 # Calculate hash using canonical serialization
                 hash_analisis = hash_json_canonico(resultados)
                 
-                ultimo_evento = cadena["eventos"][-1]
-                nuevo_id = ultimo_evento["event_id"] + 1
-                
                 # PROV metadata for forensic compatibility
-                evento = {
-                    "event_id": nuevo_id,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "action": "POLICY_ANALYSIS_INTEGRATION",
-                    "hash_anterior": ultimo_evento["hash_actual"],
-                    "hash_actual": hash_analisis,
-                    "metadata": {
+                evento = cadena.agregar(
+                    "POLICY_ANALYSIS_INTEGRATION",
+                    hash_analisis,
+                    {
                         "descripcion": "Integración con marco estratégico T-MEC 2025-2030",
                         "areas_politicas": resultados['total_areas_politicas'],
                         "documento_estrategico": resultados['documento_estrategico'],
@@ -684,21 +741,22 @@ Examples:
                         "archivo_reporte": POLICY_REPORT_MD,
                         "blockchain_verification": {
                             "ots_files_found": ots_verification['ots_files_found'],
-                            "blockchain_dir_exists": ots_verification['blockchain_dir_exists']
+                            "blockchain_dir_exists": ots_verification['blockchain_dir_exists'],
+                            "ots_verified": ots_verification['ots_verified'],
+                            "ots_pending": ots_verification['ots_pending'],
+                            "ots_invalid": ots_verification['ots_invalid']
                         }
                     },
-                    "prov": {
+                    prov={
                         "agent": "Coatlicue Policy Analysis Integration v2.0",
                         "tool": "08_policy_analysis_integration.py",
                         "version": "2.0",
                         "commit_sha": os.popen("git rev-parse HEAD 2>/dev/null").read().strip() or "N/A"
                     }
-                }
-                
-                cadena["eventos"].append(evento)
-                guardar_json_atomico(CADENA_CUSTODIA_JSON, cadena)
+                )
+                cadena.commit()
                 
-                print(f"✓ Cadena de custodia actualizada (evento {nuevo_id})")
+                print(f"✓ Cadena de custodia actualizada (evento {evento['event_id']})")
         else:
             print("\n[DRY-RUN] No se escribieron archivos")
         
@@ -22,6 +22,8 @@ from typing import List, Dict, Any, Optional
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from coatlicue.hashing import hash_bytes
+
 # Logging configuration
 logging.basicConfig(
     level=logging.INFO,
@@ -202,10 +204,11 @@ class LGEEPAAdapter:
                     logger.warning(f"Archivo no encontrado: {path}")
                     continue
                 
+                # Una sola lectura: el hash es el de los mismos bytes analizados
                 with open(path, 'rb') as f:
                     content = f.read()
                 
-                content_hash = hashlib.sha256(content).hexdigest()
+                content_hash = hash_bytes(content)
                 
                 filename = os.path.basename(path)
                 metadata = {
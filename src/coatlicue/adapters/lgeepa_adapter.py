@@ -9,7 +9,6 @@ Date: 2026-01-14
 Version: 1.0
 """
 
-import hashlib
 import json
 import logging
 import os
@@ -18,6 +17,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+from ..hashing import hash_bytes
+
 # Import base classes
 from .regulatory_adapter import RegulatoryAdapter, AdapterConfig
 from .data_structures import ProcessedDocument, AnalysisFinding, AnalysisResult
@@ -151,11 +152,12 @@ class LGEEPAAdapter(RegulatoryAdapter):
                     continue
                 
                 # Leer contenido del archivo
+                # Una sola lectura: el hash es el de los mismos bytes analizados
                 with open(path, 'rb') as f:
                     content = f.read()
                 
                 # Calcular hash determinista (SHA-256)
-                content_hash = hashlib.sha256(content).hexdigest()
+                content_hash = hash_bytes(content)
                 
                 # Extraer metadatos del nombre del archivo
                 filename = os.path.basename(path)
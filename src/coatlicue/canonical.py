@@ -0,0 +1,27 @@
+"""
+Serialización JSON canónica del Sistema Coatlicue.
+
+Claves ordenadas, separadores compactos y UTF-8: el mismo objeto produce
+siempre los mismos bytes y, por lo tanto, el mismo hash SHA-256 en
+cualquier ejecución.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+
+def json_canonico(obj: Any) -> bytes:
+    """Bytes de la serialización canónica de un objeto JSON."""
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    ).encode("utf-8")
+
+
+def hash_json_canonico(obj: Any) -> str:
+    """SHA-256 (hex) de la serialización canónica de un objeto JSON."""
+    return hashlib.sha256(json_canonico(obj)).hexdigest()
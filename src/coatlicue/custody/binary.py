@@ -0,0 +1,396 @@
+"""
+Codificación binaria compacta de los eventos de custodia.
+
+En cadena_custodia.json cada evento repite sus claves y guarda los hashes
+como 64 caracteres hexadecimales con sangría; este formato guarda sólo la
+información, para archivo a largo plazo y carga rápida de cadenas grandes.
+
+Archivo: MAGIA, versión (varint) y una secuencia de registros, cada uno
+prefijado con su longitud (varint). Un registro estructurado contiene:
+
+    0x01, banderas de presencia (1 byte)
+    event_id      varint
+    timestamp     0x00 + microsegundos UTC desde 1970 (8 bytes LE) | 0x01 + texto
+    action        código internado (varint, ver ACCIONES) | 0 + texto
+    hash_anterior 0x00 None | 0x01 + 32 bytes | 0x02 + texto
+    hash_actual   ídem
+    metadata      JSON compacto prefijado con su longitud
+    extras        objeto JSON con los demás campos (p. ej. "resultado")
+    hash_evento   ídem a los hashes
+
+Los textos van en UTF-8 prefijados con su longitud. Un campo sólo se
+comprime si la decodificación reproduce exactamente el valor original
+(hex en minúsculas, timestamp ISO 8601 de `datetime.isoformat()`); si no,
+se guarda como texto. Un evento cuyas claves no siguen el orden habitual
+se guarda completo como JSON (registro 0x02). Así `decodificar_evento`
+devuelve el mismo diccionario, con el mismo orden de claves: la línea
+JSONL, el JSON canónico y por lo tanto `hash_evento` son idénticos.
+
+Los códigos de ACCIONES son parte del formato: sólo se agregan al final.
+
+Uso desde línea de comandos:
+  python -m coatlicue.custody.binary codificar [--journal RUTA] [--salida RUTA]
+  python -m coatlicue.custody.binary decodificar [--entrada RUTA] [--jsonl RUTA]
+  python -m coatlicue.custody.binary verificar [--entrada RUTA]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .journal import JOURNAL_JSONL, serializar_evento
+from .snapshot import historial
+from .verify import CAMPO_HASH_EVENTO, ResultadoVerificacion, verificar_eventos
+
+MAGIA = b"COATLICUE-CUSTODIA\x00"
+VERSION_BINARIA = 1
+TAMAÑO_BLOQUE = 1 << 20
+
+ACCIONES = (
+    "GENESIS_VERIFICATION",
+    "DOWNLOAD_FILE",
+    "VERIFIED_UNCHANGED",
+    "SNAPSHOT_DIFF",
+    "CREATE_MERKLE_TREE",
+    "BLOCKCHAIN_ANCHORING",
+    "GENERATE_NOTARIAL_PACKAGE",
+    "SYNC_GOOGLE_DRIVE",
+    "AI_ANALYSIS",
+    "GENERATE_NOM151_CERTIFICATE",
+    "POLICY_ANALYSIS_INTEGRATION",
+)
+_CODIGOS = {accion: i + 1 for i, accion in enumerate(ACCIONES)}
+
+REGISTRO_ESTRUCTURADO = 0x01
+REGISTRO_JSON = 0x02
+
+# Campos con codificación propia, en el orden habitual de los eventos
+CAMPOS = ("event_id", "timestamp", "action", "hash_anterior", "hash_actual", "metadata")
+_EXTRAS = 1 << 6
+_SELLADO = 1 << 7
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSEGUNDO = timedelta(microseconds=1)
+_LIMITE = datetime(9999, 1, 1, tzinfo=timezone.utc)
+
+
+def ruta_binaria_para(ruta_journal: str) -> str:
+    """cadena_custodia.jsonl -> cadena_custodia.bin"""
+    base, _ = os.path.splitext(ruta_journal)
+    return base + ".bin"
+
+
+# -- primitivas --------------------------------------------------------------
+
+def _varint(n: int) -> bytes:
+    salida = bytearray()
+    while n >= 0x80:
+        salida.append((n & 0x7f) | 0x80)
+        n >>= 7
+    salida.append(n)
+    return bytes(salida)
+
+
+def _leer_varint(datos: bytes, pos: int) -> Tuple[int, int]:
+    byte = datos[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    n = desplazamiento = 0
+    while True:
+        byte = datos[pos]
+        pos += 1
+        n |= (byte & 0x7f) << desplazamiento
+        if byte < 0x80:
+            return n, pos
+        desplazamiento += 7
+
+
+def _bloque(datos: bytes) -> bytes:
+    return _varint(len(datos)) + datos
+
+
+def _leer_bloque(datos: bytes, pos: int) -> Tuple[bytes, int]:
+    n, pos = _leer_varint(datos, pos)
+    return datos[pos:pos + n], pos + n
+
+
+def _json(valor: Any) -> bytes:
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+_decodificador_json = json.JSONDecoder()
+
+
+def _leer_json(datos: bytes) -> Any:
+    return _decodificador_json.decode(datos.decode("utf-8"))
+
+
+def _texto(valor: str) -> bytes:
+    return _bloque(valor.encode("utf-8"))
+
+
+def _hash(valor: Optional[str]) -> bytes:
+    if valor is None:
+        return b"\x00"
+    if len(valor) == 64:
+        try:
+            crudo = bytes.fromhex(valor)
+        except ValueError:
+            crudo = None
+        if crudo is not None and crudo.hex() == valor:
+            return b"\x01" + crudo
+    return b"\x02" + _texto(valor)
+
+
+def _leer_hash(datos: bytes, pos: int) -> Tuple[Optional[str], int]:
+    marca = datos[pos]
+    if marca == 0:
+        return None, pos + 1
+    if marca == 1:
+        return datos[pos + 1:pos + 33].hex(), pos + 33
+    texto, pos = _leer_bloque(datos, pos + 1)
+    return texto.decode("utf-8"), pos
+
+
+def _timestamp(valor: str) -> bytes:
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError:
+        fecha = None
+    if (fecha is not None and fecha.tzinfo is timezone.utc and _EPOCA <= fecha < _LIMITE
+            and fecha.isoformat() == valor):
+        return b"\x00" + ((fecha - _EPOCA) // _MICROSEGUNDO).to_bytes(8, "little")
+    return b"\x01" + _texto(valor)
+
+
+def _leer_timestamp(datos: bytes, pos: int) -> Tuple[str, int]:
+    if datos[pos] == 0:
+        micros = int.from_bytes(datos[pos + 1:pos + 9], "little")
+        return (_EPOCA + timedelta(microseconds=micros)).isoformat(), pos + 9
+    texto, pos = _leer_bloque(datos, pos + 1)
+    return texto.decode("utf-8"), pos
+
+
+# -- eventos -----------------------------------------------------------------
+
+def _estructurable(evento: Dict[str, Any]) -> bool:
+    """¿El evento sigue el orden habitual y sus campos tienen el tipo esperado?"""
+    claves = [k for k in evento if k != CAMPO_HASH_EVENTO]
+    propias = [k for k in claves if k in CAMPOS]
+    if claves[:len(propias)] != [k for k in CAMPOS if k in evento]:
+        return False
+    if CAMPO_HASH_EVENTO in evento and next(reversed(evento)) != CAMPO_HASH_EVENTO:
+        return False
+    event_id = evento.get("event_id", 0)
+    if type(event_id) is not int or event_id < 0:
+        return False
+    for campo in ("timestamp", "action"):
+        if campo in evento and not isinstance(evento[campo], str):
+            return False
+    for campo in ("hash_anterior", "hash_actual", CAMPO_HASH_EVENTO):
+        if evento.get(campo) is not None and not isinstance(evento[campo], str):
+            return False
+    return True
+
+
+def codificar_evento(evento: Dict[str, Any]) -> bytes:
+    """Registro binario de un evento (sin el prefijo de longitud)."""
+    if not _estructurable(evento):
+        return bytes([REGISTRO_JSON]) + _json(evento)
+
+    banderas = 0
+    partes = []
+    for bit, campo in enumerate(CAMPOS):
+        if campo not in evento:
+            continue
+        banderas |= 1 << bit
+        valor = evento[campo]
+        if campo == "event_id":
+            partes.append(_varint(valor))
+        elif campo == "timestamp":
+            partes.append(_timestamp(valor))
+        elif campo == "action":
+            codigo = _CODIGOS.get(valor)
+            partes.append(_varint(codigo) if codigo else b"\x00" + _texto(valor))
+        elif campo == "metadata":
+            partes.append(_bloque(_json(valor)))
+        else:
+            partes.append(_hash(valor))
+    extras = {k: v for k, v in evento.items() if k not in CAMPOS and k != CAMPO_HASH_EVENTO}
+    if extras:
+        banderas |= _EXTRAS
+        partes.append(_bloque(_json(extras)))
+    if CAMPO_HASH_EVENTO in evento:
+        banderas |= _SELLADO
+        partes.append(_hash(evento[CAMPO_HASH_EVENTO]))
+    return bytes([REGISTRO_ESTRUCTURADO, banderas]) + b"".join(partes)
+
+
+def decodificar_evento(registro: bytes) -> Dict[str, Any]:
+    """Evento original a partir de su registro binario."""
+    if registro[0] == REGISTRO_JSON:
+        return _leer_json(registro[1:])
+    if registro[0] != REGISTRO_ESTRUCTURADO:
+        raise ValueError(f"Tipo de registro desconocido: {registro[0]}")
+
+    # Desenrollado en el orden de CAMPOS: es el camino crítico de la carga
+    banderas = registro[1]
+    pos = 2
+    evento: Dict[str, Any] = {}
+    if banderas & 0x01:
+        evento["event_id"], pos = _leer_varint(registro, pos)
+    if banderas & 0x02:
+        evento["timestamp"], pos = _leer_timestamp(registro, pos)
+    if banderas & 0x04:
+        codigo, pos = _leer_varint(registro, pos)
+        if codigo:
+            evento["action"] = ACCIONES[codigo - 1]
+        else:
+            texto, pos = _leer_bloque(registro, pos)
+            evento["action"] = texto.decode("utf-8")
+    if banderas & 0x08:
+        evento["hash_anterior"], pos = _leer_hash(registro, pos)
+    if banderas & 0x10:
+        evento["hash_actual"], pos = _leer_hash(registro, pos)
+    if banderas & 0x20:
+        texto, pos = _leer_bloque(registro, pos)
+        evento["metadata"] = _leer_json(texto)
+    if banderas & _EXTRAS:
+        texto, pos = _leer_bloque(registro, pos)
+        evento.update(_leer_json(texto))
+    if banderas & _SELLADO:
+        evento[CAMPO_HASH_EVENTO], pos = _leer_hash(registro, pos)
+    return evento
+
+
+# -- archivos ----------------------------------------------------------------
+
+def escribir_eventos(f: BinaryIO, eventos: Iterable[Dict[str, Any]]) -> int:
+    """Escribe la cabecera y los registros en `f`. Retorna el número de eventos."""
+    f.write(MAGIA + _varint(VERSION_BINARIA))
+    n = 0
+    lote: List[bytes] = []
+    for evento in eventos:
+        lote.append(_bloque(codificar_evento(evento)))
+        n += 1
+        if len(lote) >= 10000:
+            f.write(b"".join(lote))
+            lote = []
+    f.write(b"".join(lote))
+    return n
+
+
+def leer_eventos(ruta: str) -> Iterator[Dict[str, Any]]:
+    """Recorre los eventos de un archivo binario, leyendo por bloques."""
+    with open(ruta, 'rb') as f:
+        datos = f.read(len(MAGIA) + 1)
+        if datos[:len(MAGIA)] != MAGIA:
+            raise ValueError(f"{ruta} no es una cadena de custodia binaria")
+        version, _ = _leer_varint(datos, len(MAGIA))
+        if version != VERSION_BINARIA:
+            raise ValueError(f"Versión binaria no soportada: {version}")
+
+        buffer = b""
+        while True:
+            bloque = f.read(TAMAÑO_BLOQUE)
+            buffer += bloque
+            pos = 0
+            while pos < len(buffer):
+                try:
+                    n, inicio = _leer_varint(buffer, pos)
+                except IndexError:
+                    break
+                if inicio + n > len(buffer):
+                    break
+                yield decodificar_evento(buffer[inicio:inicio + n])
+                pos = inicio + n
+            buffer = buffer[pos:]
+            if not bloque:
+                break
+        if buffer:
+            raise ValueError(f"{ruta}: registro incompleto al final del archivo")
+
+
+def codificar_journal(ruta_journal: str = JOURNAL_JSONL,
+                      ruta_binaria: Optional[str] = None) -> int:
+    """
+    Escribe el historial completo (segmentos archivados y bitácora viva) en
+    formato binario, de forma atómica. Retorna el número de eventos.
+    """
+    ruta_binaria = ruta_binaria or ruta_binaria_para(ruta_journal)
+    dir_name = os.path.dirname(ruta_binaria) or "."
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".bin", dir=dir_name)
+    try:
+        with os.fdopen(tmp_fd, 'wb') as f:
+            n = escribir_eventos(f, historial(ruta_journal))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ruta_binaria)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return n
+
+
+def decodificar_a_jsonl(ruta_binaria: str, ruta_jsonl: str) -> int:
+    """Reconstruye la bitácora JSONL (byte a byte) desde el archivo binario."""
+    dir_name = os.path.dirname(ruta_jsonl) or "."
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".jsonl", dir=dir_name)
+    n = 0
+    try:
+        with os.fdopen(tmp_fd, 'wb') as f:
+            for evento in leer_eventos(ruta_binaria):
+                f.write(serializar_evento(evento))
+                n += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ruta_jsonl)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return n
+
+
+def verificar_binario(ruta_binaria: str) -> ResultadoVerificacion:
+    """Verifica la cadena completa contenida en un archivo binario."""
+    return verificar_eventos(leer_eventos(ruta_binaria))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Codificación binaria de la cadena de custodia")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    codificar = sub.add_parser("codificar", help="Escribir el historial en formato binario")
+    codificar.add_argument("--journal", default=JOURNAL_JSONL, help="Bitácora JSONL")
+    codificar.add_argument("--salida", help="Archivo binario (default: junto a la bitácora)")
+    decodificar = sub.add_parser("decodificar", help="Reconstruir la bitácora JSONL")
+    decodificar.add_argument("--entrada", default=ruta_binaria_para(JOURNAL_JSONL),
+                             help="Archivo binario")
+    decodificar.add_argument("--jsonl", default="cadena_custodia.decodificada.jsonl",
+                             help="Bitácora JSONL de salida")
+    verificar = sub.add_parser("verificar", help="Verificar la cadena del archivo binario")
+    verificar.add_argument("--entrada", default=ruta_binaria_para(JOURNAL_JSONL),
+                           help="Archivo binario")
+    args = parser.parse_args(argv)
+
+    if args.comando == "codificar":
+        salida = args.salida or ruta_binaria_para(args.journal)
+        n = codificar_journal(args.journal, salida)
+        print(f"{n} eventos codificados en {salida} ({os.path.getsize(salida)} bytes)")
+    elif args.comando == "decodificar":
+        n = decodificar_a_jsonl(args.entrada, args.jsonl)
+        print(f"{n} eventos decodificados en {args.jsonl}")
+    else:
+        resultado = verificar_binario(args.entrada)
+        print(resultado)
+        return 0 if resultado.valida else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Cadena de custodia compartida por todos los scripts del Sistema Coatlicue.
+
+`ChainOfCustody` reemplaza las copias de cargar_cadena_custodia /
+guardar_cadena_custodia / agregar_evento_cadena de cada script:
+
+- La fuente de verdad es la bitácora JSONL (`cadena_custodia.jsonl`); la
+  primera vez se crea migrando el cadena_custodia.json existente.
+- El último evento (id y hash) se lee una vez desde el final de la
+  bitácora y se mantiene en caché: agregar un evento nunca recorre el
+  historial.
+- Cada evento nuevo se sella con `hash_evento` (ver `custody.verify`), que
+  encadena el contenido completo del evento con el digest anterior.
+- Los eventos se agregan por lotes y `commit()` los confirma con una sola
+  escritura + fsync; después agrega los mismos eventos al final de
+  cadena_custodia.json (para notarios y herramientas existentes) copiando
+  el documento a un temporal que lo reemplaza (rename atómico), sin leer
+  el historial. Sólo si el documento falta o no termina en la cola
+  anterior se exporta completo desde la bitácora.
+  Al abrir la cadena se comprueba que el documento termine en el último
+  evento de la bitácora; si no (p. ej. un commit interrumpido entre el
+  fsync de la bitácora y el anexado al JSON) se emite un aviso y el
+  siguiente `commit()` lo regenera.
+- `commit()` se ejecuta bajo el candado de la bitácora: si otro proceso
+  anexó eventos mientras tanto, el lote se re-encadena (event_id,
+  hash_anterior, hash_evento) sobre la cola real antes de escribirse, de
+  modo que etapas paralelas (07, 08, ...) no pierden eventos.
+- Si la bitácora fue compactada (`custody.snapshot`), la cola y el digest
+  se toman del snapshot y no se recorren los segmentos archivados.
+- Opcionalmente, `commit()` mantiene sincronizado un índice SQLite
+  (`custody.sqlite_store`) para consultas por acción, fecha o hash.
+"""
+
+import json
+import os
+import tempfile
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from .checkpoints import clave_de_entorno, ruta_checkpoints_para, verificar_incremental
+from .journal import (
+    CADENA_CUSTODIA_JSON, PROYECTO, CustodyJournal, anexar_documento, documento_termina_en,
+    migrar_json, serializar_evento
+)
+from .snapshot import (
+    cargar_snapshot, eventos_posteriores, exportar_json, lineas_archivadas, ruta_snapshot_para
+)
+from .sqlite_store import CustodyIndex
+from .verify import (
+    CAMPO_HASH_EVENTO, HASH_GENESIS, ResultadoVerificacion, sellar_evento
+)
+
+
+def ruta_journal_para(ruta_json: str) -> str:
+    """cadena_custodia.json -> cadena_custodia.jsonl"""
+    base, _ = os.path.splitext(ruta_json)
+    return base + ".jsonl"
+
+
+class ChainOfCustody:
+    """Cadena de custodia con anexado por lotes y cola en caché."""
+
+    def __init__(self, ruta_json: str = CADENA_CUSTODIA_JSON,
+                 ruta_journal: Optional[str] = None, exportar: bool = True,
+                 proyecto: str = PROYECTO, ruta_indice: Optional[str] = None):
+        self.ruta_json = ruta_json
+        self.ruta_journal = ruta_journal or ruta_journal_para(ruta_json)
+        self.exportar_json = exportar
+        self.proyecto = proyecto
+        self.ruta_indice = ruta_indice
+        self.journal = CustodyJournal(self.ruta_journal)
+
+        if not os.path.exists(self.ruta_journal):
+            with self.journal.bloqueo():
+                if not os.path.exists(self.ruta_journal):
+                    if not os.path.exists(ruta_json):
+                        raise FileNotFoundError(
+                            f"No existe la cadena de custodia: {ruta_json} "
+                            f"(ejecute 01_genesis_verification.py)")
+                    migrar_json(ruta_json, self.ruta_journal)
+
+        self._pendientes: List[Dict[str, Any]] = []
+        self._confirmado: Optional[Dict[str, Any]] = None
+        self._digest_confirmado = HASH_GENESIS
+        self.json_desfasado = False
+        if self.exportar_json and os.path.exists(ruta_json):
+            # Bajo el candado: otro proceso podría estar entre el fsync de la
+            # bitácora y el anexado al JSON
+            with self.journal.bloqueo():
+                self._cargar_cola()
+                self.json_desfasado = (self._ultimo is not None and
+                                       not documento_termina_en(ruta_json, self._ultimo))
+            if self.json_desfasado:
+                warnings.warn(
+                    f"{ruta_json} no termina en el evento {self.ultimo_id} de "
+                    f"{self.ruta_journal}; se regenerará en el próximo commit()",
+                    RuntimeWarning, stacklevel=2)
+        else:
+            self._cargar_cola()
+
+    def _cargar_cola(self) -> None:
+        """Lee el último evento confirmado y el digest encadenado hasta él."""
+        ultimo = self.journal.ultimo_evento()
+        snapshot = cargar_snapshot(self.ruta_journal)
+        if snapshot and (ultimo is None or ultimo["event_id"] <= snapshot["event_id"]):
+            ultimo, digest = snapshot["ultimo_evento"], snapshot["digest"]
+        elif ultimo is None:
+            digest = HASH_GENESIS
+        elif CAMPO_HASH_EVENTO in ultimo:
+            digest = ultimo[CAMPO_HASH_EVENTO]
+        elif ultimo == self._confirmado:
+            digest = self._digest_confirmado
+        else:
+            # Cadena previa al sellado: el digest se obtiene recorriéndola una vez
+            resultado = verificar_incremental(self.ruta_journal, registrar=False)
+            if not resultado.valida:
+                raise ValueError(f"Cadena de custodia inválida: {resultado}")
+            digest = resultado.digest
+        self._confirmado = self._ultimo = ultimo
+        self._digest_confirmado = self._digest = digest
+
+    @classmethod
+    def crear(cls, evento_genesis: Dict[str, Any],
+              ruta_json: str = CADENA_CUSTODIA_JSON,
+              ruta_journal: Optional[str] = None,
+              proyecto: str = PROYECTO) -> "ChainOfCustody":
+        """
+        Inicia una cadena nueva con su evento genesis (sellado), reemplazando
+        de forma atómica cualquier bitácora previa.
+        """
+        ruta_journal = ruta_journal or ruta_journal_para(ruta_json)
+        evento_genesis = sellar_evento(dict(evento_genesis))
+        dir_name = os.path.dirname(ruta_journal) or "."
+        with CustodyJournal(ruta_journal).bloqueo():
+            tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".jsonl", dir=dir_name)
+            try:
+                with os.fdopen(tmp_fd, 'wb') as f:
+                    f.write(serializar_evento(evento_genesis))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, ruta_journal)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            # Los checkpoints y el snapshot de una cadena anterior ya no aplican
+            for ruta in (ruta_checkpoints_para(ruta_journal), ruta_snapshot_para(ruta_journal)):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            exportar_json(ruta_journal, ruta_json, proyecto)
+        return cls(ruta_json, ruta_journal, proyecto=proyecto)
+
+    # -- cola en caché -----------------------------------------------------
+
+    @property
+    def ultimo_evento(self) -> Optional[Dict[str, Any]]:
+        return self._ultimo
+
+    @property
+    def ultimo_id(self) -> int:
+        return self._ultimo["event_id"] if self._ultimo else 0
+
+    @property
+    def ultimo_hash(self) -> Optional[str]:
+        return self._ultimo["hash_actual"] if self._ultimo else None
+
+    @property
+    def digest(self) -> str:
+        """Digest encadenado hasta el último evento (confirmado o pendiente)."""
+        return self._digest
+
+    @property
+    def num_eventos(self) -> int:
+        """Número de eventos (los ids son consecutivos desde 1)."""
+        return self.ultimo_id
+
+    # -- escritura ---------------------------------------------------------
+
+    def agregar(self, accion: str, hash_actual: Optional[str],
+                metadata: Dict[str, Any], **extras: Any) -> Dict[str, Any]:
+        """
+        Agrega un evento sellado al lote pendiente y lo retorna. `extras`
+        agrega campos opcionales del evento (p. ej. resultado, prov).
+        """
+        evento = {
+            "event_id": None,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "action": accion,
+            "hash_anterior": None,
+            "hash_actual": hash_actual,
+            "metadata": metadata
+        }
+        evento.update(extras)
+        self._encadenar(evento)
+        self._pendientes.append(evento)
+        return evento
+
+    def _encadenar(self, evento: Dict[str, Any]) -> None:
+        """Enlaza y sella el evento después de la cola actual."""
+        evento["event_id"] = self.ultimo_id + 1
+        evento["hash_anterior"] = self.ultimo_hash
+        sellar_evento(evento, self._digest)
+        self._ultimo = evento
+        self._digest = evento[CAMPO_HASH_EVENTO]
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._pendientes)
+
+    def commit(self) -> int:
+        """
+        Confirma el lote pendiente (una escritura + fsync) y lo agrega al
+        documento JSON. Retorna el número de eventos confirmados.
+
+        Los eventos del lote (los mismos diccionarios que retornó
+        `agregar`) se re-encadenan sobre la cola en disco si otro proceso
+        la extendió desde que se cargó.
+        """
+        with self.journal.bloqueo():
+            pendientes, self._pendientes = self._pendientes, []
+            self._cargar_cola()
+            anterior = self._ultimo
+            for evento in pendientes:
+                self._encadenar(evento)
+            self.journal.extend(pendientes)
+            n = self.journal.flush()
+            self._confirmado, self._digest_confirmado = self._ultimo, self._digest
+            if self.exportar_json and (n or self.json_desfasado
+                                       or not os.path.exists(self.ruta_json)):
+                if anterior is None or not anexar_documento(self.ruta_json, anterior, pendientes):
+                    self.exportar()
+                self.json_desfasado = False
+            if self.ruta_indice:
+                with CustodyIndex(self.ruta_indice, self.ruta_journal) as indice:
+                    indice.sincronizar()
+        return n
+
+    def descartar(self) -> None:
+        """Descarta el lote pendiente y restaura la cola confirmada."""
+        self._pendientes = []
+        self._ultimo, self._digest = self._confirmado, self._digest_confirmado
+
+    def exportar(self, ruta_json: Optional[str] = None) -> int:
+        """Escribe el documento JSON completo (atómico). Retorna el número de eventos."""
+        return exportar_json(self.ruta_journal, ruta_json or self.ruta_json, self.proyecto)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if tipo is None:
+            self.commit()
+        else:
+            self.descartar()
+
+    # -- lectura -----------------------------------------------------------
+
+    def verificar(self, completa: bool = False) -> ResultadoVerificacion:
+        """
+        Verifica los eventos confirmados desde el último checkpoint
+        confiable (o desde el genesis si `completa`).
+        """
+        return verificar_incremental(self.ruta_journal, clave=clave_de_entorno(),
+                                     completa=completa)
+
+    def cabecera(self) -> Dict[str, Any]:
+        snapshot = cargar_snapshot(self.ruta_journal)
+        if snapshot:
+            return dict(snapshot["cabecera"], proyecto=self.proyecto)
+        return self.journal.cabecera(self.proyecto)
+
+    def eventos(self) -> Iterator[Dict[str, Any]]:
+        """
+        Historial completo en streaming: segmentos archivados, eventos
+        confirmados y pendientes.
+        """
+        snapshot = cargar_snapshot(self.ruta_journal)
+        if snapshot:
+            for linea in lineas_archivadas(self.ruta_journal, snapshot):
+                yield json.loads(linea)
+        for _, _, evento in eventos_posteriores(self.journal, snapshot):
+            yield evento
+        yield from self._pendientes
@@ -0,0 +1,199 @@
+"""
+Checkpoints de verificación incremental de la cadena de custodia.
+
+Cada `intervalo` eventos verificados se registra un checkpoint en
+`<bitácora>.checkpoints.jsonl`:
+
+    {"event_id", "digest", "offset", "hash_actual", "sellados", "timestamp", "hmac"}
+
+`digest` es el digest encadenado acumulado hasta ese evento (ver
+`custody.verify`) y `offset` el byte donde termina su línea en la bitácora.
+Un checkpoint afirma que el prefijo hasta ese evento ya fue verificado: la
+siguiente verificación reanuda desde el último checkpoint confiable y sólo
+recorre el sufijo nuevo, por lo que su costo es proporcional a los eventos
+agregados desde la ejecución anterior.
+
+Si la variable de entorno COATLICUE_CHECKPOINT_KEY está definida, los
+checkpoints se firman con HMAC-SHA256 y sólo se confía en los que tienen
+firma válida. Antes de reanudar se comprueba además que la línea que
+termina en `offset` sea el evento del checkpoint (detecta bitácoras
+truncadas o reescritas); una edición del prefijo ya verificado sólo la
+detecta la verificación completa (`--completa`).
+
+Si la bitácora fue compactada (ver `custody.snapshot`), la verificación
+sin checkpoints parte del snapshot; `--completa` audita además los
+segmentos archivados desde el genesis.
+
+Uso desde línea de comandos:
+  python -m coatlicue.custody.checkpoints [--journal RUTA] [--intervalo N] [--completa]
+"""
+
+import argparse
+import hashlib
+import hmac
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from ..canonical import json_canonico
+from .journal import JOURNAL_JSONL, CustodyJournal
+from .snapshot import cargar_snapshot, verificador_desde, verificar_archivados
+from .verify import (
+    CAMPO_HASH_EVENTO, ChainVerifier, ResultadoVerificacion
+)
+
+INTERVALO_CHECKPOINT = 1000
+VARIABLE_CLAVE = "COATLICUE_CHECKPOINT_KEY"
+
+
+def ruta_checkpoints_para(ruta_journal: str) -> str:
+    """cadena_custodia.jsonl -> cadena_custodia.checkpoints.jsonl"""
+    base, _ = os.path.splitext(ruta_journal)
+    return base + ".checkpoints.jsonl"
+
+
+def clave_de_entorno() -> Optional[bytes]:
+    """Clave HMAC de COATLICUE_CHECKPOINT_KEY (None si no está definida)."""
+    clave = os.environ.get(VARIABLE_CLAVE)
+    return clave.encode("utf-8") if clave else None
+
+
+def firma(checkpoint: Dict[str, Any], clave: bytes) -> str:
+    """HMAC-SHA256 del JSON canónico del checkpoint (sin su campo hmac)."""
+    contenido = {k: v for k, v in checkpoint.items() if k != "hmac"}
+    return hmac.new(clave, json_canonico(contenido), hashlib.sha256).hexdigest()
+
+
+class CheckpointStore:
+    """Checkpoints de una bitácora, en un archivo JSONL de solo-anexado."""
+
+    def __init__(self, ruta: str, clave: Optional[bytes] = None):
+        self.ruta = ruta
+        self.clave = clave
+        self._archivo = CustodyJournal(ruta)
+
+    def checkpoints(self) -> List[Dict[str, Any]]:
+        """Todos los checkpoints registrados (uno cada N eventos)."""
+        return list(self._archivo.eventos())
+
+    def confiable(self, checkpoint: Dict[str, Any]) -> bool:
+        if self.clave is None:
+            return True
+        return hmac.compare_digest(checkpoint.get("hmac", ""), firma(checkpoint, self.clave))
+
+    def crear(self, event_id: int, digest: str, offset: int, hash_actual: Optional[str],
+              sellados: int) -> Dict[str, Any]:
+        checkpoint = {
+            "event_id": event_id,
+            "digest": digest,
+            "offset": offset,
+            "hash_actual": hash_actual,
+            "sellados": sellados,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+        if self.clave is not None:
+            checkpoint["hmac"] = firma(checkpoint, self.clave)
+        return checkpoint
+
+    def guardar(self, checkpoints: List[Dict[str, Any]]) -> int:
+        """Anexa checkpoints con una sola escritura + fsync."""
+        self._archivo.extend(checkpoints)
+        return self._archivo.flush()
+
+    def ultimo_valido(self, journal: CustodyJournal) -> Optional[Dict[str, Any]]:
+        """
+        Último checkpoint confiable cuyo evento sigue en la bitácora en el
+        mismo offset; se descartan los posteriores a un truncamiento.
+        """
+        for checkpoint in reversed(self.checkpoints()):
+            if not self.confiable(checkpoint):
+                continue
+            evento = journal.evento_terminado_en(checkpoint["offset"])
+            if evento is None or evento.get("event_id") != checkpoint["event_id"]:
+                continue
+            if evento.get("hash_actual") != checkpoint["hash_actual"]:
+                continue
+            if CAMPO_HASH_EVENTO in evento and evento[CAMPO_HASH_EVENTO] != checkpoint["digest"]:
+                continue
+            return checkpoint
+        return None
+
+
+def verificar_incremental(ruta_journal: str = JOURNAL_JSONL,
+                          ruta_checkpoints: Optional[str] = None,
+                          clave: Optional[bytes] = None,
+                          intervalo: int = INTERVALO_CHECKPOINT,
+                          completa: bool = False,
+                          registrar: bool = True) -> ResultadoVerificacion:
+    """
+    Verifica la bitácora desde el último checkpoint confiable (o desde el
+    snapshot, o desde el genesis si `completa`) y, si la cadena es válida,
+    registra checkpoints nuevos cada `intervalo` eventos.
+    """
+    journal = CustodyJournal(ruta_journal)
+    store = CheckpointStore(ruta_checkpoints or ruta_checkpoints_para(ruta_journal), clave)
+    snapshot = cargar_snapshot(ruta_journal)
+    compactados = snapshot["event_id"] if snapshot else 0
+
+    checkpoint = None if completa else store.ultimo_valido(journal)
+    desde = 0
+    ultimo_registrado = 0
+    if checkpoint:
+        verificador = ChainVerifier(
+            checkpoint["digest"],
+            {"event_id": checkpoint["event_id"], "hash_actual": checkpoint["hash_actual"]},
+            num_eventos=checkpoint["event_id"],
+            sellados=checkpoint["sellados"]
+        )
+        desde = checkpoint["offset"]
+        ultimo_registrado = checkpoint["event_id"]
+    elif snapshot and not completa:
+        verificador = verificador_desde(snapshot)
+    elif snapshot:
+        verificador = verificar_archivados(ruta_journal, snapshot)
+    else:
+        verificador = ChainVerifier()
+    if completa:
+        ultimo_registrado = max((c["event_id"] for c in store.checkpoints()
+                                 if store.confiable(c)), default=0)
+
+    nuevos = []
+    for offset, evento in journal.eventos_con_offset(desde):
+        event_id = evento["event_id"]
+        if event_id <= compactados:
+            continue  # Restos de una compactación interrumpida
+        if not verificador.agregar(evento):
+            break
+        if event_id % intervalo == 0 and event_id > ultimo_registrado:
+            nuevos.append(store.crear(event_id, verificador.digest, offset,
+                                      evento.get("hash_actual"), verificador.sellados))
+
+    resultado = verificador.resultado()
+    if registrar and resultado.valida and nuevos:
+        store.guardar(nuevos)
+    return resultado
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verificación incremental con checkpoints")
+    parser.add_argument("--journal", default=JOURNAL_JSONL, help="Bitácora JSONL")
+    parser.add_argument("--checkpoints", help="Archivo de checkpoints (default: junto a la bitácora)")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO_CHECKPOINT,
+                        help=f"Eventos entre checkpoints (default: {INTERVALO_CHECKPOINT})")
+    parser.add_argument("--completa", action="store_true",
+                        help="Verificar desde el genesis ignorando checkpoints")
+    parser.add_argument("--no-registrar", action="store_true",
+                        help="No registrar checkpoints nuevos")
+    args = parser.parse_args(argv)
+
+    resultado = verificar_incremental(
+        args.journal, args.checkpoints, clave_de_entorno(), args.intervalo,
+        completa=args.completa, registrar=not args.no_registrar
+    )
+    print(resultado)
+    return 0 if resultado.valida else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+"""
+Bitácora de solo-anexado (JSONL) de la cadena de custodia.
+
+Cada evento ocupa una línea JSON; agregar un evento es escribir una línea,
+no reescribir el documento completo. Los eventos se acumulan en memoria y
+`flush()` los escribe en una sola llamada `write` sobre un descriptor
+O_APPEND seguida de un `fsync` por lote.
+
+Si una escritura se interrumpe (corte de energía, proceso terminado), la
+última línea queda incompleta: los lectores la ignoran y el siguiente
+escritor la trunca antes de anexar.
+
+Varios procesos pueden anexar a la misma bitácora: `bloqueo()` toma un
+candado exclusivo (flock) sobre `<bitácora>.lock` que serializa a los
+escritores; los lectores no lo necesitan.
+
+La cabecera del documento JSON tradicional (cadena_custodia.json) se deriva
+de los eventos: versión, proyecto, hash_genesis (hash_actual del primer
+evento) e inicio (timestamp del primer evento). `exportar_json` produce ese
+documento, byte a byte igual al que escriben los scripts con
+`json.dump(..., indent=2, ensure_ascii=False)`.
+
+Uso desde línea de comandos:
+  python -m coatlicue.custody.journal migrar [--json cadena_custodia.json] [--journal RUTA]
+  python -m coatlicue.custody.journal exportar [--journal RUTA] [--json RUTA]
+  python -m coatlicue.custody.journal ultimo [--journal RUTA]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candados entre procesos
+    fcntl = None
+
+CADENA_CUSTODIA_JSON = "cadena_custodia.json"
+JOURNAL_JSONL = "cadena_custodia.jsonl"
+VERSION = "1.0"
+PROYECTO = "Auditoría Gubernamental México - Sistema Norteamérica"
+TAMAÑO_BLOQUE_COLA = 64 * 1024
+
+
+def serializar_evento(evento: Dict[str, Any]) -> bytes:
+    """Línea JSONL de un evento (orden de claves preservado)."""
+    return (json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class CustodyJournal:
+    """Bitácora JSONL de eventos de custodia con anexado por lotes."""
+
+    def __init__(self, ruta: str = JOURNAL_JSONL):
+        self.ruta = ruta
+        self._pendientes: List[bytes] = []
+
+    # -- escritura ---------------------------------------------------------
+
+    def append(self, evento: Dict[str, Any]) -> None:
+        """Encola un evento; se escribe en el siguiente `flush()`. O(1)."""
+        self._pendientes.append(serializar_evento(evento))
+
+    def extend(self, eventos: Iterable[Dict[str, Any]]) -> None:
+        for evento in eventos:
+            self.append(evento)
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._pendientes)
+
+    def flush(self) -> int:
+        """
+        Escribe los eventos encolados con una sola escritura y un fsync.
+        Retorna el número de eventos escritos.
+        """
+        if not self._pendientes:
+            return 0
+        datos = b"".join(self._pendientes)
+        fd = os.open(self.ruta, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _reparar_cola(fd)
+            escrito = 0
+            while escrito < len(datos):
+                escrito += os.write(fd, datos[escrito:])
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        n = len(self._pendientes)
+        self._pendientes = []
+        return n
+
+    @contextlib.contextmanager
+    def bloqueo(self) -> Iterator[None]:
+        """
+        Candado exclusivo entre procesos sobre `<bitácora>.lock`. Quien lo
+        tiene es el único escritor; se libera al salir del bloque (o si el
+        proceso termina).
+        """
+        fd = os.open(self.ruta + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if tipo is None:
+            self.flush()
+
+    # -- lectura -----------------------------------------------------------
+
+    def eventos(self) -> Iterator[Dict[str, Any]]:
+        """Recorre los eventos confirmados en memoria constante."""
+        for _, evento in self.eventos_con_offset():
+            yield evento
+
+    def eventos_con_offset(self, desde: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Recorre los eventos a partir del byte `desde` (inicio de una línea).
+        Cada evento se acompaña del offset donde termina su línea.
+        """
+        for offset, linea in self.lineas(desde):
+            yield offset, json.loads(linea)
+
+    def lineas(self, desde: int = 0) -> Iterator[Tuple[int, bytes]]:
+        """Líneas completas (sin decodificar) desde el byte `desde`, con su offset final."""
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, 'rb') as f:
+            f.seek(desde)
+            offset = desde
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break  # Escritura interrumpida: se ignora
+                offset += len(linea)
+                if linea.strip():
+                    yield offset, linea
+
+    def evento_terminado_en(self, offset: int) -> Optional[Dict[str, Any]]:
+        """Evento cuya línea termina exactamente en `offset`, si existe."""
+        try:
+            fd = os.open(self.ruta, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            if offset <= 0 or os.fstat(fd).st_size < offset:
+                return None
+            if os.pread(fd, 1, offset - 1) != b"\n":
+                return None
+            inicio = _inicio_ultima_linea(fd, offset)
+            linea = os.pread(fd, offset - inicio, inicio)
+            try:
+                return json.loads(linea)
+            except ValueError:
+                return None
+        finally:
+            os.close(fd)
+
+    def primer_evento(self) -> Optional[Dict[str, Any]]:
+        return next(self.eventos(), None)
+
+    def ultimo_evento(self) -> Optional[Dict[str, Any]]:
+        """Último evento confirmado, leído desde el final del archivo."""
+        linea = ultima_linea(self.ruta)
+        return json.loads(linea) if linea else None
+
+    def cabecera(self, proyecto: str = PROYECTO) -> Dict[str, Any]:
+        """Cabecera del documento JSON, derivada del primer evento."""
+        primero = self.primer_evento() or {}
+        return {
+            "version": VERSION,
+            "proyecto": proyecto,
+            "hash_genesis": primero.get("hash_actual"),
+            "inicio": primero.get("timestamp")
+        }
+
+
+def _reparar_cola(fd: int) -> None:
+    """Trunca una última línea incompleta antes de anexar."""
+    tamaño = os.fstat(fd).st_size
+    if tamaño == 0 or os.pread(fd, 1, tamaño - 1) == b"\n":
+        return
+    inicio = _inicio_ultima_linea(fd, tamaño)
+    os.ftruncate(fd, inicio)
+
+
+def _inicio_ultima_linea(fd: int, fin: int) -> int:
+    """Offset donde empieza la línea que termina en `fin` (exclusivo)."""
+    pos = fin
+    while pos > 0:
+        leer = min(TAMAÑO_BLOQUE_COLA, pos)
+        bloque = os.pread(fd, leer, pos - leer)
+        # Ignorar el salto de línea final de la propia línea
+        limite = len(bloque) - 1 if pos == fin and bloque.endswith(b"\n") else len(bloque)
+        i = bloque.rfind(b"\n", 0, limite)
+        if i >= 0:
+            return pos - leer + i + 1
+        pos -= leer
+    return 0
+
+
+def ultima_linea(ruta: str) -> Optional[bytes]:
+    """Última línea completa de un archivo, leyendo bloques desde el final."""
+    try:
+        fd = os.open(ruta, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fin = os.fstat(fd).st_size
+        while fin > 0:
+            if os.pread(fd, 1, fin - 1) != b"\n":
+                # Cola incompleta: retroceder hasta el salto anterior
+                fin = _inicio_ultima_linea(fd, fin)
+                continue
+            inicio = _inicio_ultima_linea(fd, fin)
+            linea = os.pread(fd, fin - inicio, inicio)
+            if linea.strip():
+                return linea
+            fin = inicio
+        return None
+    finally:
+        os.close(fd)
+
+
+CIERRE_DOCUMENTO = "\n  ]\n}"
+
+
+def bloque_evento(evento: Dict[str, Any]) -> str:
+    """Texto de un evento dentro de la lista "eventos" del documento JSON."""
+    texto = json.dumps(evento, indent=2, ensure_ascii=False)
+    return "\n".join("    " + linea for linea in texto.split("\n"))
+
+
+def escribir_documento(f, cabecera: Dict[str, Any], eventos: Iterable[Dict[str, Any]]) -> int:
+    """
+    Escribe el documento JSON en streaming, con el mismo formato que
+    `json.dump(documento, f, indent=2, ensure_ascii=False)`. Retorna el
+    número de eventos.
+    """
+    f.write("{\n")
+    for clave, valor in cabecera.items():
+        f.write(f"  {json.dumps(clave, ensure_ascii=False)}: "
+                f"{json.dumps(valor, ensure_ascii=False)},\n")
+    f.write('  "eventos": [')
+    n = 0
+    for evento in eventos:
+        f.write(",\n" if n else "\n")
+        f.write(bloque_evento(evento))
+        n += 1
+    f.write(CIERRE_DOCUMENTO if n else "]\n}")
+    return n
+
+
+INICIO_EVENTO = b"\n    {\n"  # Sólo los eventos van con 4 espacios de sangría
+BLOQUE_LECTURA_COLA = 64 * 1024
+BLOQUE_COPIA = 1024 * 1024
+
+
+def ultimo_del_documento(ruta_json: str) -> Optional[Dict[str, Any]]:
+    """
+    Último evento del documento JSON, leyendo sólo el final del archivo.
+    None si no existe, no tiene eventos o no termina con el cierre esperado
+    (escritura interrumpida o edición manual).
+    """
+    cierre = CIERRE_DOCUMENTO.encode("utf-8")
+    try:
+        with open(ruta_json, 'rb') as f:
+            tamaño = f.seek(0, os.SEEK_END)
+            cola = b""
+            while INICIO_EVENTO not in cola and len(cola) < tamaño:
+                leido = min(tamaño, len(cola) + BLOQUE_LECTURA_COLA)
+                f.seek(tamaño - leido)
+                cola = f.read(leido)
+    except FileNotFoundError:
+        return None
+    if not cola.endswith(cierre) or INICIO_EVENTO not in cola:
+        return None
+    bloque = cola[cola.rindex(INICIO_EVENTO):-len(cierre)]
+    try:
+        evento = json.loads(bloque)
+    except ValueError:
+        return None
+    return evento if isinstance(evento, dict) else None
+
+
+def documento_termina_en(ruta_json: str, evento: Dict[str, Any]) -> bool:
+    """
+    ¿El último evento del documento JSON coincide con `evento`? Se comparan
+    sólo los campos de `evento` (la cola de un snapshot guarda event_id y
+    hash_actual).
+    """
+    ultimo = ultimo_del_documento(ruta_json)
+    return ultimo is not None and all(ultimo.get(k) == v for k, v in evento.items())
+
+
+def anexar_documento(ruta_json: str, ultimo: Dict[str, Any],
+                     eventos: Sequence[Dict[str, Any]]) -> bool:
+    """
+    Agrega `eventos` al documento JSON sin volver a exportarlo: si termina
+    en `ultimo`, se copia el documento sin su cierre a un temporal, se
+    agregan los eventos nuevos y un cierre nuevo, y el temporal reemplaza
+    al documento (fsync + rename). Una interrupción deja intacto el
+    documento anterior. No lee la bitácora ni los segmentos archivados.
+    Retorna False, sin tocar el archivo, si el documento no termina en
+    `ultimo`; entonces hay que exportarlo completo.
+    """
+    if not documento_termina_en(ruta_json, ultimo):
+        return False
+    if not eventos:
+        return True
+    datos = "".join(",\n" + bloque_evento(e) for e in eventos) + CIERRE_DOCUMENTO
+    dir_name = os.path.dirname(ruta_json) or "."
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=dir_name)
+    try:
+        with open(ruta_json, 'rb') as origen, os.fdopen(tmp_fd, 'wb') as f:
+            pendiente = os.fstat(origen.fileno()).st_size - len(CIERRE_DOCUMENTO.encode("utf-8"))
+            while pendiente > 0:
+                bloque = origen.read(min(pendiente, BLOQUE_COPIA))
+                if not bloque:
+                    raise OSError(f"{ruta_json} cambió durante la copia")
+                f.write(bloque)
+                pendiente -= len(bloque)
+            f.write(datos.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ruta_json)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def exportar_json(ruta_journal: str = JOURNAL_JSONL,
+                  ruta_json: str = CADENA_CUSTODIA_JSON,
+                  proyecto: str = PROYECTO) -> int:
+    """
+    Exporta la bitácora al documento JSON de la cadena de custodia (para
+    notarios y herramientas existentes), de forma atómica. Retorna el
+    número de eventos.
+    """
+    journal = CustodyJournal(ruta_journal)
+    dir_name = os.path.dirname(ruta_json) or "."
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=dir_name)
+    try:
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+            n = escribir_documento(f, journal.cabecera(proyecto), journal.eventos())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ruta_json)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return n
+
+
+def migrar_json(ruta_json: str = CADENA_CUSTODIA_JSON,
+                ruta_journal: str = JOURNAL_JSONL) -> int:
+    """
+    Crea la bitácora a partir de un cadena_custodia.json existente.
+
+    ValueError si la bitácora ya existe o si la cabecera del documento no
+    se puede derivar de sus eventos (la exportación no sería fiel).
+    """
+    if os.path.exists(ruta_journal) and os.path.getsize(ruta_journal) > 0:
+        raise ValueError(f"La bitácora ya existe: {ruta_journal}")
+    with open(ruta_json, 'r', encoding='utf-8') as f:
+        documento = json.load(f)
+
+    eventos = documento.get("eventos", [])
+    derivada = {
+        "version": VERSION,
+        "proyecto": documento.get("proyecto"),
+        "hash_genesis": eventos[0]["hash_actual"] if eventos else None,
+        "inicio": eventos[0]["timestamp"] if eventos else None
+    }
+    cabecera = {k: v for k, v in documento.items() if k != "eventos"}
+    if cabecera != derivada:
+        raise ValueError(f"La cabecera de {ruta_json} no se deriva de sus eventos")
+
+    journal = CustodyJournal(ruta_journal)
+    journal.extend(eventos)
+    return journal.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bitácora JSONL de la cadena de custodia")
+    parser.add_argument("--journal", default=JOURNAL_JSONL, help="Bitácora JSONL")
+    parser.add_argument("--json", default=CADENA_CUSTODIA_JSON, help="Documento JSON")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("migrar", help="Crear la bitácora desde el documento JSON")
+    sub.add_parser("exportar", help="Regenerar el documento JSON desde la bitácora")
+    sub.add_parser("ultimo", help="Mostrar el último evento")
+    args = parser.parse_args(argv)
+
+    if args.comando == "migrar":
+        n = migrar_json(args.json, args.journal)
+        print(f"{n} eventos migrados a {args.journal}")
+    elif args.comando == "exportar":
+        n = exportar_json(args.journal, args.json)
+        print(f"{n} eventos exportados a {args.json}")
+    else:
+        evento = CustodyJournal(args.journal).ultimo_evento()
+        print(json.dumps(evento, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+Snapshots y compactación de la cadena de custodia.
+
+Después de años de ejecuciones, reconstruir el estado actual recorriendo la
+cadena desde el genesis es costoso. `compactar()` materializa ese estado en
+`<bitácora>.snapshot.json`:
+
+- último hash por archivo (DOWNLOAD_FILE / VERIFIED_UNCHANGED por
+  metadata.nombre_archivo), última raíz Merkle y último anclaje;
+- el digest encadenado (ver `custody.verify`) y la cola (event_id,
+  hash_actual) en ese punto, para seguir anexando y verificando sin
+  recorrer lo archivado;
+- la lista de segmentos archivados, cada uno con su SHA-256.
+
+Los eventos compactados se mueven a `<bitácora>_segmentos/` como archivos
+JSONL comprimidos con gzip (las líneas originales, byte a byte) y la
+bitácora viva queda sólo con los eventos posteriores. Los lectores parten
+del snapshot; los segmentos sólo se leen para exportar el documento
+completo (a pedido, o para reparar un cadena_custodia.json que falta o
+diverge; `ChainOfCustody.commit()` sólo le agrega los eventos nuevos) o
+para una auditoría (`verificar_archivados`).
+
+Uso desde línea de comandos:
+  python -m coatlicue.custody.snapshot compactar [--journal RUTA]
+  python -m coatlicue.custody.snapshot estado [--journal RUTA]
+
+La auditoría completa (segmentos + bitácora viva desde el genesis) es
+`python -m coatlicue.custody.checkpoints --completa`.
+"""
+
+import argparse
+import copy
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..canonical import hash_json_canonico
+from ..hashing import hash_archivo
+from .journal import (
+    CADENA_CUSTODIA_JSON, JOURNAL_JSONL, PROYECTO, CustodyJournal, escribir_documento
+)
+from .journal import exportar_json as exportar_json_journal
+from .verify import ChainVerifier, ResultadoVerificacion
+
+ACCIONES_ARCHIVO = ("DOWNLOAD_FILE", "VERIFIED_UNCHANGED")
+
+
+def ruta_snapshot_para(ruta_journal: str) -> str:
+    """cadena_custodia.jsonl -> cadena_custodia.snapshot.json"""
+    base, _ = os.path.splitext(ruta_journal)
+    return base + ".snapshot.json"
+
+
+def dir_segmentos_para(ruta_journal: str) -> str:
+    """cadena_custodia.jsonl -> cadena_custodia_segmentos/"""
+    base, _ = os.path.splitext(ruta_journal)
+    return base + "_segmentos"
+
+
+# -- estado materializado --------------------------------------------------
+
+def estado_inicial() -> Dict[str, Any]:
+    return {"archivos": {}, "merkle": None, "anclaje": None, "acciones": {}}
+
+
+def aplicar_evento(estado: Dict[str, Any], evento: Dict[str, Any]) -> None:
+    """Incorpora un evento al estado materializado."""
+    accion = evento.get("action")
+    metadata = evento.get("metadata")
+    metadata = metadata if isinstance(metadata, dict) else {}
+    estado["acciones"][accion] = estado["acciones"].get(accion, 0) + 1
+
+    if accion in ACCIONES_ARCHIVO and metadata.get("nombre_archivo"):
+        estado["archivos"][metadata["nombre_archivo"]] = {
+            "hash": evento.get("hash_actual"),
+            "event_id": evento.get("event_id"),
+            "timestamp": evento.get("timestamp"),
+            "action": accion
+        }
+    elif accion == "CREATE_MERKLE_TREE":
+        estado["merkle"] = {
+            "hash_raiz": evento.get("hash_actual"),
+            "num_archivos": metadata.get("num_archivos"),
+            "event_id": evento.get("event_id"),
+            "timestamp": evento.get("timestamp")
+        }
+    elif accion == "BLOCKCHAIN_ANCHORING":
+        estado["anclaje"] = {
+            "hash": evento.get("hash_actual"),
+            "metadata": metadata,
+            "event_id": evento.get("event_id"),
+            "timestamp": evento.get("timestamp")
+        }
+
+
+# -- lectura ---------------------------------------------------------------
+
+def cargar_snapshot(ruta_journal: str) -> Optional[Dict[str, Any]]:
+    """Snapshot de la bitácora, o None si nunca se compactó."""
+    try:
+        with open(ruta_snapshot_para(ruta_journal), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def eventos_posteriores(journal: CustodyJournal, snapshot: Optional[Dict[str, Any]]
+                        ) -> Iterator[Tuple[int, bytes, Dict[str, Any]]]:
+    """
+    (offset final, línea, evento) de la bitácora viva, omitiendo los ya
+    compactados (quedan si la compactación se interrumpió antes de vaciarla).
+    """
+    limite = snapshot["event_id"] if snapshot else 0
+    for offset, linea in journal.lineas():
+        evento = json.loads(linea)
+        if evento.get("event_id", 0) > limite:
+            yield offset, linea, evento
+
+
+def lineas_segmento(ruta: str) -> Iterator[bytes]:
+    with gzip.open(ruta, 'rb') as f:
+        for linea in f:
+            if linea.strip():
+                yield linea
+
+
+def lineas_archivadas(ruta_journal: str, snapshot: Dict[str, Any]) -> Iterator[bytes]:
+    """Líneas de todos los segmentos archivados, en orden."""
+    directorio = dir_segmentos_para(ruta_journal)
+    for segmento in snapshot["segmentos"]:
+        yield from lineas_segmento(os.path.join(directorio, segmento["archivo"]))
+
+
+def historial(ruta_journal: str, snapshot: Optional[Dict[str, Any]] = None
+              ) -> Iterator[Dict[str, Any]]:
+    """Todos los eventos en streaming: segmentos archivados y bitácora viva."""
+    if snapshot is None:
+        snapshot = cargar_snapshot(ruta_journal)
+    if snapshot:
+        for linea in lineas_archivadas(ruta_journal, snapshot):
+            yield json.loads(linea)
+    for _, _, evento in eventos_posteriores(CustodyJournal(ruta_journal), snapshot):
+        yield evento
+
+
+def verificador_desde(snapshot: Dict[str, Any]) -> ChainVerifier:
+    """Verificador posicionado al final del snapshot."""
+    return ChainVerifier(snapshot["digest"], snapshot["ultimo_evento"],
+                         num_eventos=snapshot["event_id"], sellados=snapshot["sellados"])
+
+
+def exportar_json(ruta_journal: str = JOURNAL_JSONL,
+                  ruta_json: str = CADENA_CUSTODIA_JSON,
+                  proyecto: str = PROYECTO) -> int:
+    """
+    Exporta el documento JSON completo: segmentos archivados seguidos de la
+    bitácora viva (igual que `journal.exportar_json` si no hay snapshot).
+    """
+    snapshot = cargar_snapshot(ruta_journal)
+    if snapshot is None:
+        return exportar_json_journal(ruta_journal, ruta_json, proyecto)
+
+    cabecera = dict(snapshot["cabecera"], proyecto=proyecto)
+    dir_name = os.path.dirname(ruta_json) or "."
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=dir_name)
+    try:
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+            n = escribir_documento(f, cabecera, historial(ruta_journal, snapshot))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ruta_json)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return n
+
+
+# -- compactación ----------------------------------------------------------
+
+def _escribir_atomico(ruta: str, datos: bytes) -> None:
+    dir_name = os.path.dirname(ruta) or "."
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", dir=dir_name)
+    try:
+        with os.fdopen(tmp_fd, 'wb') as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ruta)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def compactar(ruta_journal: str = JOURNAL_JSONL) -> Optional[Dict[str, Any]]:
+    """
+    Archiva los eventos de la bitácora viva en un segmento nuevo y escribe
+    el snapshot resultante. Retorna el snapshot (el anterior si no había
+    eventos nuevos). ValueError si la cadena no verifica.
+    """
+    journal = CustodyJournal(ruta_journal)
+    with journal.bloqueo():
+        anterior = cargar_snapshot(ruta_journal)
+        verificador = verificador_desde(anterior) if anterior else ChainVerifier()
+        estado = copy.deepcopy(anterior["estado"]) if anterior else estado_inicial()
+        cabecera = anterior["cabecera"] if anterior else journal.cabecera()
+
+        directorio = dir_segmentos_para(ruta_journal)
+        os.makedirs(directorio, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".jsonl.gz", dir=directorio)
+        contenido = hashlib.sha256()
+        primero = ultimo = None
+        try:
+            with os.fdopen(tmp_fd, 'wb') as f:
+                with gzip.GzipFile(fileobj=f, mode='wb', filename="", mtime=0) as gz:
+                    for _, linea, evento in eventos_posteriores(journal, anterior):
+                        if not verificador.agregar(evento):
+                            raise ValueError(f"Cadena de custodia inválida: {verificador.resultado()}")
+                        aplicar_evento(estado, evento)
+                        gz.write(linea)
+                        contenido.update(linea)
+                        primero = primero or evento
+                        ultimo = evento
+                f.flush()
+                os.fsync(f.fileno())
+            if ultimo is None:
+                os.remove(tmp_path)
+                return anterior
+
+            sha256, _ = hash_archivo(tmp_path)
+            nombre = (f"segmento_{primero['event_id']:09d}-{ultimo['event_id']:09d}"
+                      f"_{sha256[:12]}.jsonl.gz")
+            os.replace(tmp_path, os.path.join(directorio, nombre))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        segmentos = list(anterior["segmentos"]) if anterior else []
+        segmentos.append({
+            "archivo": nombre,
+            "primer_evento": primero["event_id"],
+            "ultimo_evento": ultimo["event_id"],
+            "sha256": sha256,
+            "sha256_contenido": contenido.hexdigest(),
+            "digest_final": verificador.digest
+        })
+        snapshot = {
+            "version": "1.0",
+            "creado": datetime.now(timezone.utc).isoformat(),
+            "cabecera": cabecera,
+            "event_id": ultimo["event_id"],
+            "ultimo_evento": {"event_id": ultimo["event_id"], "hash_actual": ultimo.get("hash_actual")},
+            "digest": verificador.digest,
+            "sellados": verificador.sellados,
+            "estado": estado,
+            "segmentos": segmentos
+        }
+        snapshot["hash_snapshot"] = hash_json_canonico(snapshot)
+        _escribir_atomico(ruta_snapshot_para(ruta_journal),
+                          json.dumps(snapshot, indent=2, ensure_ascii=False).encode("utf-8"))
+
+        # Sólo después de que el snapshot es durable se vacía la bitácora viva
+        _escribir_atomico(ruta_journal, b"")
+        # Import local: checkpoints depende de este módulo
+        from .checkpoints import ruta_checkpoints_para
+        ruta_checkpoints = ruta_checkpoints_para(ruta_journal)
+        if os.path.exists(ruta_checkpoints):
+            os.remove(ruta_checkpoints)
+    return snapshot
+
+
+def verificar_archivados(ruta_journal: str, snapshot: Dict[str, Any]) -> ChainVerifier:
+    """
+    Auditoría de lo archivado: comprueba hash_snapshot y el SHA-256 de cada
+    segmento y re-encadena sus eventos desde el genesis hasta el digest del
+    snapshot. Retorna el verificador (fallido o posicionado tras el snapshot).
+    """
+    verificador = ChainVerifier()
+    contenido = {k: v for k, v in snapshot.items() if k != "hash_snapshot"}
+    if hash_json_canonico(contenido) != snapshot.get("hash_snapshot"):
+        verificador.fallar(snapshot.get("event_id"), "hash_snapshot no coincide")
+        return verificador
+
+    directorio = dir_segmentos_para(ruta_journal)
+    for segmento in snapshot["segmentos"]:
+        ruta = os.path.join(directorio, segmento["archivo"])
+        if hash_archivo(ruta)[0] != segmento["sha256"]:
+            verificador.fallar(segmento["primer_evento"],
+                               f"SHA-256 del segmento {segmento['archivo']} no coincide")
+            return verificador
+        for linea in lineas_segmento(ruta):
+            if not verificador.agregar(json.loads(linea)):
+                return verificador
+        if verificador.digest != segmento["digest_final"]:
+            verificador.fallar(segmento["ultimo_evento"], "digest_final del segmento no coincide")
+            return verificador
+
+    if verificador.digest != snapshot["digest"]:
+        verificador.fallar(snapshot["event_id"], "digest del snapshot no coincide")
+    return verificador
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshots de la cadena de custodia")
+    parser.add_argument("--journal", default=JOURNAL_JSONL, help="Bitácora JSONL")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("compactar", help="Archivar la bitácora viva y escribir el snapshot")
+    sub.add_parser("estado", help="Mostrar el estado materializado")
+    args = parser.parse_args(argv)
+
+    if args.comando == "compactar":
+        snapshot = compactar(args.journal)
+        if snapshot is None:
+            print("Bitácora vacía: nada que compactar")
+        else:
+            print(f"Snapshot hasta el evento {snapshot['event_id']} "
+                  f"({len(snapshot['segmentos'])} segmentos), digest {snapshot['digest']}")
+    else:
+        snapshot = cargar_snapshot(args.journal)
+        estado = snapshot["estado"] if snapshot else estado_inicial()
+        journal = CustodyJournal(args.journal)
+        for _, _, evento in eventos_posteriores(journal, snapshot):
+            aplicar_evento(estado, evento)
+        print(json.dumps(estado, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Índice SQLite de la cadena de custodia.
+
+La bitácora JSONL sigue siendo la fuente de verdad; esta base es un índice
+derivado que se sincroniza de forma incremental (sólo las líneas nuevas,
+desde el último offset leído) y permite consultas como "todos los
+DOWNLOAD_FILE de este SHA-256" o "eventos entre dos fechas" sin cargar ni
+recorrer la cadena completa.
+
+Índices: action, timestamp, hash_actual y metadata.nombre_archivo. Cada
+fila guarda además la línea JSON original del evento, de modo que la
+exportación a cadena_custodia.json es idéntica a la de la bitácora.
+
+Si la bitácora se truncó o se reescribió (por ejemplo, al crear una cadena
+nueva) o se compactó (`custody.snapshot`), el índice se reconstruye desde
+cero, incluidos los eventos de los segmentos archivados.
+
+Uso desde línea de comandos:
+  python -m coatlicue.custody.sqlite_store sincronizar
+  python -m coatlicue.custody.sqlite_store buscar [--accion A] [--hash H] [--archivo N]
+                                                  [--desde FECHA] [--hasta FECHA] [--limite N]
+  python -m coatlicue.custody.sqlite_store exportar [--json RUTA]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .journal import (
+    CADENA_CUSTODIA_JSON, JOURNAL_JSONL, PROYECTO, VERSION, CustodyJournal,
+    escribir_documento
+)
+from .snapshot import cargar_snapshot, lineas_archivadas
+
+INDICE_SQLITE = "cadena_custodia.sqlite"
+TAMAÑO_LOTE = 10000
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    event_id INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    action TEXT,
+    hash_anterior TEXT,
+    hash_actual TEXT,
+    nombre_archivo TEXT,
+    fin INTEGER NOT NULL,
+    evento TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor
+);
+"""
+
+_INDICES = """
+CREATE INDEX IF NOT EXISTS idx_eventos_action ON eventos (action);
+CREATE INDEX IF NOT EXISTS idx_eventos_timestamp ON eventos (timestamp);
+CREATE INDEX IF NOT EXISTS idx_eventos_hash_actual ON eventos (hash_actual);
+CREATE INDEX IF NOT EXISTS idx_eventos_nombre_archivo ON eventos (nombre_archivo);
+"""
+
+
+def ruta_indice_para(ruta_journal: str) -> str:
+    """cadena_custodia.jsonl -> cadena_custodia.sqlite"""
+    base, _ = os.path.splitext(ruta_journal)
+    return base + ".sqlite"
+
+
+def _fila(fin: int, linea: bytes) -> Tuple:
+    """Fila de la tabla eventos a partir de una línea de la bitácora."""
+    texto = linea.decode("utf-8").rstrip("\n")
+    evento = json.loads(texto)
+    metadata = evento.get("metadata")
+    nombre = metadata.get("nombre_archivo") if isinstance(metadata, dict) else None
+    return (
+        evento.get("event_id"), evento.get("timestamp"), evento.get("action"),
+        evento.get("hash_anterior"), evento.get("hash_actual"), nombre, fin, texto
+    )
+
+
+class CustodyIndex:
+    """Índice consultable de los eventos de una bitácora de custodia."""
+
+    def __init__(self, ruta: str = INDICE_SQLITE, ruta_journal: str = JOURNAL_JSONL):
+        self.ruta = ruta
+        self.journal = CustodyJournal(ruta_journal)
+        self._conn = sqlite3.connect(ruta)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_ESQUEMA)
+        self._conn.executescript(_INDICES)
+        self._conn.commit()
+
+    # -- sincronización ----------------------------------------------------
+
+    def _estado(self, clave: str, defecto: Any = None) -> Any:
+        fila = self._conn.execute("SELECT valor FROM estado WHERE clave=?", (clave,)).fetchone()
+        return fila[0] if fila else defecto
+
+    def _vigente(self) -> bool:
+        """¿El último evento indexado sigue en la bitácora en el mismo offset?"""
+        fila = self._conn.execute(
+            "SELECT event_id, fin, evento FROM eventos WHERE fin > 0 "
+            "ORDER BY event_id DESC LIMIT 1").fetchone()
+        if fila is None:
+            return True
+        evento = self.journal.evento_terminado_en(fila[1])
+        return evento is not None and evento == json.loads(fila[2])
+
+    def sincronizar(self) -> int:
+        """Indexa los eventos nuevos de la bitácora. Retorna cuántos agregó."""
+        snapshot = cargar_snapshot(self.journal.ruta)
+        id_snapshot = snapshot["hash_snapshot"] if snapshot else None
+        if self._estado("snapshot") != id_snapshot or not self._vigente():
+            with self._conn:
+                self._conn.execute("DELETE FROM eventos")
+                self._conn.execute("DELETE FROM estado")
+        desde = self._estado("offset", 0)
+        # Carga inicial (índice vacío o recién reiniciado): incluye los
+        # segmentos archivados, y construir los índices al final es mucho
+        # más rápido. No depende del offset, que tras una compactación
+        # queda en 0 con la bitácora viva vacía.
+        carga_inicial = not self._estado("cargado")
+        if carga_inicial:
+            for (nombre,) in self._conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_eventos_%'"
+            ).fetchall():
+                self._conn.execute(f"DROP INDEX {nombre}")
+
+        # Eventos archivados (fin = 0) y luego la bitácora viva
+        lineas = self.journal.lineas(desde)
+        if carga_inicial and snapshot:
+            lineas = itertools.chain(((0, l) for l in lineas_archivadas(self.journal.ruta, snapshot)),
+                                     lineas)
+        n = 0
+        lote: List[Tuple] = []
+        with self._conn:
+            for fin, linea in lineas:
+                lote.append(_fila(fin, linea))
+                desde = max(desde, fin)
+                if len(lote) >= TAMAÑO_LOTE:
+                    n += self._insertar(lote)
+                    lote = []
+            n += self._insertar(lote)
+            self._conn.execute("INSERT OR REPLACE INTO estado VALUES ('offset', ?)", (desde,))
+            self._conn.execute("INSERT OR REPLACE INTO estado VALUES ('snapshot', ?)",
+                               (id_snapshot,))
+            self._conn.execute("INSERT OR REPLACE INTO estado VALUES ('cargado', 1)")
+        if carga_inicial:
+            self._conn.executescript(_INDICES)
+            self._conn.execute("ANALYZE")
+            self._conn.commit()
+        return n
+
+    def _insertar(self, lote: List[Tuple]) -> int:
+        self._conn.executemany("INSERT OR REPLACE INTO eventos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", lote)
+        return len(lote)
+
+    # -- consultas ---------------------------------------------------------
+
+    def buscar(self, accion: Optional[str] = None, hash_actual: Optional[str] = None,
+               nombre_archivo: Optional[str] = None, desde: Optional[str] = None,
+               hasta: Optional[str] = None, limite: Optional[int] = None
+               ) -> Iterator[Dict[str, Any]]:
+        """
+        Eventos que cumplen todos los filtros dados, en orden de event_id.
+        `desde` / `hasta` comparan el timestamp ISO 8601 (hasta es exclusivo),
+        por lo que aceptan prefijos como "2026-01-14".
+        """
+        condiciones, parametros = [], []
+        for columna, operador, valor in (("action", "=", accion),
+                                         ("hash_actual", "=", hash_actual),
+                                         ("nombre_archivo", "=", nombre_archivo),
+                                         ("timestamp", ">=", desde),
+                                         ("timestamp", "<", hasta)):
+            if valor is not None:
+                condiciones.append(f"{columna} {operador} ?")
+                parametros.append(valor)
+        sql = "SELECT evento FROM eventos"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += " ORDER BY event_id"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        for (texto,) in self._conn.execute(sql, parametros):
+            yield json.loads(texto)
+
+    def evento(self, event_id: int) -> Optional[Dict[str, Any]]:
+        fila = self._conn.execute("SELECT evento FROM eventos WHERE event_id=?",
+                                  (event_id,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def contar(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM eventos").fetchone()[0]
+
+    def eventos(self) -> Iterator[Dict[str, Any]]:
+        return self.buscar()
+
+    # -- exportación -------------------------------------------------------
+
+    def exportar_json(self, ruta_json: str = CADENA_CUSTODIA_JSON,
+                      proyecto: str = PROYECTO) -> int:
+        """Escribe cadena_custodia.json desde el índice (atómico)."""
+        primero = self.evento(1) or {}
+        cabecera = {
+            "version": VERSION,
+            "proyecto": proyecto,
+            "hash_genesis": primero.get("hash_actual"),
+            "inicio": primero.get("timestamp")
+        }
+        dir_name = os.path.dirname(ruta_json) or "."
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=dir_name)
+        try:
+            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+                n = escribir_documento(f, cabecera, self.eventos())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, ruta_json)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return n
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Índice SQLite de la cadena de custodia")
+    parser.add_argument("--journal", default=JOURNAL_JSONL, help="Bitácora JSONL")
+    parser.add_argument("--db", help="Base SQLite (default: junto a la bitácora)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("sincronizar", help="Indexar los eventos nuevos de la bitácora")
+    buscar = sub.add_parser("buscar", help="Consultar eventos (salida JSONL)")
+    buscar.add_argument("--accion", help="Acción (p. ej. DOWNLOAD_FILE)")
+    buscar.add_argument("--hash", help="hash_actual")
+    buscar.add_argument("--archivo", help="metadata.nombre_archivo")
+    buscar.add_argument("--desde", help="Timestamp ISO mínimo (inclusive)")
+    buscar.add_argument("--hasta", help="Timestamp ISO máximo (exclusivo)")
+    buscar.add_argument("--limite", type=int, help="Máximo de eventos")
+    exportar = sub.add_parser("exportar", help="Escribir el documento JSON")
+    exportar.add_argument("--json", default=CADENA_CUSTODIA_JSON, help="Documento JSON")
+    args = parser.parse_args(argv)
+
+    with CustodyIndex(args.db or ruta_indice_para(args.journal), args.journal) as indice:
+        n = indice.sincronizar()
+        if args.comando == "sincronizar":
+            print(f"{n} eventos indexados ({indice.contar()} en total)")
+        elif args.comando == "buscar":
+            for evento in indice.buscar(args.accion, args.hash, args.archivo,
+                                        args.desde, args.hasta, args.limite):
+                print(json.dumps(evento, ensure_ascii=False))
+        else:
+            n = indice.exportar_json(args.json)
+            print(f"{n} eventos exportados a {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
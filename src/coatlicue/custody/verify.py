@@ -0,0 +1,167 @@
+"""
+Encadenamiento criptográfico y verificación de la cadena de custodia.
+
+`hash_anterior` / `hash_actual` sólo enlazan los hashes de los archivos: el
+contenido del evento (acción, fecha, metadatos) no queda protegido. Cada
+evento nuevo lleva además `hash_evento`:
+
+    hash_evento = SHA-256( digest_anterior (32 bytes) || JSON canónico del evento )
+
+donde el JSON canónico es `coatlicue.canonical.json_canonico` del evento sin
+el propio campo `hash_evento`, y el digest anterior del primer evento es el
+hash genesis (SHA-256 de la cadena vacía).
+
+Los eventos anteriores a este esquema (sin `hash_evento`) también se
+acumulan en el digest, de modo que el primer evento sellado compromete todo
+el historial previo y cualquier edición posterior rompe la cadena. Después
+del primer evento sellado todos deben estarlo: un evento sin `hash_evento`
+tras uno sellado se rechaza (si no, bastaría editar un evento y quitar los
+sellos desde él hasta el final).
+
+El verificador recorre la bitácora JSONL en streaming (memoria constante) y
+reporta el primer enlace roto. La línea de comandos verifica la cadena
+completa, incluidos los segmentos archivados por `custody.snapshot`.
+
+Uso desde línea de comandos:
+  python -m coatlicue.custody.verify [--journal cadena_custodia.jsonl]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..canonical import json_canonico
+from .journal import JOURNAL_JSONL, CustodyJournal
+
+HASH_GENESIS = hashlib.sha256(b"").hexdigest()
+CAMPO_HASH_EVENTO = "hash_evento"
+
+
+def hash_evento(evento: Dict[str, Any], digest_anterior: str = HASH_GENESIS) -> str:
+    """Digest encadenado de un evento (se ignora su propio `hash_evento`)."""
+    contenido = {k: v for k, v in evento.items() if k != CAMPO_HASH_EVENTO}
+    h = hashlib.sha256(bytes.fromhex(digest_anterior))
+    h.update(json_canonico(contenido))
+    return h.hexdigest()
+
+
+def sellar_evento(evento: Dict[str, Any], digest_anterior: str = HASH_GENESIS) -> Dict[str, Any]:
+    """Agrega `hash_evento` al evento (como último campo) y lo retorna."""
+    evento.pop(CAMPO_HASH_EVENTO, None)
+    evento[CAMPO_HASH_EVENTO] = hash_evento(evento, digest_anterior)
+    return evento
+
+
+@dataclass
+class ResultadoVerificacion:
+    """Resultado de verificar una cadena de eventos."""
+    valida: bool
+    num_eventos: int
+    digest: str
+    sellados: int = 0
+    event_id: Optional[int] = None
+    error: Optional[str] = None
+    desde: int = 0
+
+    def __str__(self) -> str:
+        if self.valida:
+            inicio = f", verificados desde el evento {self.desde + 1}" if self.desde else ""
+            return (f"Cadena válida: {self.num_eventos} eventos "
+                    f"({self.sellados} sellados{inicio}), digest {self.digest}")
+        return f"Cadena rota en el evento {self.event_id}: {self.error}"
+
+
+class ChainVerifier:
+    """
+    Verificador incremental: `agregar()` consume un evento a la vez, por lo
+    que sirve tanto para recorrer una bitácora completa como para continuar
+    desde un estado conocido.
+    """
+
+    def __init__(self, digest: str = HASH_GENESIS, ultimo: Optional[Dict[str, Any]] = None,
+                 num_eventos: int = 0, sellados: int = 0):
+        self.digest = digest
+        self.num_eventos = num_eventos
+        self.sellados = sellados
+        self.desde = num_eventos
+        self._ultimo_id = ultimo["event_id"] if ultimo else 0
+        self._ultimo_hash = ultimo["hash_actual"] if ultimo else None
+        self.error: Optional[str] = None
+        self.event_id: Optional[int] = None
+
+    def agregar(self, evento: Dict[str, Any]) -> bool:
+        """Verifica el siguiente evento. Retorna False en el primer enlace roto."""
+        if self.error:
+            return False
+        event_id = evento.get("event_id")
+        if event_id != self._ultimo_id + 1:
+            return self.fallar(event_id, f"event_id esperado {self._ultimo_id + 1}")
+        if self._ultimo_id and evento.get("hash_anterior") != self._ultimo_hash:
+            return self.fallar(event_id, "hash_anterior no coincide con el hash_actual previo")
+
+        digest = hash_evento(evento, self.digest)
+        if CAMPO_HASH_EVENTO in evento:
+            if evento[CAMPO_HASH_EVENTO] != digest:
+                return self.fallar(event_id, "hash_evento no coincide con el contenido")
+            self.sellados += 1
+        elif self.sellados:
+            return self.fallar(event_id, "evento sin hash_evento después de eventos sellados")
+
+        self.digest = digest
+        self.num_eventos += 1
+        self._ultimo_id = event_id
+        self._ultimo_hash = evento.get("hash_actual")
+        return True
+
+    def fallar(self, event_id: Optional[int], motivo: str) -> bool:
+        self.event_id = event_id
+        self.error = motivo
+        return False
+
+    def resultado(self) -> ResultadoVerificacion:
+        return ResultadoVerificacion(
+            valida=self.error is None,
+            num_eventos=self.num_eventos,
+            digest=self.digest,
+            sellados=self.sellados,
+            event_id=self.event_id,
+            error=self.error,
+            desde=self.desde
+        )
+
+
+def verificar_eventos(eventos: Iterable[Dict[str, Any]]) -> ResultadoVerificacion:
+    """Verifica una secuencia de eventos desde el genesis, en streaming."""
+    verificador = ChainVerifier()
+    for evento in eventos:
+        if not verificador.agregar(evento):
+            break
+    return verificador.resultado()
+
+
+def verificar_journal(ruta: str = JOURNAL_JSONL) -> ResultadoVerificacion:
+    """Verifica una bitácora JSONL completa en memoria constante."""
+    return verificar_eventos(CustodyJournal(ruta).eventos())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verifica la cadena de custodia")
+    parser.add_argument("--journal", default=JOURNAL_JSONL, help="Bitácora JSONL")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    # Import local: checkpoints (y snapshot) dependen de este módulo
+    from .checkpoints import verificar_incremental
+    resultado = verificar_incremental(args.journal, completa=True, registrar=False)
+    if args.json:
+        print(json.dumps(asdict(resultado), indent=2, ensure_ascii=False))
+    else:
+        print(resultado)
+    return 0 if resultado.valida else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Backends de obtención de archivos para el Sistema Coatlicue.
+
+Todos los backends exponen la misma operación `fetch(url, ruta_destino,
+manifiesto, dir_parciales)` y el mismo resultado que `descargar_archivo`:
+(True, info) o (False, DownloadFailure). Así el motor de descargas, la
+cadena de custodia y el manifiesto no dependen de dónde vienen los bytes:
+
+- HttpBackend:   http(s) con requests (petición condicional y Range).
+- FileBackend:   URLs file:// de un directorio local.
+- MirrorBackend: sirve URLs http(s) desde un espejo local con la
+                 estructura <raiz>/<host>/<ruta> (como `wget --mirror`),
+                 para ejecuciones sin red o aisladas.
+
+`FetchRouter` elige el backend según el esquema de la URL. Con
+`algoritmos` (p. ej. sha256, sha512, sha3_256) todos los digests se
+calculan sobre el mismo flujo de bytes y se reportan en `info["hashes"]`.
+"""
+
+import mimetypes
+import os
+from email.utils import formatdate
+from typing import Any, Dict, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+from ..hashing import digests_archivo, normalizar_algoritmos
+from .partial import TAMAÑO_BLOQUE, PartialDownload, validador_http
+from .retry import ESTADOS_REINTENTABLES, DownloadFailure
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
+
+ResultadoFetch = Tuple[bool, Any]
+
+
+class FetchBackend:
+    """Interfaz común de los backends de obtención."""
+
+    algoritmos = ["sha256"]
+
+    def fetch(self, url: str, ruta_destino: str, manifiesto=None,
+              dir_parciales: Optional[str] = None) -> ResultadoFetch:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def _info_no_modificado(self, entrada: Dict[str, Any], content_type: str,
+                            ruta_destino: str) -> Dict[str, Any]:
+        """
+        Resultado para un archivo local vigente. Si el manifiesto no tiene
+        alguno de los algoritmos pedidos (configuración nueva), se calculan
+        todos en una sola lectura del archivo local.
+        """
+        hashes = dict(entrada.get("hashes") or {"sha256": entrada["hash_sha256"]})
+        if any(a not in hashes for a in self.algoritmos):
+            hashes, _ = digests_archivo(ruta_destino, self.algoritmos)
+        return {
+            "content_type": content_type,
+            "hash_sha256": entrada["hash_sha256"],
+            "hashes": {a: hashes[a] for a in self.algoritmos},
+            "tamaño": entrada["tamaño"],
+            "etag": entrada.get("etag"),
+            "last_modified": entrada.get("last_modified"),
+            "no_modificado": True,
+            "reanudado_desde": 0
+        }
+
+
+def obtener_retry_after(response) -> Optional[float]:
+    """Segundos indicados en el encabezado Retry-After, si es numérico"""
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpBackend(FetchBackend):
+    """
+    Descarga por http(s) con requests.
+
+    El hash SHA-256 y el tamaño se calculan mientras se escribe el archivo.
+    Con un manifiesto la petición es condicional y un 304 deja el archivo
+    local intacto; un `.part` interrumpido de la misma URL se reanuda con
+    Range + If-Range.
+    """
+
+    def __init__(self, session=None, algoritmos: Optional[Sequence[str]] = None):
+        # requests sólo se importa si realmente se descarga por red
+        import requests
+        self._requests = requests
+        self.session = session
+        self.algoritmos = normalizar_algoritmos(algoritmos)
+
+    def fetch(self, url, ruta_destino, manifiesto=None, dir_parciales=None):
+        requests = self._requests
+        headers = {'User-Agent': USER_AGENT}
+        cliente = self.session or requests
+        parcial = PartialDownload(ruta_destino, dir_parciales, self.algoritmos)
+
+        desde, validador = parcial.punto_reanudacion(url)
+        if desde > 0:
+            headers['Range'] = f"bytes={desde}-"
+            headers['If-Range'] = validador
+        elif manifiesto is not None:
+            headers.update(manifiesto.headers_condicionales(url, ruta_destino))
+
+        try:
+            response = cliente.get(url, headers=headers, timeout=30, stream=True)
+
+            if response.status_code == 304:
+                response.close()
+                return True, self._info_no_modificado(
+                    manifiesto.get(url), response.headers.get('content-type', 'unknown'),
+                    ruta_destino)
+
+            if response.status_code == 416 and desde > 0:
+                # El .part ya no corresponde al archivo del servidor
+                response.close()
+                parcial.descartar()
+                return self.fetch(url, ruta_destino, manifiesto, dir_parciales)
+
+            response.raise_for_status()
+
+            # Reanudar sólo si el servidor respondió con el rango pedido;
+            # un 200 significa que el archivo cambió o que no admite Range.
+            content_range = response.headers.get('content-range', '')
+            if response.status_code != 206 or not content_range.startswith(f"bytes {desde}-"):
+                desde = 0
+
+            parcial.iniciar(url, validador_http(response.headers), desde)
+            try:
+                for chunk in response.iter_content(chunk_size=8192):
+                    parcial.escribir(chunk)
+            except Exception:
+                parcial.interrumpir()
+                raise
+            hash_archivo, tamaño = parcial.finalizar()
+
+            return True, {
+                "content_type": response.headers.get('content-type', 'unknown'),
+                "hash_sha256": hash_archivo,
+                "hashes": parcial.hashes,
+                "tamaño": tamaño,
+                "etag": response.headers.get('etag'),
+                "last_modified": response.headers.get('last-modified'),
+                "no_modificado": False,
+                "reanudado_desde": parcial.reanudado_desde
+            }
+        except requests.HTTPError as e:
+            estado = e.response.status_code if e.response is not None else None
+            return False, DownloadFailure(
+                str(e),
+                reintentable=estado is None or estado in ESTADOS_REINTENTABLES,
+                retry_after=obtener_retry_after(e.response)
+            )
+        except Exception as e:
+            return False, DownloadFailure(str(e))
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+class FileBackend(FetchBackend):
+    """
+    Copia archivos locales (URLs file://) a velocidad de disco.
+
+    El ETag se deriva del tamaño y el mtime del origen, de modo que el
+    manifiesto funciona igual que con HTTP: un origen sin cambios produce
+    un resultado `no_modificado` sin copiar ningún byte.
+    """
+
+    def __init__(self, algoritmos: Optional[Sequence[str]] = None):
+        self.algoritmos = normalizar_algoritmos(algoritmos)
+
+    def ruta_origen(self, url: str) -> str:
+        return unquote(urlparse(url).path)
+
+    def fetch(self, url, ruta_destino, manifiesto=None, dir_parciales=None):
+        origen = self.ruta_origen(url)
+        try:
+            st = os.stat(origen)
+        except FileNotFoundError:
+            return False, DownloadFailure(f"No existe {origen} ({url})", reintentable=False)
+        except OSError as e:
+            return False, DownloadFailure(str(e))
+
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        content_type = mimetypes.guess_type(origen)[0] or 'application/octet-stream'
+
+        if manifiesto is not None:
+            condicion = manifiesto.headers_condicionales(url, ruta_destino)
+            if condicion.get("If-None-Match") == etag:
+                return True, self._info_no_modificado(manifiesto.get(url), content_type,
+                                                      ruta_destino)
+
+        parcial = PartialDownload(ruta_destino, dir_parciales, self.algoritmos)
+        try:
+            parcial.iniciar(url, None)
+            try:
+                with open(origen, 'rb') as f:
+                    for bloque in iter(lambda: f.read(TAMAÑO_BLOQUE), b""):
+                        parcial.escribir(bloque)
+            except Exception:
+                parcial.descartar()
+                raise
+            hash_archivo, tamaño = parcial.finalizar()
+        except Exception as e:
+            return False, DownloadFailure(str(e))
+
+        return True, {
+            "content_type": content_type,
+            "hash_sha256": hash_archivo,
+            "hashes": parcial.hashes,
+            "tamaño": tamaño,
+            "etag": etag,
+            "last_modified": last_modified,
+            "no_modificado": False,
+            "reanudado_desde": 0
+        }
+
+
+class MirrorBackend(FileBackend):
+    """Resuelve URLs http(s) contra un espejo local <raiz>/<host>/<ruta>."""
+
+    def __init__(self, raiz: str, algoritmos: Optional[Sequence[str]] = None):
+        super().__init__(algoritmos)
+        self.raiz = raiz
+
+    def ruta_origen(self, url: str) -> str:
+        parsed = urlparse(url)
+        ruta = unquote(parsed.path).lstrip("/")
+        return os.path.join(self.raiz, parsed.netloc, *ruta.split("/"))
+
+
+class FetchRouter(FetchBackend):
+    """Despacha cada URL al backend registrado para su esquema."""
+
+    def __init__(self, backends: Dict[str, FetchBackend]):
+        self.backends = backends
+
+    def fetch(self, url, ruta_destino, manifiesto=None, dir_parciales=None):
+        esquema = urlparse(url).scheme.lower() or "file"
+        backend = self.backends.get(esquema)
+        if backend is None:
+            return False, DownloadFailure(f"Esquema no soportado: {esquema} ({url})",
+                                          reintentable=False)
+        return backend.fetch(url, ruta_destino, manifiesto, dir_parciales)
+
+    def close(self):
+        for backend in {id(b): b for b in self.backends.values()}.values():
+            backend.close()
+
+
+def crear_router(session=None, espejo: Optional[str] = None,
+                 algoritmos: Optional[Sequence[str]] = None) -> FetchRouter:
+    """
+    Router por defecto: file:// siempre local; http(s) por red, o desde el
+    espejo local si se indica `espejo` (sin tocar la red).
+    """
+    if espejo:
+        remoto = MirrorBackend(espejo, algoritmos)
+    else:
+        remoto = HttpBackend(session, algoritmos)
+    return FetchRouter({"http": remoto, "https": remoto, "file": FileBackend(algoritmos)})
@@ -0,0 +1,212 @@
+"""
+Descubrimiento de enlaces de descarga en las páginas del catálogo de gob.mx.
+
+Analiza el HTML con un parser incremental (html.parser) a medida que llega
+la respuesta, y extrae los enlaces a formatos (.pdf, .docx, .xlsx, ...) con
+su texto visible. Cada página se guarda en caché por ETag/Last-Modified, de
+modo que una página sin cambios cuesta un 304 y ningún análisis.
+
+enlaces_descarga.json sólo se reescribe cuando cambia el conjunto de
+enlaces; un cambio de orden no cuenta como cambio.
+
+Uso desde línea de comandos:
+  python -m coatlicue.downloads.discovery [--pagina URL ...] [--enlaces RUTA]
+"""
+
+import argparse
+import codecs
+import json
+import os
+import sys
+import tempfile
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlparse
+
+PAGINA_CATALOGO = ("https://www.gob.mx/buengobierno/documentos/formatos-guias-e-instructivos-"
+                   "de-los-terminos-de-referencia-para-auditorias-de-los-estados-y-la-"
+                   "informacion-financiera-contable-y-presupues")
+ENLACES_JSON = "enlaces_descarga.json"
+CACHE_JSON = "descubrimiento_cache.json"
+EXTENSIONES = (".pdf", ".doc", ".docx", ".xls", ".xlsx", ".zip")
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"
+
+
+class LinkExtractor(HTMLParser):
+    """Parser incremental que recolecta enlaces a formatos y su texto."""
+
+    def __init__(self, base_url: str, extensiones=EXTENSIONES):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.extensiones = extensiones
+        self.enlaces: List[Dict[str, str]] = []
+        self._vistos = set()
+        self._href_actual: Optional[str] = None
+        self._texto_actual: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        href = dict(attrs).get("href")
+        if not href:
+            return
+        url = urljoin(self.base_url, href.strip())
+        if urlparse(url).path.lower().endswith(self.extensiones):
+            self._href_actual = url
+            self._texto_actual = []
+
+    def handle_data(self, data):
+        if self._href_actual is not None:
+            self._texto_actual.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != "a" or self._href_actual is None:
+            return
+        url = self._href_actual
+        texto = " ".join("".join(self._texto_actual).split())
+        self._href_actual = None
+
+        if url not in self._vistos:
+            self._vistos.add(url)
+            self.enlaces.append({"text": texto, "url": url})
+
+
+def extraer_enlaces(fragmentos: Iterable[bytes], base_url: str,
+                    encoding: str = "utf-8") -> List[Dict[str, str]]:
+    """Extrae los enlaces de un HTML recibido por fragmentos de bytes."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    parser = LinkExtractor(base_url)
+    for fragmento in fragmentos:
+        parser.feed(decoder.decode(fragmento))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.enlaces
+
+
+def _cargar_json(ruta: str, defecto: Any) -> Any:
+    if not os.path.exists(ruta):
+        return defecto
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _guardar_json_atomico(ruta: str, datos: Any) -> None:
+    dir_name = os.path.dirname(ruta) or "."
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=dir_name)
+    try:
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, ruta)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _conjunto(enlaces: List[Dict[str, str]]):
+    return {(e["url"], e["text"]) for e in enlaces}
+
+
+def descubrir_pagina(url: str, cache: Dict[str, Any], session=None) -> Dict[str, Any]:
+    """
+    Obtiene los enlaces de una página, usando la caché si el servidor
+    responde 304. Actualiza `cache[url]` y retorna {"enlaces", "sin_cambios"}.
+    """
+    if session is None:
+        import requests
+        session = requests
+    headers = {'User-Agent': USER_AGENT}
+    entrada = cache.get(url)
+    if entrada:
+        if entrada.get("etag"):
+            headers["If-None-Match"] = entrada["etag"]
+        if entrada.get("last_modified"):
+            headers["If-Modified-Since"] = entrada["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=30, stream=True)
+    try:
+        if response.status_code == 304 and entrada:
+            return {"enlaces": entrada["enlaces"], "sin_cambios": True}
+
+        response.raise_for_status()
+        # Sin charset explícito, requests asume ISO-8859-1; gob.mx sirve UTF-8
+        encoding = "utf-8"
+        if "charset=" in response.headers.get('content-type', '').lower():
+            encoding = response.encoding
+        enlaces = extraer_enlaces(response.iter_content(chunk_size=16384),
+                                  response.url or url, encoding)
+    finally:
+        response.close()
+
+    cache[url] = {
+        "etag": response.headers.get('etag'),
+        "last_modified": response.headers.get('last-modified'),
+        "enlaces": enlaces
+    }
+    return {"enlaces": enlaces, "sin_cambios": False}
+
+
+def descubrir_enlaces(paginas: List[str], ruta_enlaces: str = ENLACES_JSON,
+                      ruta_cache: str = CACHE_JSON, session=None) -> Dict[str, Any]:
+    """
+    Regenera la lista de enlaces a partir de las páginas del catálogo.
+
+    Retorna un resumen con el número de enlaces, las URLs agregadas y
+    eliminadas, las páginas sin cambios y si se reescribió la lista.
+    """
+    cache = _cargar_json(ruta_cache, {})
+    enlaces: List[Dict[str, str]] = []
+    vistos = set()
+    paginas_sin_cambios = 0
+
+    for pagina in paginas:
+        resultado = descubrir_pagina(pagina, cache, session)
+        paginas_sin_cambios += int(resultado["sin_cambios"])
+        for enlace in resultado["enlaces"]:
+            if enlace["url"] not in vistos:
+                vistos.add(enlace["url"])
+                enlaces.append(enlace)
+
+    actuales = _cargar_json(ruta_enlaces, [])
+    urls_actuales = {e["url"] for e in actuales}
+    cambiado = _conjunto(enlaces) != _conjunto(actuales)
+
+    if cambiado:
+        _guardar_json_atomico(ruta_enlaces, enlaces)
+    if paginas_sin_cambios < len(paginas):
+        _guardar_json_atomico(ruta_cache, cache)
+
+    return {
+        "num_enlaces": len(enlaces),
+        "agregados": [e["url"] for e in enlaces if e["url"] not in urls_actuales],
+        "eliminados": sorted(urls_actuales - vistos),
+        "paginas_sin_cambios": paginas_sin_cambios,
+        "cambiado": cambiado
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Descubrimiento de enlaces de formatos")
+    parser.add_argument("--pagina", action="append",
+                        help="Página del catálogo (se puede repetir)")
+    parser.add_argument("--enlaces", default=ENLACES_JSON, help="Lista de enlaces a regenerar")
+    parser.add_argument("--cache", default=CACHE_JSON, help="Caché de páginas")
+    args = parser.parse_args(argv)
+
+    resumen = descubrir_enlaces(args.pagina or [PAGINA_CATALOGO], args.enlaces, args.cache)
+
+    print(f"Enlaces encontrados: {resumen['num_enlaces']}")
+    print(f"Páginas sin cambios (304): {resumen['paginas_sin_cambios']}")
+    for url in resumen["agregados"]:
+        print(f"  + {url}")
+    for url in resumen["eliminados"]:
+        print(f"  - {url}")
+    print(f"{args.enlaces}: {'actualizado' if resumen['cambiado'] else 'sin cambios'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Motor de descarga concurrente para el Sistema Coatlicue.
+
+Ejecuta las descargas de formatos con un número acotado de trabajadores,
+un límite de cortesía por host y un pool de conexiones compartido (la
+función de descarga recibe la misma sesión en todos los hilos).
+
+Los resultados se devuelven en el mismo orden que las tareas de entrada,
+sin importar el orden en que terminen, para que los eventos de la cadena
+de custodia se agreguen siempre en el orden del catálogo.
+
+Los fallos transitorios se reintentan según una RetryPolicy; mientras una
+tarea espera su siguiente intento no ocupa ningún trabajador, de modo que
+los reintentos no bloquean las descargas sanas. Cada host tiene su propio
+CircuitBreaker: mientras está abierto las tareas de ese host esperan a que
+admita una prueba, sin gastar intentos; los fallos permanentes (p. ej. 404)
+no lo modifican.
+"""
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .retry import CircuitBreaker, DownloadFailure, RetryPolicy
+
+# Segundos entre consultas al cortacircuitos mientras otra tarea hace la
+# petición de prueba (el circuito semiabierto no tiene tiempo restante).
+SONDEO_CIRCUITO = 0.05
+
+
+@dataclass
+class DownloadTask:
+    """Una descarga pendiente: URL de origen y ruta de destino."""
+    url: str
+    destino: str
+    descripcion: str = ""
+    nombre_archivo: str = ""
+
+
+@dataclass
+class DownloadResult:
+    """Resultado de una descarga, en el orden de la tarea original."""
+    task: DownloadTask
+    exito: bool
+    info: Any  # content-type (o datos de la descarga) si hubo éxito, fallo si no
+    segundos: float = 0.0  # Tiempo total, incluyendo esperas entre intentos
+    intentos: int = 1
+    latencias: List[float] = field(default_factory=list)  # Duración de cada intento
+
+
+@dataclass
+class _HostState:
+    """Estado de cortesía de un host: concurrencia y último inicio."""
+    semaforo: asyncio.Semaphore
+    circuito: CircuitBreaker
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    ultimo_inicio: float = float("-inf")
+
+
+# Firma de la función de descarga: fetch(url, destino) -> (exito, info)
+FetchFn = Callable[[str, str], Tuple[bool, Any]]
+
+
+class ConcurrentDownloader:
+    """
+    Descarga un lote de tareas en paralelo.
+
+    - max_workers: número máximo de descargas simultáneas en total.
+    - max_por_host: número máximo de descargas simultáneas contra un mismo host.
+    - intervalo_host: segundos mínimos entre dos inicios contra el mismo host.
+    - politica: RetryPolicy de reintentos (por omisión, un solo intento).
+    - crear_circuito: fábrica del CircuitBreaker de cada host.
+
+    La función `fetch` es bloqueante (p. ej. requests) y se ejecuta en un
+    pool de hilos propio; el bucle asyncio sólo coordina los límites.
+    """
+
+    def __init__(self, fetch: FetchFn, max_workers: int = 8,
+                 max_por_host: int = 2, intervalo_host: float = 0.5,
+                 politica: Optional[RetryPolicy] = None,
+                 crear_circuito: Callable[[], CircuitBreaker] = CircuitBreaker,
+                 rng: Optional[random.Random] = None):
+        if max_workers < 1:
+            raise ValueError("max_workers debe ser al menos 1")
+        if max_por_host < 1:
+            raise ValueError("max_por_host debe ser al menos 1")
+
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.max_por_host = max_por_host
+        self.intervalo_host = max(0.0, intervalo_host)
+        self.politica = politica or RetryPolicy(max_intentos=1)
+        self.crear_circuito = crear_circuito
+        self.rng = rng or random.Random()
+
+    def run(self, tasks: List[DownloadTask]) -> List[DownloadResult]:
+        """Ejecuta todas las tareas y retorna los resultados en orden de entrada."""
+        if not tasks:
+            return []
+        return asyncio.run(self.run_async(tasks))
+
+    async def run_async(self, tasks: List[DownloadTask]) -> List[DownloadResult]:
+        """Versión asíncrona de `run`, para integrarse en un bucle existente."""
+        self._global = asyncio.Semaphore(self.max_workers)
+        self._hosts: Dict[str, _HostState] = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                      thread_name_prefix="descarga")
+        try:
+            # gather conserva el orden de las corrutinas, no el de finalización
+            return await asyncio.gather(*(self._run_one(t, executor) for t in tasks))
+        finally:
+            executor.shutdown(wait=True)
+
+    def _host_state(self, url: str) -> _HostState:
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(asyncio.Semaphore(self.max_por_host),
+                                           self.crear_circuito())
+        return self._hosts[host]
+
+    async def _esperar_turno_host(self, estado: _HostState) -> None:
+        """Respeta el intervalo mínimo entre inicios contra el mismo host."""
+        loop = asyncio.get_running_loop()
+        async with estado.lock:
+            espera = estado.ultimo_inicio + self.intervalo_host - loop.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            estado.ultimo_inicio = loop.time()
+
+    async def _run_one(self, task: DownloadTask,
+                       executor: ThreadPoolExecutor) -> DownloadResult:
+        estado = self._host_state(task.url)
+        inicio_total = time.monotonic()
+        latencias: List[float] = []
+        intento = 0
+
+        while True:
+            intento += 1
+            exito, info = await self._intentar(task, estado, executor, latencias)
+            if exito or not self.politica.debe_reintentar(intento, info):
+                return DownloadResult(task, exito, info, time.monotonic() - inicio_total,
+                                      intento, latencias)
+
+            # Espera fuera de los semáforos: el trabajador queda libre
+            espera = max(self.politica.espera(intento, self.rng),
+                         getattr(info, "retry_after", None) or 0.0,
+                         estado.circuito.segundos_restantes())
+            await asyncio.sleep(espera)
+
+    async def _intentar(self, task: DownloadTask, estado: _HostState,
+                        executor: ThreadPoolExecutor,
+                        latencias: List[float]) -> Tuple[bool, Any]:
+        """
+        Un intento de descarga, respetando límites y el cortacircuitos.
+
+        Si el circuito del host está abierto se espera, fuera de los
+        semáforos, hasta que admita una prueba; esa espera no es un intento.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Primero el límite y el intervalo por host, para no ocupar un
+        # trabajador global mientras se espera turno en un host saturado.
+        while True:
+            await estado.semaforo.acquire()
+            if estado.circuito.permitir():
+                break
+            estado.semaforo.release()
+            await asyncio.sleep(max(estado.circuito.segundos_restantes(), SONDEO_CIRCUITO))
+
+        try:
+            await self._esperar_turno_host(estado)
+            async with self._global:
+                inicio = time.monotonic()
+                try:
+                    exito, info = await loop.run_in_executor(
+                        executor, self.fetch, task.url, task.destino)
+                except Exception as e:
+                    exito, info = False, DownloadFailure(str(e))
+                latencias.append(time.monotonic() - inicio)
+        finally:
+            estado.semaforo.release()
+
+        if exito:
+            estado.circuito.registrar_exito()
+        elif getattr(info, "reintentable", True):
+            estado.circuito.registrar_fallo()
+        else:
+            # Un fallo permanente (p. ej. 404) no dice nada del host: sólo
+            # se libera la prueba reservada, si la había.
+            estado.circuito.liberar_prueba()
+        return exito, info
@@ -0,0 +1,100 @@
+"""
+Manifiesto local de descargas para re-descarga incremental.
+
+Guarda por URL los validadores HTTP (ETag, Last-Modified) junto con el
+tamaño y el SHA-256 del archivo descargado. En ejecuciones posteriores
+permite enviar If-None-Match / If-Modified-Since: un archivo sin cambios
+cuesta una respuesta 304 en lugar de una transferencia completa.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+
+class DownloadManifest:
+    """Validadores HTTP, tamaño y hash SHA-256 de cada URL descargada."""
+
+    VERSION = "1.0"
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.entradas: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            self.entradas = datos.get("entradas", {})
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Retorna la entrada registrada para una URL, si existe."""
+        return self.entradas.get(url)
+
+    def headers_condicionales(self, url: str, ruta_destino: str) -> Dict[str, str]:
+        """
+        Encabezados para una petición condicional.
+
+        Sólo se envían si el archivo local sigue existiendo con el tamaño
+        registrado; de lo contrario un 304 dejaría al sistema sin el archivo.
+        """
+        entrada = self.entradas.get(url)
+        if not entrada:
+            return {}
+
+        try:
+            if os.path.getsize(ruta_destino) != entrada.get("tamaño"):
+                return {}
+        except OSError:
+            return {}
+
+        headers = {}
+        if entrada.get("etag"):
+            headers["If-None-Match"] = entrada["etag"]
+        if entrada.get("last_modified"):
+            headers["If-Modified-Since"] = entrada["last_modified"]
+        return headers
+
+    def actualizar(self, url: str, nombre_archivo: str, hash_sha256: str,
+                   tamaño: int, etag: Optional[str] = None,
+                   last_modified: Optional[str] = None,
+                   hashes: Optional[Dict[str, str]] = None) -> None:
+        """Registra (o reemplaza) la entrada de una URL tras una descarga."""
+        self.entradas[url] = {
+            "nombre_archivo": nombre_archivo,
+            "hash_sha256": hash_sha256,
+            "hashes": hashes or {"sha256": hash_sha256},
+            "tamaño": tamaño,
+            "etag": etag,
+            "last_modified": last_modified,
+            "actualizado": datetime.now(timezone.utc).isoformat()
+        }
+
+    def marcar_verificado(self, url: str, hashes: Optional[Dict[str, str]] = None) -> None:
+        """
+        Actualiza la fecha de la última verificación de una entrada sin
+        cambios y agrega los digests de algoritmos que aún no tenía.
+        """
+        if url in self.entradas:
+            entrada = self.entradas[url]
+            entrada["verificado"] = datetime.now(timezone.utc).isoformat()
+            if hashes:
+                entrada["hashes"] = {**entrada.get("hashes", {}), **hashes}
+
+    def guardar(self) -> None:
+        """Guarda el manifiesto de forma atómica (temporal + rename)."""
+        datos = {"version": self.VERSION, "entradas": self.entradas}
+
+        dir_name = os.path.dirname(self.ruta) or "."
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=dir_name)
+        try:
+            with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, indent=2, ensure_ascii=False, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.ruta)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
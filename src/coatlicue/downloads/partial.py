@@ -0,0 +1,131 @@
+"""
+Descargas parciales reanudables para el Sistema Coatlicue.
+
+Cada descarga se escribe primero en un archivo `.part` (en cuarentena, fuera
+del nombre definitivo) junto con un pequeño archivo de metadatos con la URL
+y el validador HTTP (ETag fuerte o Last-Modified). Si la transferencia se
+interrumpe, la siguiente ejecución puede pedir sólo los bytes faltantes con
+`Range` + `If-Range`. El archivo se renombra de forma atómica al nombre
+final únicamente cuando el digest está completo.
+"""
+
+import json
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+from ..hashing import ALGORITMO, MultiHasher
+
+TAMAÑO_BLOQUE = 1024 * 1024
+
+
+class PartialDownload:
+    """Archivo `.part` de una descarga, con hash incremental y cierre atómico."""
+
+    def __init__(self, ruta_destino: str, dir_parciales: Optional[str] = None,
+                 algoritmos: Sequence[str] = (ALGORITMO,)):
+        self.ruta_destino = ruta_destino
+        self.algoritmos = list(algoritmos)
+        nombre = os.path.basename(ruta_destino) + ".part"
+        directorio = dir_parciales or os.path.dirname(ruta_destino) or "."
+        self.ruta_parcial = os.path.join(directorio, nombre)
+        self.ruta_meta = self.ruta_parcial + ".json"
+
+        self._archivo = None
+        self._hash = None
+        self.tamaño = 0
+        self.reanudado_desde = 0
+        self.hashes: Dict[str, str] = {}
+
+    def punto_reanudacion(self, url: str) -> Tuple[int, Optional[str]]:
+        """
+        Retorna (bytes ya descargados, validador) si existe un `.part` de la
+        misma URL con validador conocido; (0, None) en caso contrario.
+        """
+        try:
+            with open(self.ruta_meta, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            tamaño = os.path.getsize(self.ruta_parcial)
+        except (OSError, ValueError):
+            return 0, None
+
+        if meta.get("url") != url or not meta.get("validador") or tamaño == 0:
+            return 0, None
+        return tamaño, meta["validador"]
+
+    def iniciar(self, url: str, validador: Optional[str], desde: int = 0) -> None:
+        """
+        Abre el `.part` para escritura. Con `desde` > 0 se conserva el
+        prefijo existente y se incorpora al hash antes de continuar.
+        """
+        os.makedirs(os.path.dirname(self.ruta_parcial) or ".", exist_ok=True)
+        self._hash = MultiHasher(self.algoritmos)
+
+        if desde > 0:
+            # El prefijo ya descargado se lee una sola vez para el hash
+            with open(self.ruta_parcial, 'rb') as f:
+                restante = desde
+                while restante > 0:
+                    bloque = f.read(min(TAMAÑO_BLOQUE, restante))
+                    if not bloque:
+                        break
+                    self._hash.update(bloque)
+                    restante -= len(bloque)
+            self._archivo = open(self.ruta_parcial, 'r+b')
+            self._archivo.truncate(desde)
+            self._archivo.seek(desde)
+        else:
+            self._archivo = open(self.ruta_parcial, 'wb')
+
+        self.tamaño = desde
+        self.reanudado_desde = desde
+
+        with open(self.ruta_meta, 'w', encoding='utf-8') as f:
+            json.dump({"url": url, "validador": validador}, f, ensure_ascii=False)
+
+    def escribir(self, chunk: bytes) -> None:
+        """Escribe un bloque y lo incorpora al hash."""
+        self._archivo.write(chunk)
+        self._hash.update(chunk)
+        self.tamaño += len(chunk)
+
+    def finalizar(self) -> Tuple[str, int]:
+        """
+        Sincroniza el `.part` a disco y lo renombra atómicamente al nombre
+        final. Retorna (hash del primer algoritmo, tamaño); todos los
+        digests quedan en `self.hashes`.
+        """
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._archivo.close()
+        self._archivo = None
+
+        os.makedirs(os.path.dirname(self.ruta_destino) or ".", exist_ok=True)
+        os.replace(self.ruta_parcial, self.ruta_destino)
+        self._eliminar_meta()
+        self.hashes = self._hash.hexdigests()
+        return self.hashes[self.algoritmos[0]], self.tamaño
+
+    def interrumpir(self) -> None:
+        """Cierra el `.part` dejándolo en cuarentena para reanudar después."""
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def descartar(self) -> None:
+        """Elimina el `.part` y sus metadatos."""
+        self.interrumpir()
+        for ruta in (self.ruta_parcial, self.ruta_meta):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def _eliminar_meta(self) -> None:
+        if os.path.exists(self.ruta_meta):
+            os.remove(self.ruta_meta)
+
+
+def validador_http(headers) -> Optional[str]:
+    """ETag fuerte o, en su defecto, Last-Modified; válidos para If-Range."""
+    etag = headers.get('etag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('last-modified')
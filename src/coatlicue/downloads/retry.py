@@ -0,0 +1,112 @@
+"""
+Política de reintentos y cortacircuitos por host para las descargas.
+
+- RetryPolicy: número de intentos y espera exponencial con jitter.
+- CircuitBreaker: deja de enviar peticiones a un host después de varios
+  fallos consecutivos y sólo permite una petición de prueba al terminar el
+  periodo de enfriamiento.
+- DownloadFailure: fallo de descarga que indica si vale la pena reintentar.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# Estados HTTP transitorios que justifican un reintento
+ESTADOS_REINTENTABLES = {408, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class DownloadFailure:
+    """Fallo de una descarga; se imprime como su mensaje."""
+    mensaje: str
+    reintentable: bool = True
+    retry_after: Optional[float] = None  # Segundos sugeridos por el servidor
+
+    def __str__(self) -> str:
+        return self.mensaje
+
+
+@dataclass
+class RetryPolicy:
+    """Intentos máximos y espera exponencial con jitter entre intentos."""
+    max_intentos: int = 4
+    espera_base: float = 1.0
+    factor: float = 2.0
+    espera_maxima: float = 30.0
+    jitter: float = 0.5  # Fracción de la espera que se aleatoriza
+
+    def espera(self, intento: int, rng: Optional[random.Random] = None) -> float:
+        """Segundos a esperar después del intento número `intento` (1, 2, ...)."""
+        rng = rng or random
+        base = min(self.espera_maxima, self.espera_base * self.factor ** (intento - 1))
+        return base * (1 - self.jitter) + rng.uniform(0, base * self.jitter)
+
+    def debe_reintentar(self, intento: int, fallo) -> bool:
+        """Indica si un fallo en el intento `intento` debe reintentarse."""
+        if intento >= self.max_intentos:
+            return False
+        return getattr(fallo, "reintentable", True)
+
+
+class CircuitBreaker:
+    """
+    Cortacircuitos de un host.
+
+    CERRADO: las peticiones pasan. Tras `umbral_fallos` fallos consecutivos
+    pasa a ABIERTO y rechaza peticiones durante `enfriamiento` segundos.
+    Después queda SEMIABIERTO: se permite una sola petición de prueba; si
+    tiene éxito se cierra, si falla se vuelve a abrir.
+    """
+
+    CERRADO = "CERRADO"
+    ABIERTO = "ABIERTO"
+    SEMIABIERTO = "SEMIABIERTO"
+
+    def __init__(self, umbral_fallos: int = 5, enfriamiento: float = 30.0,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.reloj = reloj
+
+        self.estado = self.CERRADO
+        self.fallos_consecutivos = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+
+    def permitir(self) -> bool:
+        """Indica si se puede enviar una petición ahora (y reserva la prueba)."""
+        if self.estado == self.ABIERTO:
+            if self.reloj() - self._abierto_desde < self.enfriamiento:
+                return False
+            self.estado = self.SEMIABIERTO
+
+        if self.estado == self.SEMIABIERTO:
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+
+        return True
+
+    def segundos_restantes(self) -> float:
+        """Segundos hasta que el circuito admita una petición de prueba."""
+        if self.estado != self.ABIERTO:
+            return 0.0
+        return max(0.0, self.enfriamiento - (self.reloj() - self._abierto_desde))
+
+    def registrar_exito(self) -> None:
+        self.estado = self.CERRADO
+        self.fallos_consecutivos = 0
+        self._prueba_en_curso = False
+
+    def liberar_prueba(self) -> None:
+        """Libera la prueba reservada sin cambiar el estado (fallo que no es del host)."""
+        self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        self.fallos_consecutivos += 1
+        if self.estado == self.SEMIABIERTO or self.fallos_consecutivos >= self.umbral_fallos:
+            self.estado = self.ABIERTO
+            self._abierto_desde = self.reloj()
+        self._prueba_en_curso = False
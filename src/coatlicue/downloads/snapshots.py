@@ -0,0 +1,165 @@
+"""
+Historial de snapshots del catálogo de formatos.
+
+Cada ejecución de la descarga queda registrada como un manifiesto inmutable
+(URL -> nombre -> SHA-256 -> tamaño -> timestamp). Comparar dos snapshots
+es una pasada O(n) sobre diccionarios indexados por URL, sin volver a leer
+ni a hashear ningún archivo.
+
+Uso desde línea de comandos:
+  python -m coatlicue.downloads.snapshots list
+  python -m coatlicue.downloads.snapshots diff ANTERIOR NUEVO [--json]
+"""
+
+import argparse
+import json
+import os
+import stat
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from ..canonical import hash_json_canonico
+
+DIR_SNAPSHOTS = "snapshots"
+PREFIJO = "snapshot_"
+
+
+def crear_snapshot(entradas: List[Dict[str, Any]], dir_snapshots: str = DIR_SNAPSHOTS,
+                   fecha: Optional[datetime] = None) -> str:
+    """
+    Escribe un snapshot inmutable y retorna su ruta.
+
+    Cada entrada debe tener: url, nombre, hash_sha256, tamaño, timestamp.
+    El archivo se crea sin sobrescribir ninguno existente y queda de sólo
+    lectura; su `hash_snapshot` es el SHA-256 canónico de las entradas.
+    """
+    fecha = fecha or datetime.now(timezone.utc)
+    entradas = sorted(entradas, key=lambda e: e["url"])
+    snapshot = {
+        "version": "1.0",
+        "fecha": fecha.isoformat(),
+        "num_entradas": len(entradas),
+        "hash_snapshot": hash_json_canonico(entradas),
+        "entradas": entradas
+    }
+
+    os.makedirs(dir_snapshots, exist_ok=True)
+    ruta = os.path.join(dir_snapshots, f"{PREFIJO}{fecha.strftime('%Y%m%dT%H%M%S%fZ')}.json")
+
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="tmp_", suffix=".json", dir=dir_snapshots)
+    try:
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        # link() falla si el destino existe: un snapshot nunca se reescribe
+        os.link(tmp_path, ruta)
+    finally:
+        os.remove(tmp_path)
+
+    os.chmod(ruta, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    return ruta
+
+
+def cargar_snapshot(ruta: str) -> Dict[str, Any]:
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def listar_snapshots(dir_snapshots: str = DIR_SNAPSHOTS) -> List[str]:
+    """Rutas de los snapshots en orden cronológico."""
+    if not os.path.isdir(dir_snapshots):
+        return []
+    nombres = sorted(n for n in os.listdir(dir_snapshots)
+                     if n.startswith(PREFIJO) and n.endswith(".json"))
+    return [os.path.join(dir_snapshots, n) for n in nombres]
+
+
+def ultimo_snapshot(dir_snapshots: str = DIR_SNAPSHOTS) -> Optional[str]:
+    snapshots = listar_snapshots(dir_snapshots)
+    return snapshots[-1] if snapshots else None
+
+
+def diff_snapshots(anterior: Dict[str, Any], nuevo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compara dos snapshots en O(n) por URL.
+
+    Retorna listas de formatos agregados, eliminados y modificados (hash
+    distinto), más el número de formatos sin cambios.
+    """
+    previas = {e["url"]: e for e in anterior.get("entradas", [])}
+    actuales = {e["url"]: e for e in nuevo.get("entradas", [])}
+
+    agregados = []
+    modificados = []
+    sin_cambios = 0
+
+    for url, entrada in actuales.items():
+        previa = previas.get(url)
+        if previa is None:
+            agregados.append({"url": url, "nombre": entrada["nombre"],
+                              "hash_sha256": entrada["hash_sha256"]})
+        elif previa["hash_sha256"] != entrada["hash_sha256"]:
+            modificados.append({
+                "url": url,
+                "nombre": entrada["nombre"],
+                "hash_anterior": previa["hash_sha256"],
+                "hash_nuevo": entrada["hash_sha256"],
+                "tamaño_anterior": previa.get("tamaño"),
+                "tamaño_nuevo": entrada.get("tamaño")
+            })
+        else:
+            sin_cambios += 1
+
+    eliminados = [{"url": url, "nombre": e["nombre"], "hash_sha256": e["hash_sha256"]}
+                  for url, e in previas.items() if url not in actuales]
+
+    return {
+        "agregados": agregados,
+        "eliminados": eliminados,
+        "modificados": modificados,
+        "sin_cambios": sin_cambios
+    }
+
+
+def hay_cambios(diff: Dict[str, Any]) -> bool:
+    return bool(diff["agregados"] or diff["eliminados"] or diff["modificados"])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshots del catálogo de formatos")
+    parser.add_argument("--dir", default=DIR_SNAPSHOTS, help="Directorio de snapshots")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    sub.add_parser("list", help="Listar snapshots")
+
+    p_diff = sub.add_parser("diff", help="Comparar dos snapshots")
+    p_diff.add_argument("anterior")
+    p_diff.add_argument("nuevo")
+    p_diff.add_argument("--json", action="store_true", help="Salida en JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "list":
+        for ruta in listar_snapshots(args.dir):
+            snapshot = cargar_snapshot(ruta)
+            print(f"{ruta}  {snapshot['num_entradas']} formatos  {snapshot['hash_snapshot']}")
+        return 0
+
+    diff = diff_snapshots(cargar_snapshot(args.anterior), cargar_snapshot(args.nuevo))
+    if args.json:
+        print(json.dumps(diff, indent=2, ensure_ascii=False))
+        return 0
+
+    for etiqueta, clave in (("+", "agregados"), ("-", "eliminados"), ("~", "modificados")):
+        for entrada in diff[clave]:
+            print(f"{etiqueta} {entrada['nombre']}  {entrada['url']}")
+    print(f"\nAgregados: {len(diff['agregados'])}  Eliminados: {len(diff['eliminados'])}  "
+          f"Modificados: {len(diff['modificados'])}  Sin cambios: {diff['sin_cambios']}")
+    return 1 if hay_cambios(diff) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Almacén direccionado por contenido para los formatos descargados.
+
+Cada archivo se guarda una sola vez bajo su SHA-256, repartido en
+subdirectorios (objetos/ab/cd/abcd...). El directorio de descargas pasa a
+ser una vista: cada nombre es un enlace duro (o simbólico, o una copia si
+el sistema de archivos no admite enlaces) al objeto correspondiente.
+
+Los mismos bytes publicados con distintos nombres ocupan espacio una sola
+vez, y las versiones anteriores de un formato siguen disponibles en el
+almacén aunque la vista apunte ya a la versión nueva.
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+from typing import Tuple
+
+MODOS_ENLACE = ("hardlink", "symlink", "copia")
+
+
+class ContentStore:
+    """Almacén de objetos inmutables direccionados por SHA-256."""
+
+    def __init__(self, raiz: str = "almacen_objetos", niveles: int = 2, ancho: int = 2):
+        self.raiz = raiz
+        self.niveles = niveles
+        self.ancho = ancho
+        self.dir_objetos = os.path.join(raiz, "objetos")
+
+    def ruta_objeto(self, hash_sha256: str) -> str:
+        """Ruta del objeto para un hash: objetos/ab/cd/abcd..."""
+        hash_sha256 = hash_sha256.lower()
+        partes = [hash_sha256[i * self.ancho:(i + 1) * self.ancho] for i in range(self.niveles)]
+        return os.path.join(self.dir_objetos, *partes, hash_sha256)
+
+    def contiene(self, hash_sha256: str) -> bool:
+        return os.path.exists(self.ruta_objeto(hash_sha256))
+
+    def ingresar(self, ruta_archivo: str, hash_sha256: str) -> Tuple[str, bool]:
+        """
+        Mueve un archivo al almacén bajo su hash (ya calculado).
+
+        Si el objeto ya existe, el archivo de origen se descarta (los bytes
+        son idénticos). Retorna (ruta del objeto, True si el objeto es nuevo).
+        """
+        destino = self.ruta_objeto(hash_sha256)
+
+        if os.path.exists(destino):
+            if not os.path.samefile(ruta_archivo, destino):
+                os.remove(ruta_archivo)
+            return destino, False
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        try:
+            os.replace(ruta_archivo, destino)
+        except OSError:
+            # Distinto sistema de archivos: copiar y luego borrar el origen
+            shutil.copy2(ruta_archivo, destino)
+            os.remove(ruta_archivo)
+
+        # Los objetos son inmutables: sólo lectura
+        os.chmod(destino, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        return destino, True
+
+    def enlazar(self, hash_sha256: str, ruta_vista: str, modo: str = "hardlink") -> str:
+        """
+        Crea (o reemplaza) la entrada de la vista que apunta al objeto.
+
+        Intenta el modo pedido y retrocede a los siguientes (hardlink ->
+        symlink -> copia) si el sistema de archivos no lo admite. Retorna el
+        modo finalmente usado.
+        """
+        objeto = self.ruta_objeto(hash_sha256)
+        if not os.path.exists(objeto):
+            raise FileNotFoundError(f"Objeto no encontrado en el almacén: {hash_sha256}")
+
+        if os.path.lexists(ruta_vista):
+            if modo == "hardlink" and not os.path.islink(ruta_vista) and os.path.samefile(ruta_vista, objeto):
+                return modo
+            os.remove(ruta_vista)
+
+        os.makedirs(os.path.dirname(ruta_vista) or ".", exist_ok=True)
+        for intento in MODOS_ENLACE[MODOS_ENLACE.index(modo):]:
+            try:
+                if intento == "hardlink":
+                    os.link(objeto, ruta_vista)
+                elif intento == "symlink":
+                    relativo = os.path.relpath(objeto, os.path.dirname(ruta_vista) or ".")
+                    os.symlink(relativo, ruta_vista)
+                else:
+                    shutil.copyfile(objeto, ruta_vista)
+                return intento
+            except (OSError, NotImplementedError):
+                continue
+
+        raise OSError(f"No se pudo enlazar {ruta_vista} con el objeto {hash_sha256}")
+
+    def verificar(self, hash_sha256: str) -> bool:
+        """Recalcula el hash de un objeto y confirma que coincide con su nombre."""
+        sha256_hash = hashlib.sha256()
+        with open(self.ruta_objeto(hash_sha256), 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                sha256_hash.update(bloque)
+        return sha256_hash.hexdigest() == hash_sha256.lower()
+
+    def tamaño_total(self) -> int:
+        """Bytes ocupados por todos los objetos del almacén."""
+        total = 0
+        for directorio, _, archivos in os.walk(self.dir_objetos):
+            for nombre in archivos:
+                total += os.path.getsize(os.path.join(directorio, nombre))
+        return total
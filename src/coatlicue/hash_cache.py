@@ -0,0 +1,147 @@
+"""
+Caché persistente de hashes de archivos del Sistema Coatlicue.
+
+Guarda en SQLite el digest de cada archivo indexado por su identidad y
+metadatos de `stat`: (st_dev, st_ino, st_size, st_mtime_ns, algoritmo).
+Si ninguno cambió, el contenido se da por igual y no se vuelve a leer; una
+re-verificación de miles de archivos retenidos cuesta un `stat` por archivo.
+
+Como en git ("racy git"), no se guardan archivos modificados hace menos de
+VENTANA_RACY segundos ni archivos que cambiaron mientras se calculaba su
+hash: una escritura dentro de la misma marca de tiempo podría pasar
+inadvertida. El modo `paranoid` ignora la caché y rehace todos los hashes
+(actualizando la caché con el resultado).
+"""
+
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .hashing import ALGORITMO, FileHash, normalizar_algoritmos
+from .hashing import hash_archivos as _hash_archivos
+
+CACHE_HASHES = "cache_hashes.sqlite"
+VENTANA_RACY = 2.0
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    tamaño INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    algoritmo TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    PRIMARY KEY (dev, ino, tamaño, mtime_ns, algoritmo)
+) WITHOUT ROWID
+"""
+
+
+def clave_stat(st: os.stat_result) -> Tuple[int, int, int, int]:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class HashCache:
+    """Digest de archivos indexado por (dev, inode, tamaño, mtime_ns)."""
+
+    def __init__(self, ruta: str = CACHE_HASHES):
+        self.ruta = ruta
+        self._conn = sqlite3.connect(ruta)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_ESQUEMA)
+        self._conn.commit()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, st: os.stat_result, algoritmo: str = ALGORITMO) -> Optional[str]:
+        fila = self._conn.execute(
+            "SELECT digest FROM hashes WHERE dev=? AND ino=? AND tamaño=? AND mtime_ns=? "
+            "AND algoritmo=?", clave_stat(st) + (algoritmo,)).fetchone()
+        return fila[0] if fila else None
+
+    def put(self, ruta: str, st: os.stat_result, digest: str,
+            algoritmo: str = ALGORITMO) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            clave_stat(st) + (algoritmo, digest, ruta))
+
+    def hash_archivos(self, rutas: Iterable[str], algoritmo: str = ALGORITMO,
+                      workers: Optional[int] = None, paranoid: bool = False,
+                      algoritmos: Optional[Sequence[str]] = None) -> List[FileHash]:
+        """
+        Como `coatlicue.hashing.hash_archivos`, pero sólo lee los archivos
+        cuya entrada de caché no coincide con su `stat` actual (para todos
+        los algoritmos pedidos).
+        """
+        rutas = list(rutas)
+        algoritmos = normalizar_algoritmos(algoritmos, algoritmo)
+        resultados: List[Optional[FileHash]] = [None] * len(rutas)
+        pendientes = []  # (índice, stat previo)
+
+        for i, ruta in enumerate(rutas):
+            try:
+                st = os.stat(ruta)
+            except OSError as e:
+                resultados[i] = FileHash(ruta, None, 0, str(e))
+                continue
+            digests = {} if paranoid else {a: self.get(st, a) for a in algoritmos}
+            if digests and None not in digests.values():
+                resultados[i] = FileHash(ruta, digests[algoritmo], st.st_size, hashes=digests)
+                self.aciertos += 1
+            else:
+                pendientes.append((i, st))
+                self.fallos += 1
+
+        calculados = _hash_archivos([rutas[i] for i, _ in pendientes], algoritmo, workers,
+                                    algoritmos)
+        limite_racy = time.time_ns() - int(VENTANA_RACY * 1e9)
+
+        with self._conn:
+            for (i, st), r in zip(pendientes, calculados):
+                resultados[i] = r
+                if r.error is not None or st.st_mtime_ns >= limite_racy:
+                    continue
+                try:
+                    if clave_stat(os.stat(r.ruta)) != clave_stat(st):
+                        continue  # Cambió durante el hash
+                except OSError:
+                    continue
+                for nombre, digest in r.hashes.items():
+                    self.put(os.path.abspath(r.ruta), st, digest, nombre)
+
+        return resultados
+
+    def hash_archivo(self, ruta: str, algoritmo: str = ALGORITMO,
+                     paranoid: bool = False) -> Tuple[str, int]:
+        """Hash y tamaño de un archivo usando la caché; OSError si no se puede leer."""
+        r = self.hash_archivos([ruta], algoritmo, workers=1, paranoid=paranoid)[0]
+        if r.error is not None:
+            raise OSError(r.error)
+        return r.hash, r.tamaño
+
+    def purgar(self) -> int:
+        """Elimina entradas cuyo archivo ya no existe o cambió. Retorna cuántas."""
+        obsoletas = []
+        for fila in self._conn.execute("SELECT dev, ino, tamaño, mtime_ns, algoritmo, ruta "
+                                       "FROM hashes"):
+            try:
+                vigente = clave_stat(os.stat(fila[5])) == tuple(fila[:4])
+            except OSError:
+                vigente = False
+            if not vigente:
+                obsoletas.append(fila[:5])
+        with self._conn:
+            self._conn.executemany("DELETE FROM hashes WHERE dev=? AND ino=? AND tamaño=? "
+                                   "AND mtime_ns=? AND algoritmo=?", obsoletas)
+        return len(obsoletas)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
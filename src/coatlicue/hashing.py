@@ -0,0 +1,226 @@
+"""
+Hash de archivos del Sistema Coatlicue.
+
+Único punto donde se calcula el SHA-256 de archivos de evidencia:
+
+- Lecturas grandes (`readinto` sobre un búfer reutilizado de 1 MiB) o
+  `mmap` para archivos grandes, sin copias intermedias.
+- Varios algoritmos en una sola lectura (p. ej. SHA-256 + SHA-512 +
+  SHA3-256): cada bloque leído alimenta a todos los objetos hashlib, así
+  que un algoritmo adicional cuesta CPU, no E/S.
+- Muchos archivos a la vez con un pool de hilos: hashlib libera el GIL al
+  procesar bloques grandes, así que varios hilos ocupan varios núcleos y
+  la re-verificación queda limitada por el disco, no por un núcleo.
+
+Uso desde línea de comandos (salida compatible con `sha256sum`):
+  python -m coatlicue.hashing RUTA [RUTA ...] [--workers N]
+  python -m coatlicue.hashing --verificar SUMAS.txt [--cache cache_hashes.sqlite]
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+ALGORITMO = "sha256"
+TAMAÑO_BUFER = 1024 * 1024
+UMBRAL_MMAP = 64 * 1024 * 1024  # A partir de este tamaño se usa mmap
+MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+class FileHash(NamedTuple):
+    """
+    Resultado del hash de un archivo: `hash` es el digest del algoritmo
+    principal y `hashes` los de todos los algoritmos pedidos; `error`
+    indica un fallo de lectura.
+    """
+    ruta: str
+    hash: Optional[str]
+    tamaño: int
+    error: Optional[str] = None
+    hashes: Optional[Dict[str, str]] = None
+
+
+def normalizar_algoritmos(algoritmos: Optional[Sequence[str]],
+                          principal: str = ALGORITMO) -> List[str]:
+    """
+    Lista de algoritmos sin duplicados, con el principal primero.
+    ValueError si alguno no está disponible en hashlib.
+    """
+    resultado = [principal]
+    for nombre in algoritmos or ():
+        # Acepta también la notación de la norma: SHA-512, SHA3-256
+        nombre = nombre.strip().lower().replace("-", "")
+        if nombre.startswith("sha3") and not nombre.startswith("sha3_"):
+            nombre = "sha3_" + nombre[4:]
+        if nombre and nombre not in resultado:
+            resultado.append(nombre)
+    for nombre in resultado:
+        try:
+            hashlib.new(nombre)
+        except ValueError:
+            raise ValueError(f"Algoritmo de hash no disponible: {nombre}") from None
+    return resultado
+
+
+class MultiHasher:
+    """Alimenta cada bloque a varios objetos hashlib a la vez."""
+
+    def __init__(self, algoritmos: Sequence[str] = (ALGORITMO,)):
+        self._hashers = [(a, hashlib.new(a)) for a in algoritmos]
+        self.tamaño = 0
+
+    def update(self, datos) -> None:
+        for _, h in self._hashers:
+            h.update(datos)
+        self.tamaño += len(datos)
+
+    def hexdigests(self) -> Dict[str, str]:
+        return {a: h.hexdigest() for a, h in self._hashers}
+
+
+def digests_archivo(ruta: str, algoritmos: Sequence[str] = (ALGORITMO,),
+                    usar_mmap: Optional[bool] = None) -> Tuple[Dict[str, str], int]:
+    """
+    Digests (hex) de un archivo para varios algoritmos en una sola lectura.
+
+    Con `usar_mmap` None se decide por tamaño (UMBRAL_MMAP).
+    """
+    h = MultiHasher(algoritmos)
+    with open(ruta, 'rb') as f:
+        tamaño = os.fstat(f.fileno()).st_size
+        if usar_mmap is None:
+            usar_mmap = tamaño >= UMBRAL_MMAP
+        if usar_mmap and tamaño > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+            return h.hexdigests(), h.tamaño
+
+        # Archivos pequeños: búfer a su medida (evita poner a cero 1 MiB por archivo)
+        bufer = bytearray(min(TAMAÑO_BUFER, tamaño + 1))
+        vista = memoryview(bufer)
+        while True:
+            n = f.readinto(bufer)
+            if not n:
+                break
+            h.update(vista[:n])
+    return h.hexdigests(), h.tamaño
+
+
+def hash_bytes(datos, algoritmo: str = ALGORITMO) -> str:
+    """Hash (hex) de un contenido ya leído (p. ej. un documento que además se analiza)."""
+    h = MultiHasher((algoritmo,))
+    h.update(datos)
+    return h.hexdigests()[algoritmo]
+
+
+def hash_archivo(ruta: str, algoritmo: str = ALGORITMO,
+                 usar_mmap: Optional[bool] = None) -> Tuple[str, int]:
+    """Hash (hex) y tamaño de un archivo."""
+    digests, tamaño = digests_archivo(ruta, (algoritmo,), usar_mmap)
+    return digests[algoritmo], tamaño
+
+
+def _hash_seguro(ruta: str, algoritmos: Sequence[str]) -> FileHash:
+    try:
+        digests, tamaño = digests_archivo(ruta, algoritmos)
+        return FileHash(ruta, digests[algoritmos[0]], tamaño, hashes=digests)
+    except OSError as e:
+        return FileHash(ruta, None, 0, str(e))
+
+
+def hash_archivos(rutas: Iterable[str], algoritmo: str = ALGORITMO,
+                  workers: Optional[int] = None,
+                  algoritmos: Optional[Sequence[str]] = None) -> List[FileHash]:
+    """
+    Hash de muchos archivos en paralelo, en el mismo orden de `rutas`.
+
+    `algoritmos` agrega digests adicionales (en `FileHash.hashes`) sin
+    releer los archivos. Un archivo ilegible no detiene el resto: su
+    resultado lleva `error`.
+    """
+    rutas = list(rutas)
+    if not rutas:
+        return []
+    algoritmos = normalizar_algoritmos(algoritmos, algoritmo)
+    workers = max(1, min(workers or MAX_WORKERS, len(rutas)))
+    if workers == 1:
+        return [_hash_seguro(r, algoritmos) for r in rutas]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda r: _hash_seguro(r, algoritmos), rutas))
+
+
+def recorrer(rutas: Iterable[str]) -> Iterator[str]:
+    """Archivos bajo las rutas dadas (directorios en orden determinista)."""
+    for ruta in rutas:
+        if not os.path.isdir(ruta):
+            yield ruta
+            continue
+        for raiz, dirs, archivos in os.walk(ruta):
+            dirs.sort()
+            for nombre in sorted(archivos):
+                yield os.path.join(raiz, nombre)
+
+
+def leer_sumas(ruta: str) -> List[Tuple[str, str]]:
+    """Lee un archivo en formato `sha256sum`: (hash, ruta) por línea."""
+    sumas = []
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.rstrip("\n")
+            if not linea:
+                continue
+            digest, _, archivo = linea.partition("  ")
+            sumas.append((digest.lower(), archivo))
+    return sumas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hash SHA-256 paralelo de archivos de evidencia")
+    parser.add_argument("rutas", nargs="*", help="Archivos o directorios")
+    parser.add_argument("--verificar", metavar="SUMAS",
+                        help="Verificar un archivo de sumas en formato sha256sum")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Hilos de hash")
+    parser.add_argument("--cache", metavar="SQLITE",
+                        help="Caché persistente de hashes: no relee archivos sin cambios")
+    parser.add_argument("--paranoid", action="store_true",
+                        help="Con --cache, rehacer todos los hashes sin confiar en la caché")
+    args = parser.parse_args(argv)
+
+    calcular = hash_archivos
+    if args.cache:
+        from .hash_cache import HashCache
+        cache = HashCache(args.cache)
+        calcular = lambda rutas, workers: cache.hash_archivos(
+            rutas, workers=workers, paranoid=args.paranoid)
+
+    if args.verificar:
+        sumas = leer_sumas(args.verificar)
+        resultados = calcular([r for _, r in sumas], workers=args.workers)
+        fallos = 0
+        for (esperado, _), r in zip(sumas, resultados):
+            ok = r.error is None and r.hash == esperado
+            fallos += int(not ok)
+            print(f"{r.ruta}: {'OK' if ok else 'FALLO'}" + (f" ({r.error})" if r.error else ""))
+        if fallos:
+            print(f"ADVERTENCIA: {fallos} de {len(sumas)} archivos no coinciden", file=sys.stderr)
+        return 1 if fallos else 0
+
+    if not args.rutas:
+        parser.error("indique rutas o --verificar")
+
+    errores = 0
+    for r in calcular(recorrer(args.rutas), workers=args.workers):
+        if r.error:
+            errores += 1
+            print(f"{r.ruta}: {r.error}", file=sys.stderr)
+        else:
+            print(f"{r.hash}  {r.ruta}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Caché local de cabeceras de bloques de Bitcoin.
+
+Una atestación de Bitcoin en una prueba .ots afirma que el mensaje final
+de la prueba es la raíz Merkle de transacciones del bloque a cierta
+altura. Para comprobarlo sin nodo ni red basta la cabecera de 80 bytes de
+ese bloque:
+
+    versión (4) | hash anterior (32) | raíz Merkle (32) | tiempo (4) | bits (4) | nonce (4)
+
+Los campos van en el orden de bytes del protocolo (la raíz Merkle tal cual
+la produce el último sha256d de la prueba, no invertida como la muestran
+los exploradores) y el tiempo es un entero little-endian.
+
+La caché (`cabeceras_bitcoin.jsonl`, una línea {"altura", "cabecera"} por
+bloque) se llena fuera de línea, en otra máquina con nodo o red:
+
+    python -m coatlicue.ots faltantes blockchain_proofs/ > alturas.txt
+    for h in $(cat alturas.txt); do
+      echo $h $(bitcoin-cli getblockheader $(bitcoin-cli getblockhash $h) false)
+    done > cabeceras.txt
+    python -m coatlicue.headers importar cabeceras.txt
+
+También se importan archivos de cabeceras contiguas de 80 bytes (el
+formato `blockchain_headers` de Electrum) con `--binario --desde ALTURA`.
+Cada cabecera debe cumplir la prueba de trabajo de su propio campo bits, y
+las cabeceras de alturas consecutivas deben encadenarse; la dificultad no
+se contrasta con las reglas de la red (eso requiere la cadena completa).
+
+Uso desde línea de comandos:
+  python -m coatlicue.headers importar ARCHIVO [--binario --desde ALTURA] [--cache RUTA]
+  python -m coatlicue.headers mostrar [--cache RUTA]
+"""
+
+import argparse
+import hashlib
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .custody.journal import CustodyJournal
+
+CABECERAS_JSONL = "cabeceras_bitcoin.jsonl"
+TAMAÑO_CABECERA = 80
+
+
+def hash_cabecera(cabecera: bytes) -> bytes:
+    """Hash del bloque (sha256d), en orden de bytes del protocolo."""
+    return hashlib.sha256(hashlib.sha256(cabecera).digest()).digest()
+
+
+def hash_anterior(cabecera: bytes) -> bytes:
+    return cabecera[4:36]
+
+
+def raiz_merkle(cabecera: bytes) -> bytes:
+    return cabecera[36:68]
+
+
+def tiempo(cabecera: bytes) -> int:
+    """Tiempo del bloque (segundos Unix)."""
+    return struct.unpack_from("<I", cabecera, 68)[0]
+
+
+def objetivo(cabecera: bytes) -> int:
+    """Objetivo de prueba de trabajo codificado en el campo bits."""
+    bits = struct.unpack_from("<I", cabecera, 72)[0]
+    exponente, mantisa = bits >> 24, bits & 0x007fffff
+    if exponente <= 3:
+        return mantisa >> (8 * (3 - exponente))
+    return mantisa << (8 * (exponente - 3))
+
+
+def validar_cabecera(cabecera: bytes) -> None:
+    """ValueError si no mide 80 bytes o su hash no cumple su propio objetivo."""
+    if len(cabecera) != TAMAÑO_CABECERA:
+        raise ValueError(f"Una cabecera mide {TAMAÑO_CABECERA} bytes, no {len(cabecera)}")
+    if int.from_bytes(hash_cabecera(cabecera), "little") > objetivo(cabecera):
+        raise ValueError("La cabecera no cumple su prueba de trabajo")
+
+
+class BlockHeaderStore:
+    """Cabeceras de bloques por altura, persistidas en una bitácora JSONL."""
+
+    def __init__(self, ruta: str = CABECERAS_JSONL):
+        self.ruta = ruta
+        self._bitacora = CustodyJournal(ruta)
+        self._cabeceras: Dict[int, bytes] = {
+            registro["altura"]: bytes.fromhex(registro["cabecera"])
+            for registro in self._bitacora.eventos()
+        }
+
+    def __len__(self) -> int:
+        return len(self._cabeceras)
+
+    def __contains__(self, altura: int) -> bool:
+        return altura in self._cabeceras
+
+    def obtener(self, altura: int) -> Optional[bytes]:
+        return self._cabeceras.get(altura)
+
+    def alturas(self) -> List[int]:
+        return sorted(self._cabeceras)
+
+    def como_dict(self) -> Dict[int, bytes]:
+        """Copia {altura: cabecera} (para enviarla a procesos de verificación)."""
+        return dict(self._cabeceras)
+
+    def agregar(self, altura: int, cabecera: bytes) -> bool:
+        """
+        Valida y encola una cabecera; se escribe con `flush()`. Retorna
+        False si ya estaba. ValueError si es inválida, si contradice la
+        guardada para esa altura o si no se encadena con sus vecinas.
+        """
+        validar_cabecera(cabecera)
+        existente = self._cabeceras.get(altura)
+        if existente == cabecera:
+            return False
+        if existente is not None:
+            raise ValueError(f"Ya hay otra cabecera para la altura {altura}")
+        previa = self._cabeceras.get(altura - 1)
+        if previa is not None and hash_anterior(cabecera) != hash_cabecera(previa):
+            raise ValueError(f"La cabecera {altura} no sigue a la {altura - 1}")
+        siguiente = self._cabeceras.get(altura + 1)
+        if siguiente is not None and hash_anterior(siguiente) != hash_cabecera(cabecera):
+            raise ValueError(f"La cabecera {altura + 1} no sigue a la {altura}")
+        self._cabeceras[altura] = cabecera
+        self._bitacora.append({"altura": altura, "cabecera": cabecera.hex()})
+        return True
+
+    def importar(self, pares: Iterable[Tuple[int, bytes]]) -> int:
+        """Agrega varias cabeceras con una sola escritura. Retorna cuántas eran nuevas."""
+        nuevas = sum(self.agregar(altura, cabecera) for altura, cabecera in pares)
+        self.flush()
+        return nuevas
+
+    def flush(self) -> int:
+        return self._bitacora.flush()
+
+
+def leer_texto(lineas: Iterable[str]) -> Iterator[Tuple[int, bytes]]:
+    """Pares (altura, cabecera) de líneas "ALTURA CABECERA_HEX"."""
+    for numero, linea in enumerate(lineas, 1):
+        partes = linea.split()
+        if not partes or partes[0].startswith("#"):
+            continue
+        if len(partes) != 2:
+            raise ValueError(f"Línea {numero}: se esperaba 'ALTURA CABECERA_HEX'")
+        yield int(partes[0]), bytes.fromhex(partes[1])
+
+
+def leer_binario(datos: bytes, desde: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """Pares (altura, cabecera) de cabeceras contiguas de 80 bytes."""
+    if len(datos) % TAMAÑO_CABECERA:
+        raise ValueError(f"El archivo no es múltiplo de {TAMAÑO_CABECERA} bytes")
+    for i in range(0, len(datos), TAMAÑO_CABECERA):
+        yield desde + i // TAMAÑO_CABECERA, datos[i:i + TAMAÑO_CABECERA]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Caché local de cabeceras de Bitcoin")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    importar = sub.add_parser("importar", help="Importar cabeceras obtenidas fuera de línea")
+    importar.add_argument("archivo", help="Líneas 'ALTURA CABECERA_HEX' o cabeceras binarias")
+    importar.add_argument("--binario", action="store_true",
+                          help="Cabeceras contiguas de 80 bytes")
+    importar.add_argument("--desde", type=int, default=0,
+                          help="Altura de la primera cabecera binaria")
+    sub.add_parser("mostrar", help="Resumen de la caché")
+    for sub_parser in sub.choices.values():
+        sub_parser.add_argument("--cache", default=CABECERAS_JSONL, help="Caché de cabeceras")
+    args = parser.parse_args(argv)
+
+    cache = BlockHeaderStore(args.cache)
+    if args.comando == "importar":
+        if args.binario:
+            with open(args.archivo, 'rb') as f:
+                pares = list(leer_binario(f.read(), args.desde))
+        else:
+            with open(args.archivo, 'r', encoding='utf-8') as f:
+                pares = list(leer_texto(f))
+        try:
+            nuevas = cache.importar(pares)
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+        print(f"{nuevas} cabeceras nuevas ({len(cache)} en {args.cache})")
+    else:
+        alturas = cache.alturas()
+        if not alturas:
+            print(f"{args.cache}: sin cabeceras")
+        else:
+            print(f"{args.cache}: {len(alturas)} cabeceras, alturas {alturas[0]}..{alturas[-1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
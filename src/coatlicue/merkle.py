@@ -0,0 +1,280 @@
+"""
+Árbol de Merkle binario de los hashes de evidencia.
+
+Construcción de RFC 6962 (Certificate Transparency) sobre los digests
+SHA-256 crudos (32 bytes), con separación de dominio entre hojas y nodos
+para que un nodo interno no pueda presentarse como hoja:
+
+    hoja = SHA-256(0x00 || digest)
+    nodo = SHA-256(0x01 || izquierdo || derecho)
+
+Las hojas se ordenan por digest. Cada nivel se construye emparejando los
+nodos del anterior; un nodo sin pareja al final de un nivel sube sin
+cambios, lo que equivale a la división en la mayor potencia de dos de la
+RFC.
+
+La prueba de inclusión de un archivo es la lista de hermanos desde su hoja
+hasta la raíz (O(log n) hashes): un notario verifica un formato con su
+SHA-256, la prueba y la raíz anclada, sin la lista completa de hojas.
+
+Para millones de hojas (páginas, extractos de celdas) cada nivel se guarda
+como un bytearray contiguo de digests de 32 bytes, no como listas de
+objetos, y se calcula por lotes; a partir de UMBRAL_PARALELO nodos los lotes
+se reparten entre procesos. Son procesos y no hilos porque hashlib sólo
+libera el GIL con entradas de más de 2 KiB, y aquí cada hash es de 33 o 65.
+
+Uso desde línea de comandos:
+  python -m coatlicue.merkle construir [--hashes hashes_archivos.json]
+                                       [--arbol merkle_tree.json] [--pruebas merkle_proofs.json]
+  python -m coatlicue.merkle verificar ARCHIVO [--pruebas merkle_proofs.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from .hashing import hash_archivo
+
+HASHES_JSON = "hashes_archivos.json"
+MERKLE_TREE_JSON = "merkle_tree.json"
+MERKLE_PROOFS_JSON = "merkle_proofs.json"
+ESQUEMA = "RFC 6962: SHA-256(0x00 || hoja), SHA-256(0x01 || izquierdo || derecho)"
+
+PREFIJO_HOJA = b"\x00"
+PREFIJO_NODO = b"\x01"
+IZQUIERDA = "izquierda"
+DERECHA = "derecha"
+
+TAMAÑO_HASH = 32
+TAMAÑO_LOTE = 1 << 16        # Nodos calculados por lote
+UMBRAL_PARALELO = 1 << 18    # Nodos de un nivel a partir de los cuales se usan procesos
+MAX_WORKERS = os.cpu_count() or 1
+
+
+def hash_hoja(digest: bytes) -> bytes:
+    return hashlib.sha256(PREFIJO_HOJA + digest).digest()
+
+
+def hash_nodo(izquierdo: bytes, derecho: bytes) -> bytes:
+    return hashlib.sha256(PREFIJO_NODO + izquierdo + derecho).digest()
+
+
+def _hashear_lote(datos: bytes, prefijo: bytes, ancho: int) -> bytes:
+    """SHA-256(prefijo || bloque) de cada bloque de `ancho` bytes, concatenados."""
+    sha = hashlib.sha256
+    return b"".join([sha(prefijo + datos[i:i + ancho]).digest()
+                     for i in range(0, len(datos), ancho)])
+
+
+def _hashear_nivel(datos: Union[bytes, bytearray], prefijo: bytes, ancho: int,
+                   pool: Optional[Executor] = None, workers: int = 1) -> bytearray:
+    """
+    Nivel siguiente: un hash por cada bloque completo de `ancho` bytes,
+    por lotes de TAMAÑO_LOTE nodos. Con `pool` se mantienen a lo sumo
+    2 * workers lotes en vuelo, para no copiar el nivel entero a la vez.
+    """
+    num_nodos = len(datos) // ancho
+    salida = bytearray(num_nodos * TAMAÑO_HASH)
+    fin = num_nodos * ancho  # Un bloque incompleto al final no se hashea
+    paso = TAMAÑO_LOTE * ancho
+    tramos = range(0, fin, paso)
+
+    def escribir(inicio: int, hashes: bytes) -> None:
+        destino = inicio // ancho * TAMAÑO_HASH
+        salida[destino:destino + len(hashes)] = hashes
+
+    if pool is None or num_nodos < UMBRAL_PARALELO:
+        for inicio in tramos:
+            escribir(inicio, _hashear_lote(datos[inicio:min(inicio + paso, fin)], prefijo, ancho))
+        return salida
+
+    en_vuelo: deque = deque()
+    for inicio in tramos:
+        if len(en_vuelo) >= 2 * workers:
+            anterior, futuro = en_vuelo.popleft()
+            escribir(anterior, futuro.result())
+        lote = bytes(datos[inicio:min(inicio + paso, fin)])
+        en_vuelo.append((inicio, pool.submit(_hashear_lote, lote, prefijo, ancho)))
+    for anterior, futuro in en_vuelo:
+        escribir(anterior, futuro.result())
+    return salida
+
+
+class MerkleTree:
+    """
+    Árbol de Merkle completo (todos los niveles) sobre digests crudos.
+
+    `digests` es una secuencia de digests o un bytes/bytearray con digests
+    de 32 bytes concatenados (sin objetos por hoja, para millones de
+    hojas). `niveles[k]` es un bytearray con los nodos del nivel k.
+    """
+
+    def __init__(self, digests: Union[Sequence[bytes], bytes, bytearray],
+                 workers: Optional[int] = None):
+        if isinstance(digests, (bytes, bytearray)):
+            if len(digests) % TAMAÑO_HASH:
+                raise ValueError(f"El búfer de digests no es múltiplo de {TAMAÑO_HASH} bytes")
+            self.num_hojas = len(digests) // TAMAÑO_HASH
+        else:
+            self.num_hojas = len(digests)
+        if not self.num_hojas:
+            raise ValueError("Un árbol de Merkle necesita al menos una hoja")
+
+        workers = max(1, workers or MAX_WORKERS)
+        pool = None
+        if workers > 1 and self.num_hojas >= UMBRAL_PARALELO:
+            pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            if isinstance(digests, (bytes, bytearray)):
+                nivel = _hashear_nivel(digests, PREFIJO_HOJA, TAMAÑO_HASH, pool, workers)
+            else:
+                # Hojas de cualquier longitud (p. ej. los vectores de RFC 6962)
+                nivel = bytearray(b"".join([hash_hoja(d) for d in digests]))
+            self.niveles: List[bytearray] = [nivel]
+            while len(nivel) > TAMAÑO_HASH:
+                siguiente = _hashear_nivel(nivel, PREFIJO_NODO, 2 * TAMAÑO_HASH, pool, workers)
+                if len(nivel) // TAMAÑO_HASH % 2:
+                    siguiente += nivel[-TAMAÑO_HASH:]  # Sin pareja: sube sin cambios
+                self.niveles.append(siguiente)
+                nivel = siguiente
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    @property
+    def raiz(self) -> bytes:
+        return bytes(self.niveles[-1])
+
+    def __len__(self) -> int:
+        return self.num_hojas
+
+    def nodo(self, nivel: int, indice: int) -> bytes:
+        """Nodo `indice` del nivel `nivel` (0 = hashes de hoja)."""
+        inicio = indice * TAMAÑO_HASH
+        return bytes(self.niveles[nivel][inicio:inicio + TAMAÑO_HASH])
+
+    def prueba(self, indice: int) -> List[Dict[str, str]]:
+        """
+        Ruta de inclusión de la hoja `indice`: hermanos desde la hoja hasta
+        la raíz, cada uno con el lado en que se concatena.
+        """
+        if not 0 <= indice < self.num_hojas:
+            raise IndexError(f"Hoja fuera de rango: {indice}")
+        ruta = []
+        for k, nivel in enumerate(self.niveles[:-1]):
+            hermano = indice ^ 1
+            if hermano < len(nivel) // TAMAÑO_HASH:
+                lado = IZQUIERDA if hermano < indice else DERECHA
+                ruta.append({"lado": lado, "hash": self.nodo(k, hermano).hex()})
+            indice //= 2
+        return ruta
+
+
+def raiz_desde_prueba(digest: bytes, ruta: Sequence[Dict[str, str]]) -> bytes:
+    """Raíz que resulta de subir desde la hoja `digest` por la ruta."""
+    nodo = hash_hoja(digest)
+    for paso in ruta:
+        hermano = bytes.fromhex(paso["hash"])
+        if paso["lado"] == IZQUIERDA:
+            nodo = hash_nodo(hermano, nodo)
+        elif paso["lado"] == DERECHA:
+            nodo = hash_nodo(nodo, hermano)
+        else:
+            raise ValueError(f"Lado inválido en la prueba: {paso['lado']}")
+    return nodo
+
+
+def verificar_prueba(hash_hex: str, ruta: Sequence[Dict[str, str]], hash_raiz: str) -> bool:
+    """¿La prueba lleva del SHA-256 del archivo a la raíz dada?"""
+    return raiz_desde_prueba(bytes.fromhex(hash_hex), ruta).hex() == hash_raiz
+
+
+def construir(hashes_archivos: Sequence[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Árbol y pruebas de inclusión para la lista de hashes_archivos.json
+    ([{"nombre", "hash", ...}]). Retorna None si la lista está vacía; si
+    no, {"arbol": <merkle_tree.json>, "pruebas": <merkle_proofs.json>}.
+    """
+    if not hashes_archivos:
+        return None
+    items = sorted(hashes_archivos, key=lambda item: (item["hash"], item["nombre"]))
+    arbol = MerkleTree(bytes.fromhex("".join(item["hash"] for item in items)))
+    hash_raiz = arbol.raiz.hex()
+
+    pruebas = {}
+    for indice, item in enumerate(items):
+        pruebas[item["nombre"]] = {
+            "hash": item["hash"],
+            "indice": indice,
+            "ruta": arbol.prueba(indice)
+        }
+    return {
+        "arbol": {
+            "hash_raiz": hash_raiz,
+            "num_hojas": len(arbol),
+            "esquema": ESQUEMA,
+            "hashes_hojas": [item["hash"] for item in items]
+        },
+        "pruebas": {
+            "hash_raiz": hash_raiz,
+            "num_hojas": len(arbol),
+            "esquema": ESQUEMA,
+            "pruebas": pruebas
+        }
+    }
+
+
+def _escribir_json(ruta: str, datos: Any) -> None:
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Árbol de Merkle y pruebas de inclusión")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    construir_p = sub.add_parser("construir", help="Construir el árbol y las pruebas")
+    construir_p.add_argument("--hashes", default=HASHES_JSON, help="Lista de hashes de archivos")
+    construir_p.add_argument("--arbol", default=MERKLE_TREE_JSON, help="Árbol de salida")
+    construir_p.add_argument("--pruebas", default=MERKLE_PROOFS_JSON, help="Pruebas de salida")
+    verificar_p = sub.add_parser("verificar", help="Verificar la inclusión de un archivo")
+    verificar_p.add_argument("archivo", help="Archivo de evidencia")
+    verificar_p.add_argument("--pruebas", default=MERKLE_PROOFS_JSON, help="Pruebas de inclusión")
+    args = parser.parse_args(argv)
+
+    if args.comando == "construir":
+        with open(args.hashes, 'r', encoding='utf-8') as f:
+            resultado = construir(json.load(f))
+        if resultado is None:
+            print("Sin hashes: no se construyó el árbol")
+            return 1
+        _escribir_json(args.arbol, resultado["arbol"])
+        _escribir_json(args.pruebas, resultado["pruebas"])
+        print(f"Raíz {resultado['arbol']['hash_raiz']} ({resultado['arbol']['num_hojas']} hojas)")
+        return 0
+
+    with open(args.pruebas, 'r', encoding='utf-8') as f:
+        documento = json.load(f)
+    nombre = os.path.basename(args.archivo)
+    prueba = documento["pruebas"].get(nombre)
+    if prueba is None:
+        print(f"✗ {nombre} no está en {args.pruebas}")
+        return 1
+    hash_hex, _ = hash_archivo(args.archivo)
+    if hash_hex != prueba["hash"]:
+        print(f"✗ {nombre}: el SHA-256 no coincide con el registrado")
+        return 1
+    if not verificar_prueba(hash_hex, prueba["ruta"], documento["hash_raiz"]):
+        print(f"✗ {nombre}: la prueba no lleva a la raíz {documento['hash_raiz']}")
+        return 1
+    print(f"✓ {nombre} incluido en la raíz {documento['hash_raiz']} "
+          f"({len(prueba['ruta'])} hashes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
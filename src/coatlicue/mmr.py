@@ -0,0 +1,397 @@
+"""
+Acumulador Merkle de solo-anexado (Merkle Mountain Range) entre ejecuciones.
+
+Cada ejecución del anclaje construye un árbol nuevo sobre los hashes del
+momento; sus raíces no permiten demostrar que una raíz anterior es prefijo
+de una posterior. Este acumulador persiste las hojas en orden de llegada y
+agrega las nuevas en O(log n), de modo que cualquier raíz histórica queda
+demostrablemente contenida en las siguientes.
+
+Estructura en disco (`merkle_mmr/`):
+
+    nivel_00.bin   hashes de hoja, 32 bytes cada uno, en orden de llegada
+    nivel_01.bin   nodos de cada par completo del nivel 0
+    nivel_XX.bin   nodo j del nivel k = raíz de las hojas [j*2^k, (j+1)*2^k)
+    raices.jsonl   historial de raíces publicadas {"num_hojas", "raiz", ...}
+    indice_hojas.sqlite
+                   índice hoja -> posición (derivado de nivel_00.bin; se
+                   reconstruye si falta o quedó atrás)
+
+Los nodos completos son las "montañas"; la raíz de los primeros m hashes
+se obtiene plegando de derecha a izquierda las montañas de m, lo que da
+exactamente el Merkle Tree Hash de RFC 6962 (mismo hashing con separación
+de dominio que `coatlicue.merkle`). Así las pruebas de consistencia entre
+dos tamaños m < n son las de RFC 6962 (§2.1.2) y se verifican con el
+algoritmo de RFC 9162 (§2.1.4.2) sin el acumulador.
+
+Uso desde línea de comandos:
+  python -m coatlicue.mmr agregar [--dir merkle_mmr] [--hashes hashes_archivos.json]
+  python -m coatlicue.mmr historial [--dir merkle_mmr]
+  python -m coatlicue.mmr consistencia M N [--dir merkle_mmr] [--salida PRUEBA.json]
+  python -m coatlicue.mmr verificar PRUEBA.json
+  python -m coatlicue.mmr auditar [--dir merkle_mmr]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .custody.journal import CustodyJournal
+from .merkle import HASHES_JSON, hash_hoja, hash_nodo
+
+DIR_MMR = "merkle_mmr"
+HISTORIAL_RAICES = "raices.jsonl"
+INDICE_HOJAS = "indice_hojas.sqlite"
+TAMAÑO_HASH = 32
+
+_ESQUEMA_INDICE = (
+    "CREATE TABLE IF NOT EXISTS hojas (posicion INTEGER PRIMARY KEY, hoja BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS hojas_por_hash ON hojas (hoja)",
+)
+
+
+def _potencia_menor(n: int) -> int:
+    """Mayor potencia de dos estrictamente menor que n (n > 1)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+class MerkleMountainRange:
+    """Acumulador Merkle persistente con un archivo binario por nivel."""
+
+    def __init__(self, directorio: str = DIR_MMR):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._historial = CustodyJournal(os.path.join(directorio, HISTORIAL_RAICES))
+        self.num_hojas = self._reparar()
+        self._indice = sqlite3.connect(os.path.join(directorio, INDICE_HOJAS))
+        self._indice.execute("PRAGMA journal_mode=WAL")
+        self._indice.execute("PRAGMA synchronous=NORMAL")
+        for sentencia in _ESQUEMA_INDICE:
+            self._indice.execute(sentencia)
+        self._sincronizar_indice()
+
+    # -- almacenamiento ----------------------------------------------------
+
+    def _ruta_nivel(self, nivel: int) -> str:
+        return os.path.join(self.directorio, f"nivel_{nivel:02d}.bin")
+
+    def _leer_nivel(self, nivel: int, inicio: int = 0) -> List[bytes]:
+        try:
+            with open(self._ruta_nivel(nivel), 'rb') as f:
+                f.seek(inicio * TAMAÑO_HASH)
+                datos = f.read()
+        except FileNotFoundError:
+            return []
+        fin = len(datos) - len(datos) % TAMAÑO_HASH
+        return [datos[i:i + TAMAÑO_HASH] for i in range(0, fin, TAMAÑO_HASH)]
+
+    def _anexar(self, nivel: int, nodos: Sequence[bytes]) -> None:
+        if not nodos:
+            return
+        with open(self._ruta_nivel(nivel), 'ab') as f:
+            f.write(b"".join(nodos))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _reparar(self) -> int:
+        """
+        Deja los niveles consistentes tras una escritura interrumpida: se
+        descartan bytes sueltos y nodos sobrantes, y se recalculan los nodos
+        superiores que falten (se escriben de abajo hacia arriba).
+        """
+        n = None
+        nivel = 0
+        while n is None or n >> nivel or os.path.exists(self._ruta_nivel(nivel)):
+            ruta = self._ruta_nivel(nivel)
+            tamaño = os.path.getsize(ruta) if os.path.exists(ruta) else 0
+            if n is None:
+                n = tamaño // TAMAÑO_HASH
+            esperado = n >> nivel
+            actual = min(tamaño // TAMAÑO_HASH, esperado)
+            if tamaño != actual * TAMAÑO_HASH:
+                with open(ruta, 'r+b') as f:
+                    f.truncate(actual * TAMAÑO_HASH)
+            if actual < esperado:
+                hijos = self._leer_nivel(nivel - 1, 2 * actual)
+                self._anexar(nivel, [hash_nodo(hijos[i], hijos[i + 1])
+                                     for i in range(0, 2 * (esperado - actual), 2)])
+            nivel += 1
+        return n
+
+    def _sincronizar_indice(self) -> None:
+        """
+        Pone el índice de hojas al día con nivel_00.bin: indexa las hojas
+        que falten (todas, la primera vez) y descarta las que se truncaron.
+        """
+        indexadas = self._indice.execute(
+            "SELECT COALESCE(MAX(posicion) + 1, 0) FROM hojas").fetchone()[0]
+        with self._indice:
+            if indexadas > self.num_hojas:
+                self._indice.execute("DELETE FROM hojas WHERE posicion >= ?", (self.num_hojas,))
+            elif indexadas < self.num_hojas:
+                self._indice.executemany(
+                    "INSERT INTO hojas VALUES (?, ?)",
+                    enumerate(self._leer_nivel(0, indexadas), indexadas))
+
+    def nodo(self, nivel: int, indice: int) -> bytes:
+        """Raíz del subárbol completo de hojas [indice*2^nivel, (indice+1)*2^nivel)."""
+        if (indice + 1) << nivel > self.num_hojas:
+            raise IndexError(f"Nodo ({nivel}, {indice}) fuera del acumulador")
+        with open(self._ruta_nivel(nivel), 'rb') as f:
+            f.seek(indice * TAMAÑO_HASH)
+            return f.read(TAMAÑO_HASH)
+
+    # -- escritura ---------------------------------------------------------
+
+    def agregar(self, digests: Iterable[bytes]) -> int:
+        """
+        Anexa digests (32 bytes) como hojas nuevas: O(log n) nodos por hoja,
+        una escritura por nivel. Retorna el nuevo número de hojas.
+        """
+        nuevos = [hash_hoja(d) for d in digests]
+        if not nuevos:
+            return self.num_hojas
+        n = self.num_hojas
+        total = n + len(nuevos)
+        hojas = nuevos
+        nivel = 0
+        while nuevos:
+            self._anexar(nivel, nuevos)
+            # Pares que se completan en el nivel siguiente
+            primero = (n >> nivel) // 2 * 2
+            hijos = self._leer_nivel(nivel, primero)
+            nuevos = [hash_nodo(hijos[i], hijos[i + 1]) for i in range(0, len(hijos) - 1, 2)]
+            nivel += 1
+            if (total >> nivel) <= (n >> nivel):
+                break
+        self.num_hojas = total
+        with self._indice:
+            self._indice.executemany("INSERT INTO hojas VALUES (?, ?)", enumerate(hojas, n))
+        return total
+
+    def registrar_raiz(self, **extra: Any) -> Dict[str, Any]:
+        """Anexa la raíz actual al historial de raíces publicadas."""
+        registro = {
+            "num_hojas": self.num_hojas,
+            "raiz": self.raiz().hex(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **extra
+        }
+        self._historial.append(registro)
+        self._historial.flush()
+        return registro
+
+    def historial(self) -> List[Dict[str, Any]]:
+        return list(self._historial.eventos())
+
+    def hojas(self) -> List[bytes]:
+        """Hashes de hoja, SHA-256(0x00 || digest), en orden de llegada."""
+        return self._leer_nivel(0)
+
+    def posicion(self, digest: bytes) -> Optional[int]:
+        """Primera posición de la hoja de `digest`, o None si no está (O(log n))."""
+        fila = self._indice.execute(
+            "SELECT MIN(posicion) FROM hojas WHERE hoja = ?", (hash_hoja(digest),)).fetchone()
+        return fila[0]
+
+    # -- raíces y pruebas --------------------------------------------------
+
+    def _mth(self, inicio: int, fin: int) -> bytes:
+        """
+        Merkle Tree Hash de las hojas [inicio, fin): montañas alineadas de
+        mayor a menor, plegadas de derecha a izquierda.
+        """
+        montañas = []
+        pos = inicio
+        while pos < fin:
+            nivel = (fin - pos).bit_length() - 1
+            if pos:
+                nivel = min(nivel, (pos & -pos).bit_length() - 1)
+            montañas.append(self.nodo(nivel, pos >> nivel))
+            pos += 1 << nivel
+        raiz = montañas.pop()
+        while montañas:
+            raiz = hash_nodo(montañas.pop(), raiz)
+        return raiz
+
+    def raiz(self, num_hojas: Optional[int] = None) -> bytes:
+        """Raíz de los primeros `num_hojas` (por defecto, todas)."""
+        n = self.num_hojas if num_hojas is None else num_hojas
+        if not 0 < n <= self.num_hojas:
+            raise ValueError(f"Tamaño fuera del acumulador: {n}")
+        return self._mth(0, n)
+
+    def prueba_consistencia(self, m: int, n: Optional[int] = None) -> List[bytes]:
+        """Prueba de RFC 6962 de que el árbol de m hojas es prefijo del de n."""
+        n = self.num_hojas if n is None else n
+        if not 0 < m <= n <= self.num_hojas:
+            raise ValueError(f"Tamaños inválidos: {m}, {n}")
+        return self._subprueba(m, 0, n, True)
+
+    def _subprueba(self, m: int, inicio: int, fin: int, completo: bool) -> List[bytes]:
+        # SUBPROOF(m, D[inicio:fin], b) de RFC 6962 §2.1.2
+        if m == fin - inicio:
+            return [] if completo else [self._mth(inicio, fin)]
+        k = _potencia_menor(fin - inicio)
+        if m <= k:
+            return self._subprueba(m, inicio, inicio + k, completo) + [self._mth(inicio + k, fin)]
+        return self._subprueba(m - k, inicio + k, fin, False) + [self._mth(inicio, inicio + k)]
+
+
+def verificar_consistencia(m: int, raiz_m: bytes, n: int, raiz_n: bytes,
+                           prueba: Sequence[bytes]) -> bool:
+    """Verifica una prueba de consistencia (RFC 9162 §2.1.4.2)."""
+    if not 0 < m <= n:
+        return False
+    if m == n:
+        return not prueba and raiz_m == raiz_n
+    if not prueba:
+        return False
+    ruta = list(prueba)
+    if m & (m - 1) == 0:
+        ruta.insert(0, raiz_m)
+    fn, sn = m - 1, n - 1
+    while fn & 1:
+        fn >>= 1
+        sn >>= 1
+    fr = sr = ruta[0]
+    for c in ruta[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr = hash_nodo(c, fr)
+            sr = hash_nodo(c, sr)
+            if not fn & 1:
+                while fn and not fn & 1:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            sr = hash_nodo(sr, c)
+        fn >>= 1
+        sn >>= 1
+    return fr == raiz_m and sr == raiz_n and sn == 0
+
+
+def agregar_hashes(mmr: MerkleMountainRange, hashes_archivos: Sequence[Dict[str, Any]]) -> int:
+    """
+    Anexa los hashes de hashes_archivos.json que el acumulador aún no
+    contiene (ordenados, para que el resultado sea determinista). Cada hash
+    se busca en el índice de hojas, sin leer nivel_00.bin. Retorna cuántas
+    hojas se agregaron.
+    """
+    nuevos = []
+    for hash_hex in sorted({item["hash"] for item in hashes_archivos}):
+        digest = bytes.fromhex(hash_hex)
+        if mmr.posicion(digest) is None:
+            nuevos.append(digest)
+    mmr.agregar(nuevos)
+    return len(nuevos)
+
+
+def documento_consistencia(mmr: MerkleMountainRange, m: int, n: int) -> Dict[str, Any]:
+    """Prueba de consistencia autocontenida, verificable sin el acumulador."""
+    return {
+        "num_hojas_anterior": m,
+        "raiz_anterior": mmr.raiz(m).hex(),
+        "num_hojas": n,
+        "raiz": mmr.raiz(n).hex(),
+        "prueba": [h.hex() for h in mmr.prueba_consistencia(m, n)]
+    }
+
+
+def verificar_documento(documento: Dict[str, Any]) -> bool:
+    return verificar_consistencia(
+        documento["num_hojas_anterior"], bytes.fromhex(documento["raiz_anterior"]),
+        documento["num_hojas"], bytes.fromhex(documento["raiz"]),
+        [bytes.fromhex(h) for h in documento["prueba"]]
+    )
+
+
+def auditar(mmr: MerkleMountainRange) -> List[str]:
+    """
+    Comprueba que cada raíz del historial coincide con el acumulador y es
+    consistente con la siguiente. Retorna la lista de problemas (vacía si
+    todo es correcto).
+    """
+    problemas = []
+    historial = mmr.historial()
+    for registro in historial:
+        n = registro["num_hojas"]
+        if n > mmr.num_hojas or mmr.raiz(n).hex() != registro["raiz"]:
+            problemas.append(f"La raíz registrada para {n} hojas no coincide")
+    for anterior, siguiente in zip(historial, historial[1:]):
+        m, n = anterior["num_hojas"], siguiente["num_hojas"]
+        if m > n:
+            problemas.append(f"El historial retrocede de {m} a {n} hojas")
+        elif n <= mmr.num_hojas and not verificar_consistencia(
+                m, bytes.fromhex(anterior["raiz"]), n, bytes.fromhex(siguiente["raiz"]),
+                mmr.prueba_consistencia(m, n)):
+            problemas.append(f"La raíz de {m} hojas no es prefijo de la de {n}")
+    return problemas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Acumulador Merkle de solo-anexado")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    agregar = sub.add_parser("agregar", help="Anexar los hashes nuevos y registrar la raíz")
+    agregar.add_argument("--dir", default=DIR_MMR, help="Directorio del acumulador")
+    agregar.add_argument("--hashes", default=HASHES_JSON, help="Lista de hashes de archivos")
+    historial = sub.add_parser("historial", help="Mostrar las raíces registradas")
+    historial.add_argument("--dir", default=DIR_MMR, help="Directorio del acumulador")
+    consistencia = sub.add_parser("consistencia", help="Prueba de consistencia entre dos tamaños")
+    consistencia.add_argument("m", type=int, help="Hojas de la raíz anterior")
+    consistencia.add_argument("n", type=int, nargs="?", help="Hojas de la raíz posterior")
+    consistencia.add_argument("--dir", default=DIR_MMR, help="Directorio del acumulador")
+    consistencia.add_argument("--salida", help="Archivo JSON de salida (default: stdout)")
+    verificar = sub.add_parser("verificar", help="Verificar una prueba de consistencia")
+    verificar.add_argument("prueba", help="Prueba JSON generada con `consistencia`")
+    auditar_p = sub.add_parser("auditar", help="Verificar todo el historial de raíces")
+    auditar_p.add_argument("--dir", default=DIR_MMR, help="Directorio del acumulador")
+    args = parser.parse_args(argv)
+
+    if args.comando == "verificar":
+        with open(args.prueba, 'r', encoding='utf-8') as f:
+            documento = json.load(f)
+        if verificar_documento(documento):
+            print(f"✓ La raíz de {documento['num_hojas_anterior']} hojas es prefijo "
+                  f"de la de {documento['num_hojas']}")
+            return 0
+        print("✗ La prueba de consistencia no es válida")
+        return 1
+
+    mmr = MerkleMountainRange(args.dir)
+    if args.comando == "agregar":
+        with open(args.hashes, 'r', encoding='utf-8') as f:
+            n = agregar_hashes(mmr, json.load(f))
+        if mmr.num_hojas == 0:
+            print("Acumulador vacío")
+            return 0
+        registro = mmr.registrar_raiz()
+        print(f"{n} hojas nuevas; raíz {registro['raiz']} ({registro['num_hojas']} hojas)")
+    elif args.comando == "historial":
+        for registro in mmr.historial():
+            print(f"{registro['timestamp']}  {registro['num_hojas']:>8} hojas  {registro['raiz']}")
+    elif args.comando == "consistencia":
+        documento = documento_consistencia(mmr, args.m, args.n or mmr.num_hojas)
+        texto = json.dumps(documento, indent=2, ensure_ascii=False)
+        if args.salida:
+            with open(args.salida, 'w', encoding='utf-8') as f:
+                f.write(texto)
+        else:
+            print(texto)
+    else:
+        problemas = auditar(mmr)
+        for problema in problemas:
+            print(f"✗ {problema}")
+        if problemas:
+            return 1
+        print(f"✓ {len(mmr.historial())} raíces consistentes ({mmr.num_hojas} hojas)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
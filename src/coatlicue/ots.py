@@ -0,0 +1,623 @@
+"""
+Formato de pruebas OpenTimestamps (.ots) y anclaje por lotes.
+
+Lectura y escritura del formato binario de `ots stamp` sin depender del
+cliente: un archivo .ots es la cabecera mágica, la versión (varuint), la
+operación de hash del archivo y su digest, seguidos de un árbol de
+operaciones (append, prepend, sha256, ...) que termina en atestaciones
+(pendiente en un calendario, o un bloque de Bitcoin / Litecoin):
+
+    archivo   = MAGIA, varuint(1), op_hash, digest, timestamp
+    timestamp = (0xff, rama)* rama
+    rama      = 0x00 atestación | operación timestamp
+    atestación = tag (8 bytes), varbytes(contenido)
+
+Anclaje por lotes: en lugar de un `ots stamp` por archivo, se sella una
+sola vez la raíz Merkle (ver `coatlicue.merkle`) y la prueba de cada
+archivo se deriva anteponiendo su ruta Merkle, expresada como operaciones
+OTS, al timestamp de la raíz. El resultado es un .ots estándar del archivo
+original: `ots verify` y `ots upgrade` funcionan igual que con uno sellado
+individualmente.
+
+Verificación fuera de línea: se recorren las operaciones de la prueba y
+cada atestación de Bitcoin se contrasta con la cabecera del bloque en la
+caché local (`coatlicue.headers`), sin `ots verify`, nodo ni red. Un
+directorio completo se verifica como un lote, repartido entre procesos.
+
+Uso desde línea de comandos:
+  python -m coatlicue.ots mostrar ARCHIVO.ots
+  python -m coatlicue.ots derivar [--raiz merkle_raiz.bin.ots] [--pruebas merkle_proofs.json]
+                                  [--salida blockchain_proofs]
+  python -m coatlicue.ots verificar [RUTA ...] [--cache cabeceras_bitcoin.jsonl]
+                                    [--archivos formatos_descargados] [--workers N]
+  python -m coatlicue.ots faltantes [RUTA ...] [--cache cabeceras_bitcoin.jsonl]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import (
+    Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+)
+
+from . import headers
+from .hashing import hash_archivo
+from .merkle import (
+    DERECHA, IZQUIERDA, MAX_WORKERS, MERKLE_PROOFS_JSON, PREFIJO_HOJA, PREFIJO_NODO
+)
+
+MAGIA = b"\x00OpenTimestamps\x00\x00Proof\x00\xbf\x89\xe2\xe8\x84\xe8\x92\x94"
+VERSION_OTS = 1
+DIR_BLOCKCHAIN = "blockchain_proofs"
+RAIZ_MERKLE_BIN = "merkle_raiz.bin"
+
+MARCA_BIFURCACION = 0xff
+MARCA_ATESTACION = 0x00
+MAX_MENSAJE = 4096
+MAX_PROFUNDIDAD = 256
+MAX_CONTENIDO_ATESTACION = 8192
+
+# Operaciones: tag -> (nombre, tiene argumento)
+OP_SHA1 = 0x02
+OP_RIPEMD160 = 0x03
+OP_SHA256 = 0x08
+OP_KECCAK256 = 0x67
+OP_APPEND = 0xf0
+OP_PREPEND = 0xf1
+OP_REVERSE = 0xf2
+OP_HEXLIFY = 0xf3
+OPERACIONES = {
+    OP_SHA1: ("sha1", False),
+    OP_RIPEMD160: ("ripemd160", False),
+    OP_SHA256: ("sha256", False),
+    OP_KECCAK256: ("keccak256", False),
+    OP_APPEND: ("append", True),
+    OP_PREPEND: ("prepend", True),
+    OP_REVERSE: ("reverse", False),
+    OP_HEXLIFY: ("hexlify", False),
+}
+LONGITUD_DIGEST = {OP_SHA1: 20, OP_RIPEMD160: 20, OP_SHA256: 32, OP_KECCAK256: 32}
+
+TAG_PENDIENTE = bytes.fromhex("83dfe30d2ef90c8e")
+TAG_BITCOIN = bytes.fromhex("0588960d73d71901")
+TAG_LITECOIN = bytes.fromhex("06869a0d73d71b45")
+TIPOS_ATESTACION = {TAG_PENDIENTE: "pendiente", TAG_BITCOIN: "bitcoin", TAG_LITECOIN: "litecoin"}
+
+# Estados de verificación de una prueba, de más a menos concluyente
+VERIFICADO = "verificado"
+INVALIDO = "invalido"
+SIN_CABECERA = "sin_cabecera"
+PENDIENTE = "pendiente"
+SIN_ATESTACION = "sin_atestacion"
+UMBRAL_PARALELO = 256  # Pruebas a partir de las cuales el lote usa procesos
+
+
+# -- codificación ------------------------------------------------------------
+
+def _varuint(n: int) -> bytes:
+    salida = bytearray()
+    while n >= 0x80:
+        salida.append((n & 0x7f) | 0x80)
+        n >>= 7
+    salida.append(n)
+    return bytes(salida)
+
+
+def _varbytes(datos: bytes) -> bytes:
+    return _varuint(len(datos)) + datos
+
+
+class _Lector:
+    """Cursor sobre los bytes de un .ots; ValueError si se terminan."""
+
+    def __init__(self, datos: bytes):
+        self.datos = datos
+        self.pos = 0
+
+    def bytes(self, n: int) -> bytes:
+        if self.pos + n > len(self.datos):
+            raise ValueError("Prueba OTS truncada")
+        fragmento = self.datos[self.pos:self.pos + n]
+        self.pos += n
+        return fragmento
+
+    def byte(self) -> int:
+        return self.bytes(1)[0]
+
+    def varuint(self) -> int:
+        n = desplazamiento = 0
+        while True:
+            byte = self.byte()
+            n |= (byte & 0x7f) << desplazamiento
+            if byte < 0x80:
+                return n
+            desplazamiento += 7
+
+    def varbytes(self, maximo: int) -> bytes:
+        n = self.varuint()
+        if n > maximo:
+            raise ValueError(f"Campo de {n} bytes excede el máximo de {maximo}")
+        return self.bytes(n)
+
+
+# -- operaciones y atestaciones ---------------------------------------------
+
+class Op(NamedTuple):
+    """Operación de una prueba OTS: `tag` y, para append/prepend, su argumento."""
+    tag: int
+    argumento: bytes = b""
+
+    @property
+    def nombre(self) -> str:
+        return OPERACIONES[self.tag][0]
+
+    def aplicar(self, mensaje: bytes) -> bytes:
+        if self.tag == OP_APPEND:
+            resultado = mensaje + self.argumento
+        elif self.tag == OP_PREPEND:
+            resultado = self.argumento + mensaje
+        elif self.tag == OP_SHA256:
+            resultado = hashlib.sha256(mensaje).digest()
+        elif self.tag == OP_SHA1:
+            resultado = hashlib.sha1(mensaje).digest()
+        elif self.tag == OP_RIPEMD160:
+            resultado = hashlib.new("ripemd160", mensaje).digest()
+        elif self.tag == OP_KECCAK256:
+            resultado = _keccak256(mensaje)
+        elif self.tag == OP_REVERSE:
+            resultado = mensaje[::-1]
+        else:
+            resultado = mensaje.hex().encode("ascii")
+        if len(resultado) > MAX_MENSAJE:
+            raise ValueError(f"Resultado de {self.nombre} excede {MAX_MENSAJE} bytes")
+        return resultado
+
+    def serializar(self) -> bytes:
+        if OPERACIONES[self.tag][1]:
+            return bytes([self.tag]) + _varbytes(self.argumento)
+        return bytes([self.tag])
+
+    def __str__(self) -> str:
+        return f"{self.nombre}({self.argumento.hex()})" if self.argumento else self.nombre
+
+
+def _keccak256(mensaje: bytes) -> bytes:
+    """Keccak-256 (el de Ethereum, no SHA3-256) si hashlib lo ofrece."""
+    try:
+        return hashlib.new("keccak_256", mensaje).digest()
+    except ValueError:
+        raise ValueError("keccak256 no está disponible en hashlib") from None
+
+
+class Attestation(NamedTuple):
+    """Atestación de una prueba OTS: tag de 8 bytes y contenido sin interpretar."""
+    tag: bytes
+    contenido: bytes
+
+    @property
+    def tipo(self) -> str:
+        return TIPOS_ATESTACION.get(self.tag, "desconocida")
+
+    @property
+    def uri(self) -> Optional[str]:
+        """URI del calendario de una atestación pendiente."""
+        if self.tag != TAG_PENDIENTE:
+            return None
+        return _Lector(self.contenido).varbytes(1000).decode("utf-8")
+
+    @property
+    def altura(self) -> Optional[int]:
+        """Altura del bloque de una atestación de Bitcoin o Litecoin."""
+        if self.tag not in (TAG_BITCOIN, TAG_LITECOIN):
+            return None
+        return _Lector(self.contenido).varuint()
+
+    def clave_orden(self) -> Tuple:
+        # Mismo orden que el cliente de referencia: por tag y luego por
+        # URI o altura, para que la serialización sea canónica
+        if self.tag == TAG_PENDIENTE:
+            return (self.tag, self.uri.encode("utf-8"))
+        if self.tag in (TAG_BITCOIN, TAG_LITECOIN):
+            return (self.tag, self.altura)
+        return (self.tag, self.contenido)
+
+    def serializar(self) -> bytes:
+        return self.tag + _varbytes(self.contenido)
+
+    def __str__(self) -> str:
+        if self.tipo == "pendiente":
+            return f"pendiente en {self.uri}"
+        if self.altura is not None:
+            return f"{self.tipo} bloque {self.altura}"
+        return f"desconocida {self.tag.hex()}"
+
+
+def atestacion_pendiente(uri: str) -> Attestation:
+    return Attestation(TAG_PENDIENTE, _varbytes(uri.encode("utf-8")))
+
+
+def atestacion_bitcoin(altura: int) -> Attestation:
+    return Attestation(TAG_BITCOIN, _varuint(altura))
+
+
+# -- timestamps --------------------------------------------------------------
+
+class Timestamp:
+    """
+    Nodo del árbol de una prueba: el mensaje en ese punto, sus atestaciones
+    y las operaciones que parten de él (cada una con su propio Timestamp).
+    """
+
+    def __init__(self, mensaje: bytes):
+        self.mensaje = mensaje
+        self.atestaciones: List[Attestation] = []
+        self.operaciones: List[Tuple[Op, "Timestamp"]] = []
+
+    def agregar(self, op: Op) -> "Timestamp":
+        """Agrega una operación y retorna el Timestamp de su resultado."""
+        for existente, siguiente in self.operaciones:
+            if existente == op:
+                return siguiente
+        siguiente = Timestamp(op.aplicar(self.mensaje))
+        self.operaciones.append((op, siguiente))
+        return siguiente
+
+    def atestaciones_con_mensaje(self) -> Iterator[Tuple[bytes, Attestation]]:
+        """(mensaje atestado, atestación) de todo el árbol."""
+        pendientes = [self]
+        while pendientes:
+            nodo = pendientes.pop()
+            for atestacion in nodo.atestaciones:
+                yield nodo.mensaje, atestacion
+            pendientes.extend(siguiente for _, siguiente in reversed(nodo.operaciones))
+
+    def serializar(self) -> bytes:
+        atestaciones = sorted(self.atestaciones, key=Attestation.clave_orden)
+        operaciones = sorted(self.operaciones, key=lambda par: (par[0].tag, par[0].argumento))
+        ramas = [bytes([MARCA_ATESTACION]) + a.serializar() for a in atestaciones]
+        ramas += [op.serializar() + siguiente.serializar() for op, siguiente in operaciones]
+        if not ramas:
+            raise ValueError("Timestamp sin atestaciones ni operaciones")
+        return b"".join(bytes([MARCA_BIFURCACION]) + r for r in ramas[:-1]) + ramas[-1]
+
+    @classmethod
+    def leer(cls, lector: _Lector, mensaje: bytes, profundidad: int = 0) -> "Timestamp":
+        if profundidad > MAX_PROFUNDIDAD:
+            raise ValueError("Prueba OTS demasiado profunda")
+        timestamp = cls(mensaje)
+        while True:
+            tag = lector.byte()
+            bifurcacion = tag == MARCA_BIFURCACION
+            if bifurcacion:
+                tag = lector.byte()
+            if tag == MARCA_ATESTACION:
+                etiqueta = lector.bytes(8)
+                contenido = lector.varbytes(MAX_CONTENIDO_ATESTACION)
+                timestamp.atestaciones.append(Attestation(etiqueta, contenido))
+            elif tag in OPERACIONES:
+                op = Op(tag, lector.varbytes(MAX_MENSAJE) if OPERACIONES[tag][1] else b"")
+                siguiente = cls.leer(lector, op.aplicar(mensaje), profundidad + 1)
+                timestamp.operaciones.append((op, siguiente))
+            else:
+                raise ValueError(f"Operación OTS desconocida: 0x{tag:02x}")
+            if not bifurcacion:
+                return timestamp
+
+
+class DetachedTimestampFile:
+    """Archivo .ots: operación de hash del archivo y timestamp de su digest."""
+
+    def __init__(self, op_hash: Op, timestamp: Timestamp):
+        self.op_hash = op_hash
+        self.timestamp = timestamp
+
+    @property
+    def digest(self) -> bytes:
+        return self.timestamp.mensaje
+
+    def serializar(self) -> bytes:
+        return (MAGIA + _varuint(VERSION_OTS) + self.op_hash.serializar() + self.digest
+                + self.timestamp.serializar())
+
+    @classmethod
+    def leer(cls, datos: bytes) -> "DetachedTimestampFile":
+        lector = _Lector(datos)
+        if lector.bytes(len(MAGIA)) != MAGIA:
+            raise ValueError("No es una prueba OpenTimestamps")
+        version = lector.varuint()
+        if version != VERSION_OTS:
+            raise ValueError(f"Versión OTS no soportada: {version}")
+        tag = lector.byte()
+        if tag not in LONGITUD_DIGEST:
+            raise ValueError(f"Operación de hash de archivo inválida: 0x{tag:02x}")
+        digest = lector.bytes(LONGITUD_DIGEST[tag])
+        timestamp = Timestamp.leer(lector, digest)
+        if lector.pos != len(datos):
+            raise ValueError("Datos sobrantes al final de la prueba OTS")
+        return cls(Op(tag), timestamp)
+
+
+def cargar_ots(ruta: str) -> DetachedTimestampFile:
+    with open(ruta, 'rb') as f:
+        return DetachedTimestampFile.leer(f.read())
+
+
+def guardar_ots(ruta: str, archivo_ots: DetachedTimestampFile) -> None:
+    with open(ruta, 'wb') as f:
+        f.write(archivo_ots.serializar())
+
+
+# -- anclaje por lotes -------------------------------------------------------
+
+def operaciones_ruta_merkle(ruta: Sequence[Dict[str, str]]) -> List[Op]:
+    """
+    Operaciones OTS que llevan del SHA-256 de un archivo a la raíz Merkle:
+    hoja = sha256(0x00 || d) y, por cada hermano, sha256(0x01 || izq || der).
+    """
+    ops = [Op(OP_PREPEND, PREFIJO_HOJA), Op(OP_SHA256)]
+    for paso in ruta:
+        hermano = bytes.fromhex(paso["hash"])
+        if paso["lado"] == IZQUIERDA:
+            ops.append(Op(OP_PREPEND, PREFIJO_NODO + hermano))
+        elif paso["lado"] == DERECHA:
+            ops += [Op(OP_PREPEND, PREFIJO_NODO), Op(OP_APPEND, hermano)]
+        else:
+            raise ValueError(f"Lado inválido en la prueba: {paso['lado']}")
+        ops.append(Op(OP_SHA256))
+    return ops
+
+
+def derivar_ots(digest_hex: str, ruta: Sequence[Dict[str, str]],
+                ots_raiz: DetachedTimestampFile) -> DetachedTimestampFile:
+    """
+    Prueba .ots de un archivo a partir del .ots de la raíz Merkle.
+
+    `ots_raiz` es el resultado de `ots stamp` sobre un archivo con los 32
+    bytes de la raíz, así que su digest es sha256(raíz): la prueba del
+    archivo recorre su ruta Merkle hasta la raíz, aplica sha256 y continúa
+    con el timestamp de la raíz. ValueError si la ruta no lleva a esa raíz.
+    """
+    timestamp = Timestamp(bytes.fromhex(digest_hex))
+    nodo = timestamp
+    for op in operaciones_ruta_merkle(ruta) + [Op(OP_SHA256)]:
+        nodo = nodo.agregar(op)
+    if ots_raiz.op_hash != Op(OP_SHA256) or nodo.mensaje != ots_raiz.digest:
+        raise ValueError(f"La ruta Merkle de {digest_hex} no lleva a la raíz sellada")
+    nodo.atestaciones = list(ots_raiz.timestamp.atestaciones)
+    nodo.operaciones = list(ots_raiz.timestamp.operaciones)
+    return DetachedTimestampFile(Op(OP_SHA256), timestamp)
+
+
+def derivar_pruebas(ots_raiz: DetachedTimestampFile, pruebas: Dict[str, object],
+                    dir_salida: str = DIR_BLOCKCHAIN) -> Dict[str, str]:
+    """
+    Escribe `<nombre>.ots` en `dir_salida` para cada archivo de
+    merkle_proofs.json. Retorna {nombre: ruta del .ots}.
+    """
+    escritos = {}
+    for nombre, prueba in pruebas["pruebas"].items():
+        ruta_ots = os.path.join(dir_salida, f"{nombre}.ots")
+        guardar_ots(ruta_ots, derivar_ots(prueba["hash"], prueba["ruta"], ots_raiz))
+        escritos[nombre] = ruta_ots
+    return escritos
+
+
+# -- verificación fuera de línea ----------------------------------------------
+
+class OtsVerification(NamedTuple):
+    """
+    Resultado de verificar una prueba: `estado` es uno de VERIFICADO,
+    INVALIDO, SIN_CABECERA, PENDIENTE o SIN_ATESTACION; `altura` y `tiempo`
+    son los del bloque más antiguo que la confirma.
+    """
+    ruta: str
+    estado: str
+    digest: Optional[str] = None
+    altura: Optional[int] = None
+    tiempo: Optional[int] = None
+    detalle: str = ""
+
+    @property
+    def fecha(self) -> Optional[str]:
+        if self.tiempo is None:
+            return None
+        return datetime.fromtimestamp(self.tiempo, timezone.utc).isoformat()
+
+
+def verificar_timestamp(timestamp: Timestamp,
+                        cabeceras: Mapping[int, bytes]) -> Tuple[str, Optional[int], Optional[int], str]:
+    """
+    Contrasta las atestaciones de Bitcoin del árbol con las cabeceras
+    {altura: cabecera}. Retorna (estado, altura, tiempo, detalle). Una
+    atestación que contradice su cabecera invalida la prueba completa.
+    """
+    confirmaciones = []
+    faltantes = set()
+    pendientes = False
+    for mensaje, atestacion in timestamp.atestaciones_con_mensaje():
+        if atestacion.tag == TAG_PENDIENTE:
+            pendientes = True
+            continue
+        if atestacion.tag != TAG_BITCOIN:
+            continue
+        altura = atestacion.altura
+        if len(mensaje) != 32:
+            return INVALIDO, altura, None, f"El mensaje atestado en el bloque {altura} no mide 32 bytes"
+        cabecera = cabeceras.get(altura)
+        if cabecera is None:
+            faltantes.add(altura)
+        elif headers.raiz_merkle(cabecera) != mensaje:
+            return INVALIDO, altura, None, f"No coincide con la raíz Merkle del bloque {altura}"
+        else:
+            confirmaciones.append((headers.tiempo(cabecera), altura))
+    if confirmaciones:
+        tiempo, altura = min(confirmaciones)
+        return VERIFICADO, altura, tiempo, f"bitcoin bloque {altura}"
+    if faltantes:
+        alturas = ", ".join(str(a) for a in sorted(faltantes))
+        return SIN_CABECERA, min(faltantes), None, f"Sin cabecera en la caché: {alturas}"
+    if pendientes:
+        return PENDIENTE, None, None, "Atestación pendiente en calendario (ots upgrade)"
+    return SIN_ATESTACION, None, None, "Sin atestaciones verificables"
+
+
+def verificar_ots(ruta: str, cabeceras: Mapping[int, bytes],
+                  archivo: Optional[str] = None) -> OtsVerification:
+    """
+    Verifica una prueba .ots. Con `archivo` se comprueba además que su
+    SHA-256 es el digest de la prueba. Los errores de lectura o de formato
+    se reportan como INVALIDO, no como excepción.
+    """
+    try:
+        archivo_ots = cargar_ots(ruta)
+    except (OSError, ValueError) as e:
+        return OtsVerification(ruta, INVALIDO, detalle=str(e))
+    digest = archivo_ots.digest.hex()
+    if archivo is not None:
+        if archivo_ots.op_hash != Op(OP_SHA256):
+            return OtsVerification(ruta, INVALIDO, digest,
+                                   detalle=f"Hash de archivo no soportado: {archivo_ots.op_hash}")
+        hash_hex, _ = hash_archivo(archivo)
+        if hash_hex != digest:
+            return OtsVerification(ruta, INVALIDO, digest,
+                                   detalle=f"El SHA-256 de {archivo} no es el de la prueba")
+    try:
+        estado, altura, tiempo, detalle = verificar_timestamp(archivo_ots.timestamp, cabeceras)
+    except ValueError as e:
+        return OtsVerification(ruta, INVALIDO, digest, detalle=str(e))
+    return OtsVerification(ruta, estado, digest, altura, tiempo, detalle)
+
+
+def rutas_ots(rutas: Iterable[str]) -> List[str]:
+    """Pruebas .ots de las rutas dadas (directorios en orden determinista)."""
+    encontradas = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            encontradas += sorted(os.path.join(ruta, nombre) for nombre in os.listdir(ruta)
+                                  if nombre.endswith(".ots"))
+        else:
+            encontradas.append(ruta)
+    return encontradas
+
+
+def _archivo_de(ruta_ots: str, dir_archivos: Optional[str]) -> Optional[str]:
+    """Archivo sellado por la prueba: junto al .ots o en `dir_archivos`."""
+    original = ruta_ots[:-len(".ots")] if ruta_ots.endswith(".ots") else None
+    if original is None:
+        return None
+    candidatos = [original]
+    if dir_archivos:
+        candidatos.append(os.path.join(dir_archivos, os.path.basename(original)))
+    return next((c for c in candidatos if os.path.isfile(c)), None)
+
+
+def _verificar_en_lote(ruta: str, cabeceras: Mapping[int, bytes],
+                       dir_archivos: Optional[str]) -> OtsVerification:
+    return verificar_ots(ruta, cabeceras, _archivo_de(ruta, dir_archivos))
+
+
+def verificar_lote(rutas: Sequence[str], cabeceras: Mapping[int, bytes],
+                   dir_archivos: Optional[str] = None,
+                   workers: Optional[int] = None) -> List[OtsVerification]:
+    """
+    Verifica muchas pruebas, en el mismo orden de `rutas`. Con
+    `dir_archivos` también se comprueba el SHA-256 de cada archivo sellado
+    que se encuentre. A partir de UMBRAL_PARALELO pruebas el lote se
+    reparte entre procesos (analizar una prueba es CPU en Python puro).
+    """
+    rutas = list(rutas)
+    verificar = partial(_verificar_en_lote, cabeceras=dict(cabeceras), dir_archivos=dir_archivos)
+    workers = max(1, min(workers or MAX_WORKERS, len(rutas) or 1))
+    if workers == 1 or len(rutas) < UMBRAL_PARALELO:
+        return [verificar(ruta) for ruta in rutas]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(verificar, rutas, chunksize=max(1, len(rutas) // (4 * workers))))
+
+
+def alturas_bitcoin(rutas: Iterable[str]) -> Set[int]:
+    """Alturas de bloque atestadas en las pruebas (las ilegibles se omiten)."""
+    alturas = set()
+    for ruta in rutas_ots(rutas):
+        try:
+            archivo_ots = cargar_ots(ruta)
+        except (OSError, ValueError):
+            continue
+        alturas.update(a.altura for _, a in archivo_ots.timestamp.atestaciones_con_mensaje()
+                       if a.tag == TAG_BITCOIN)
+    return alturas
+
+
+def describir(timestamp: Timestamp, sangria: str = "") -> Iterator[str]:
+    """Líneas legibles del árbol de operaciones (como `ots info`)."""
+    for atestacion in sorted(timestamp.atestaciones, key=Attestation.clave_orden):
+        yield f"{sangria}atestación {atestacion} sobre {timestamp.mensaje.hex()}"
+    for op, siguiente in timestamp.operaciones:
+        yield f"{sangria}{op}"
+        rama = sangria + ("  " if len(timestamp.operaciones) > 1 else "")
+        yield from describir(siguiente, rama)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pruebas OpenTimestamps")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    mostrar = sub.add_parser("mostrar", help="Mostrar las operaciones de un .ots")
+    mostrar.add_argument("archivo", help="Prueba .ots")
+    derivar = sub.add_parser("derivar", help="Derivar el .ots de cada archivo desde la raíz")
+    derivar.add_argument("--raiz", default=os.path.join(DIR_BLOCKCHAIN, RAIZ_MERKLE_BIN + ".ots"),
+                         help="Prueba .ots de la raíz Merkle")
+    derivar.add_argument("--pruebas", default=MERKLE_PROOFS_JSON, help="Pruebas de inclusión")
+    derivar.add_argument("--salida", default=DIR_BLOCKCHAIN, help="Directorio de salida")
+    verificar = sub.add_parser("verificar", help="Verificar pruebas contra la caché de cabeceras")
+    verificar.add_argument("rutas", nargs="*", default=[DIR_BLOCKCHAIN],
+                           help="Pruebas .ots o directorios")
+    verificar.add_argument("--archivos", help="Directorio de los archivos sellados")
+    verificar.add_argument("--workers", type=int, help="Procesos para el lote")
+    faltantes = sub.add_parser("faltantes", help="Alturas atestadas que no están en la caché")
+    faltantes.add_argument("rutas", nargs="*", default=[DIR_BLOCKCHAIN],
+                           help="Pruebas .ots o directorios")
+    for sub_parser in (verificar, faltantes):
+        sub_parser.add_argument("--cache", default=headers.CABECERAS_JSONL,
+                                help="Caché de cabeceras de Bitcoin")
+    args = parser.parse_args(argv)
+
+    if args.comando == "mostrar":
+        archivo_ots = cargar_ots(args.archivo)
+        print(f"{archivo_ots.op_hash} del archivo: {archivo_ots.digest.hex()}")
+        for linea in describir(archivo_ots.timestamp):
+            print(linea)
+        return 0
+
+    if args.comando == "verificar":
+        cache = headers.BlockHeaderStore(args.cache)
+        resultados = verificar_lote(rutas_ots(args.rutas), cache.como_dict(),
+                                    args.archivos, args.workers)
+        conteo: Dict[str, int] = {}
+        for r in resultados:
+            conteo[r.estado] = conteo.get(r.estado, 0) + 1
+            marca = {VERIFICADO: "✓", INVALIDO: "✗"}.get(r.estado, "·")
+            fecha = f" ({r.fecha})" if r.fecha else ""
+            print(f"{marca} {os.path.basename(r.ruta)}: {r.estado}{fecha} {r.detalle}")
+        print(", ".join(f"{n} {estado}" for estado, n in sorted(conteo.items()))
+              or "Sin pruebas .ots")
+        return 1 if conteo.get(INVALIDO) else 0
+
+    if args.comando == "faltantes":
+        cache = headers.BlockHeaderStore(args.cache)
+        for altura in sorted(alturas_bitcoin(args.rutas) - set(cache.alturas())):
+            print(altura)
+        return 0
+
+    with open(args.pruebas, 'r', encoding='utf-8') as f:
+        pruebas = json.load(f)
+    escritos = derivar_pruebas(cargar_ots(args.raiz), pruebas, args.salida)
+    print(f"{len(escritos)} pruebas .ots derivadas en {args.salida}/")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
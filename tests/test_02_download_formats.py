@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for Script 02: Download Formats
+Tests streaming hashes, conditional re-downloads and resumable transfers
+against a local fixture HTTP server.
+"""
+
+import hashlib
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+# Load the script module dynamically
+spec = importlib.util.spec_from_file_location(
+    "download_formats",
+    str(Path(__file__).parent.parent / "scripts" / "02_download_formats.py")
+)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+descargar_archivo = module.descargar_archivo
+registrar_snapshot = module.registrar_snapshot
+verificar_en_disco = module.verificar_en_disco
+
+from coatlicue.downloads.manifest import DownloadManifest
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves in-memory files with ETag and Range support"""
+
+    archivos = {}
+    peticiones = []
+    cortar_en = None  # Close the connection after this many body bytes
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        FixtureHandler.peticiones.append((self.path, dict(self.headers)))
+        contenido = self.archivos.get(self.path)
+        if contenido is None:
+            self.send_error(404)
+            return
+
+        etag = '"%s"' % hashlib.sha256(contenido).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        inicio = 0
+        rango = self.headers.get("Range")
+        if rango and self.headers.get("If-Range") == etag:
+            inicio = int(rango.split("=")[1].rstrip("-"))
+            if inicio >= len(contenido):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {inicio}-{len(contenido) - 1}/{len(contenido)}")
+        else:
+            self.send_response(200)
+
+        cuerpo = contenido[inicio:]
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+
+        if FixtureHandler.cortar_en is not None:
+            self.wfile.write(cuerpo[:FixtureHandler.cortar_en])
+            FixtureHandler.cortar_en = None
+            self.close_connection = True
+            return
+        self.wfile.write(cuerpo)
+
+
+class ServidorFixture(unittest.TestCase):
+    """Base class that runs a local HTTP server per test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        FixtureHandler.archivos = {"/formato.pdf": os.urandom(100_000)}
+        FixtureHandler.peticiones = []
+        FixtureHandler.cortar_en = None
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class TestDescargaConHash(ServidorFixture):
+    """Digest and size must be computed during the download"""
+
+    def test_hash_calculado_durante_descarga(self):
+        """Returned digest should match the served bytes"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+
+        exito, datos = descargar_archivo(f"{self.base_url}/formato.pdf", destino)
+
+        contenido = FixtureHandler.archivos["/formato.pdf"]
+        self.assertTrue(exito)
+        self.assertEqual(datos["hash_sha256"], hashlib.sha256(contenido).hexdigest())
+        self.assertEqual(datos["tamaño"], len(contenido))
+        self.assertEqual(datos["content_type"], "application/pdf")
+
+    def test_verificacion_en_disco_detecta_cambios(self):
+        """Re-reading a modified file should fail verification"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+        exito, datos = descargar_archivo(f"{self.base_url}/formato.pdf", destino)
+
+        ok, _ = verificar_en_disco(destino, datos["hash_sha256"], datos["tamaño"])
+        self.assertTrue(ok)
+
+        with open(destino, "ab") as f:
+            f.write(b"x")
+        ok, _ = verificar_en_disco(destino, datos["hash_sha256"], datos["tamaño"])
+        self.assertFalse(ok)
+
+    def test_error_http_reporta_fallo(self):
+        """A 404 should be reported as a failed download"""
+        exito, info = descargar_archivo(f"{self.base_url}/no-existe.pdf",
+                                        os.path.join(self.test_dir, "x.pdf"))
+        self.assertFalse(exito)
+        self.assertIn("404", str(info))
+        self.assertFalse(info.reintentable)
+
+
+class TestDescargaCondicional(ServidorFixture):
+    """A manifest entry should turn an unchanged file into a 304"""
+
+    def descargar_con_manifiesto(self, destino):
+        url = f"{self.base_url}/formato.pdf"
+        manifiesto = DownloadManifest(os.path.join(self.test_dir, "manifiesto.json"))
+        exito, datos = descargar_archivo(url, destino, manifiesto=manifiesto)
+        if exito and not datos["no_modificado"]:
+            manifiesto.actualizar(url, "formato.pdf", datos["hash_sha256"], datos["tamaño"],
+                                  datos["etag"], datos["last_modified"])
+            manifiesto.guardar()
+        return exito, datos
+
+    def test_segunda_descarga_es_304(self):
+        """Second run should send If-None-Match and get a 304"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+
+        _, primera = self.descargar_con_manifiesto(destino)
+        exito, segunda = self.descargar_con_manifiesto(destino)
+
+        self.assertTrue(exito)
+        self.assertFalse(primera["no_modificado"])
+        self.assertTrue(segunda["no_modificado"])
+        self.assertEqual(segunda["hash_sha256"], primera["hash_sha256"])
+        self.assertIn("If-None-Match", FixtureHandler.peticiones[-1][1])
+
+    def test_archivo_modificado_se_descarga(self):
+        """A changed file on the server should be downloaded again"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+        self.descargar_con_manifiesto(destino)
+
+        FixtureHandler.archivos["/formato.pdf"] = b"nueva version"
+        exito, datos = self.descargar_con_manifiesto(destino)
+
+        self.assertTrue(exito)
+        self.assertFalse(datos["no_modificado"])
+        self.assertEqual(datos["hash_sha256"], hashlib.sha256(b"nueva version").hexdigest())
+
+    def test_archivo_local_faltante_no_usa_condicional(self):
+        """Without the local file, the request must not be conditional"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+        self.descargar_con_manifiesto(destino)
+        os.remove(destino)
+
+        exito, datos = self.descargar_con_manifiesto(destino)
+
+        self.assertTrue(exito)
+        self.assertFalse(datos["no_modificado"])
+        self.assertTrue(os.path.exists(destino))
+
+
+class TestDescargaReanudable(ServidorFixture):
+    """Interrupted downloads should stay quarantined and resume with Range"""
+
+    def test_descarga_interrumpida_no_deja_archivo_final(self):
+        """A truncated transfer must not appear under the final name"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+        parciales = os.path.join(self.test_dir, "parciales")
+        FixtureHandler.cortar_en = 40_000
+
+        exito, _ = descargar_archivo(f"{self.base_url}/formato.pdf", destino,
+                                     dir_parciales=parciales)
+
+        self.assertFalse(exito)
+        self.assertFalse(os.path.exists(destino))
+        parcial = os.path.join(parciales, "formato.pdf.part")
+        self.assertTrue(0 < os.path.getsize(parcial) <= 40_000)
+
+    def test_reanudacion_con_range(self):
+        """The next attempt should request only the missing bytes"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+        parciales = os.path.join(self.test_dir, "parciales")
+        url = f"{self.base_url}/formato.pdf"
+        FixtureHandler.cortar_en = 40_000
+        descargar_archivo(url, destino, dir_parciales=parciales)
+        ya_descargado = os.path.getsize(os.path.join(parciales, "formato.pdf.part"))
+
+        exito, datos = descargar_archivo(url, destino, dir_parciales=parciales)
+
+        contenido = FixtureHandler.archivos["/formato.pdf"]
+        self.assertTrue(exito)
+        self.assertEqual(datos["reanudado_desde"], ya_descargado)
+        self.assertEqual(datos["hash_sha256"], hashlib.sha256(contenido).hexdigest())
+        self.assertEqual(Path(destino).read_bytes(), contenido)
+        self.assertEqual(FixtureHandler.peticiones[-1][1].get("Range"), f"bytes={ya_descargado}-")
+        self.assertEqual(os.listdir(parciales), [], "No deben quedar archivos .part")
+
+    def test_archivo_cambiado_reinicia_descarga(self):
+        """If the server file changed, If-Range should force a full download"""
+        destino = os.path.join(self.test_dir, "formato.pdf")
+        url = f"{self.base_url}/formato.pdf"
+        FixtureHandler.cortar_en = 40_000
+        descargar_archivo(url, destino)
+
+        FixtureHandler.archivos["/formato.pdf"] = os.urandom(50_000)
+        exito, datos = descargar_archivo(url, destino)
+
+        self.assertTrue(exito)
+        self.assertEqual(datos["reanudado_desde"], 0)
+        self.assertEqual(Path(destino).read_bytes(), FixtureHandler.archivos["/formato.pdf"])
+
+
+class CadenaEnMemoria:
+    """Fake chain of custody that keeps the events it receives"""
+
+    def __init__(self):
+        self.eventos = []
+
+    def agregar(self, accion, hash_actual, metadata):
+        self.eventos.append((accion, hash_actual, metadata))
+
+
+def entrada(url, h):
+    return {"url": url, "nombre": url.rsplit("/", 1)[-1], "hash_sha256": h,
+            "tamaño": 10, "timestamp": "2026-01-14T00:00:00+00:00", "verificado": True}
+
+
+class TestRegistrarSnapshot(unittest.TestCase):
+    """Catalog snapshots carry forward failed downloads only"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        parche = mock.patch.object(module, "DIR_SNAPSHOTS", self.test_dir)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.anterior = {"entradas": [entrada("https://gob.mx/a.pdf", "a" * 64),
+                                      entrada("https://gob.mx/b.pdf", "b" * 64),
+                                      entrada("https://gob.mx/c.pdf", "c" * 64)]}
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_url_fuera_del_catalogo_se_elimina(self):
+        """A failed URL is kept, a URL dropped from the catalog is reported as removed"""
+        cadena = CadenaEnMemoria()
+        catalogo = {"https://gob.mx/a.pdf", "https://gob.mx/b.pdf"}
+
+        ruta, diff = registrar_snapshot(cadena, [entrada("https://gob.mx/a.pdf", "a" * 64)],
+                                        self.anterior, None, catalogo)
+
+        urls = [e["url"] for e in module.cargar_snapshot(ruta)["entradas"]]
+        self.assertEqual(urls, ["https://gob.mx/a.pdf", "https://gob.mx/b.pdf"])
+        self.assertEqual([e["nombre"] for e in diff["eliminados"]], ["c.pdf"])
+        self.assertEqual(cadena.eventos[0][2]["eliminados"], ["c.pdf"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -29,6 +29,7 @@ hash_json_canonico = module.hash_json_canonico
 guardar_json_atomico = module.guardar_json_atomico
 cargar_json = module.cargar_json
 verificar_archivos_ots = module.verificar_archivos_ots
+ots = module.ots
 
 
 class DummyImport:
@@ -225,6 +226,25 @@ class TestVerificacionBlockchain(unittest.TestCase):
         self.assertEqual(result["ots_files_found"], 3)
         self.assertEqual(len(result["ots_files"]), 3)
 
+    def test_verificacion_fuera_de_linea(self):
+        """Should parse each proof and report pending and unreadable ones"""
+        blockchain_dir = os.path.join(self.test_dir, "blockchain")
+        os.makedirs(blockchain_dir)
+        timestamp = ots.Timestamp(b"\x01" * 32)
+        timestamp.atestaciones.append(ots.atestacion_pendiente("https://a.example"))
+        ots.guardar_ots(os.path.join(blockchain_dir, "formato.pdf.ots"),
+                        ots.DetachedTimestampFile(ots.Op(ots.OP_SHA256), timestamp))
+        Path(os.path.join(blockchain_dir, "vacio.ots")).touch()
+        
+        result = verificar_archivos_ots(blockchain_dir,
+                                        headers_cache=os.path.join(self.test_dir, "no_existe.jsonl"))
+        
+        self.assertEqual(result["ots_files_found"], 2)
+        self.assertEqual(result["ots_verified"], 0)
+        self.assertEqual(result["ots_pending"], 1)
+        self.assertEqual(result["ots_invalid"], 1)
+        self.assertEqual([r["estado"] for r in result["ots_results"]], ["pendiente", "invalido"])
+
 
 class TestCadenaCustodia(unittest.TestCase):
     """Test chain of custody updates"""
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the content-addressed store (coatlicue.downloads.store)
+Tests sharded object paths, cross-name deduplication and the link view.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.downloads.store import ContentStore
+
+
+class TestAlmacenContenido(unittest.TestCase):
+    """Objects are stored once per SHA-256 and exposed through a view"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.almacen = ContentStore(os.path.join(self.test_dir, "almacen"))
+        self.vista = os.path.join(self.test_dir, "formatos")
+        os.makedirs(self.vista)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def crear_archivo(self, nombre, contenido):
+        ruta = os.path.join(self.vista, nombre)
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+        return ruta, hashlib.sha256(contenido).hexdigest()
+
+    def test_ruta_objeto_particionada(self):
+        """Object path should be sharded by the hash prefix"""
+        h = "ab" + "cd" + "0" * 60
+        ruta = self.almacen.ruta_objeto(h)
+
+        self.assertEqual(Path(ruta).relative_to(self.almacen.dir_objetos).parts, ("ab", "cd", h))
+
+    def test_mismos_bytes_distinto_nombre_se_guardan_una_vez(self):
+        """Identical content under two names should be deduplicated"""
+        ruta_a, h = self.crear_archivo("Formato_1.docx", b"contenido")
+        ruta_b, _ = self.crear_archivo("formato-1.docx", b"contenido")
+
+        _, nuevo_a = self.almacen.ingresar(ruta_a, h)
+        self.almacen.enlazar(h, ruta_a)
+        _, nuevo_b = self.almacen.ingresar(ruta_b, h)
+        self.almacen.enlazar(h, ruta_b)
+
+        self.assertTrue(nuevo_a)
+        self.assertFalse(nuevo_b)
+        self.assertTrue(os.path.samefile(ruta_a, ruta_b))
+        self.assertEqual(self.almacen.tamaño_total(), len(b"contenido"))
+
+    def test_version_anterior_se_conserva(self):
+        """Relinking the view to a new version must keep the old object"""
+        ruta, h1 = self.crear_archivo("formato.pdf", b"version 1")
+        self.almacen.ingresar(ruta, h1)
+        self.almacen.enlazar(h1, ruta)
+
+        os.remove(ruta)
+        ruta, h2 = self.crear_archivo("formato.pdf", b"version 2")
+        self.almacen.ingresar(ruta, h2)
+        self.almacen.enlazar(h2, ruta)
+
+        self.assertEqual(Path(ruta).read_bytes(), b"version 2")
+        self.assertTrue(self.almacen.contiene(h1))
+        self.assertTrue(self.almacen.verificar(h1))
+
+    def test_enlace_simbolico(self):
+        """Symlink mode should point the view at the object"""
+        ruta, h = self.crear_archivo("formato.xlsx", b"hoja")
+        self.almacen.ingresar(ruta, h)
+
+        modo = self.almacen.enlazar(h, ruta, modo="symlink")
+
+        self.assertEqual(modo, "symlink")
+        self.assertTrue(os.path.islink(ruta))
+        self.assertEqual(Path(ruta).read_bytes(), b"hoja")
+
+    def test_objeto_inexistente(self):
+        """Linking an unknown hash should fail"""
+        with self.assertRaises(FileNotFoundError):
+            self.almacen.enlazar("0" * 64, os.path.join(self.vista, "x"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the compact binary event encoding (coatlicue.custody.binary)
+Tests that events round-trip losslessly (same key order, same canonical
+JSON and hash_evento), that irregular events fall back to text or JSON
+records and that archived segments are included in the encoded history.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.canonical import json_canonico
+from coatlicue.custody.binary import (
+    ACCIONES, codificar_evento, codificar_journal, decodificar_a_jsonl, decodificar_evento,
+    leer_eventos, verificar_binario
+)
+from coatlicue.custody.chain import ChainOfCustody, ruta_journal_para
+from coatlicue.custody.journal import serializar_evento
+from coatlicue.custody.snapshot import compactar
+
+REPO_JOURNAL = Path(__file__).parent.parent / "cadena_custodia.jsonl"
+
+GENESIS = {
+    "event_id": 1,
+    "timestamp": "2026-01-14T12:40:47.820660+00:00",
+    "action": "GENESIS_VERIFICATION",
+    "hash_anterior": None,
+    "hash_actual": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+    "metadata": {"descripcion": "Verificación de hash genesis", "verificable": True},
+    "resultado": "EXITOSO"
+}
+
+
+class BinaryTestCase(unittest.TestCase):
+    """Creates a sealed chain with a few downloads"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta_json = os.path.join(self.test_dir, "cadena_custodia.json")
+        self.ruta_journal = ruta_journal_para(self.ruta_json)
+        self.ruta_bin = os.path.join(self.test_dir, "cadena_custodia.bin")
+        self.cadena = ChainOfCustody.crear(GENESIS, self.ruta_json)
+        for i in range(20):
+            self.cadena.agregar("DOWNLOAD_FILE", f"{i:064x}", {
+                "nombre_archivo": f"formato_{i}.pdf", "tamaño_bytes": 1000 + i,
+                "url": f"https://www.gob.mx/formato_{i}.pdf"
+            })
+        self.cadena.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def assertIdaYVuelta(self, evento):
+        decodificado = decodificar_evento(codificar_evento(evento))
+        self.assertEqual(serializar_evento(decodificado), serializar_evento(evento))
+        self.assertEqual(json_canonico(decodificado), json_canonico(evento))
+
+
+class TestCodificacion(BinaryTestCase):
+    """Single events round-trip exactly"""
+
+    def test_eventos_de_la_cadena(self):
+        """Sealed events should decode to the same line and be smaller"""
+        for evento in self.cadena.eventos():
+            self.assertIdaYVuelta(evento)
+            self.assertLess(len(codificar_evento(evento)), len(serializar_evento(evento)) / 2)
+
+    def test_acciones_del_pipeline(self):
+        """Every action in the repository chain and script 08 should have a stable code"""
+        self.assertEqual(ACCIONES.index("AI_ANALYSIS"), 8)
+        with open(REPO_JOURNAL, encoding="utf-8") as f:
+            acciones = {json.loads(linea)["action"] for linea in f if linea.strip()}
+        for accion in acciones | {"POLICY_ANALYSIS_INTEGRATION"}:
+            with self.subTest(accion=accion):
+                self.assertIn(accion, ACCIONES)
+                evento = dict(GENESIS, action=accion)
+                self.assertLess(len(codificar_evento(evento)),
+                                len(codificar_evento(dict(evento, action="ACCION_NUEVA"))))
+
+    def test_eventos_irregulares(self):
+        """Values that cannot be compacted exactly should still round-trip"""
+        base = dict(GENESIS, hash_evento="F" * 64)
+        irregulares = [
+            base,                                                    # hex en mayúsculas
+            dict(base, timestamp="2026-01-14T12:40:47Z"),            # sufijo Z
+            dict(base, timestamp="2026-01-14T06:40:47-06:00"),       # otra zona
+            dict(base, timestamp="1969-12-31T23:59:59+00:00"),       # antes de 1970
+            dict(base, action="ACCION_NUEVA", hash_anterior="abc"),
+            {"metadata": {}, "event_id": 3},                         # otro orden
+            {"event_id": 4},                                         # campos ausentes
+            dict(base, event_id=True),
+            {"event_id": 5, "extra": [1.5, None], "hash_evento": None},
+        ]
+        for evento in irregulares:
+            with self.subTest(evento=evento):
+                self.assertIdaYVuelta(evento)
+
+
+class TestArchivoBinario(BinaryTestCase):
+    """Encoding and decoding whole histories"""
+
+    def test_reconstruye_bitacora(self):
+        """Decoding should rebuild the JSONL journal byte for byte"""
+        self.assertEqual(codificar_journal(self.ruta_journal, self.ruta_bin), 21)
+        ruta_jsonl = os.path.join(self.test_dir, "decodificada.jsonl")
+
+        self.assertEqual(decodificar_a_jsonl(self.ruta_bin, ruta_jsonl), 21)
+
+        with open(self.ruta_journal, "rb") as a, open(ruta_jsonl, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertLess(os.path.getsize(self.ruta_bin), os.path.getsize(self.ruta_journal) / 2)
+
+    def test_incluye_segmentos_archivados(self):
+        """The encoded history should include compacted events and verify"""
+        compactar(self.ruta_journal)
+        self.cadena.agregar("AI_ANALYSIS", "c" * 64, {})
+        self.cadena.commit()
+
+        codificar_journal(self.ruta_journal, self.ruta_bin)
+
+        self.assertEqual([e["event_id"] for e in leer_eventos(self.ruta_bin)], list(range(1, 23)))
+        resultado = verificar_binario(self.ruta_bin)
+        self.assertTrue(resultado.valida, resultado)
+        self.assertEqual(resultado.digest, self.cadena.digest)
+
+    def test_archivo_truncado(self):
+        """A truncated file should be reported, not silently shortened"""
+        codificar_journal(self.ruta_journal, self.ruta_bin)
+        with open(self.ruta_bin, "r+b") as f:
+            f.truncate(os.path.getsize(self.ruta_bin) - 5)
+
+        with self.assertRaises(ValueError):
+            list(leer_eventos(self.ruta_bin))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
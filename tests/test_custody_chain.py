@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the shared chain of custody (coatlicue.custody.chain)
+Tests genesis creation, batched commits with a cached tail, the JSON
+export used by notaries and migration from an existing cadena_custodia.json.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.chain import ChainOfCustody, ruta_journal_para
+from coatlicue.custody.verify import hash_evento, verificar_journal
+
+SRC = str(Path(__file__).parent.parent / "src")
+
+# Abre la cadena, agrega un evento por iteración y confirma cada uno
+ESCRITOR = '''
+import sys
+sys.path.insert(0, sys.argv[1])
+from coatlicue.custody.chain import ChainOfCustody
+cadena = ChainOfCustody(sys.argv[2])
+for i in range(int(sys.argv[4])):
+    cadena.agregar(sys.argv[3], None, {"iteracion": i})
+    cadena.commit()
+'''
+
+HASH_GENESIS = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+
+GENESIS = {
+    "event_id": 1,
+    "timestamp": "2026-01-14T12:00:00+00:00",
+    "action": "GENESIS_VERIFICATION",
+    "hash_anterior": None,
+    "hash_actual": HASH_GENESIS,
+    "metadata": {"descripcion": "Verificación de hash genesis"}
+}
+
+
+class ChainTestCase(unittest.TestCase):
+    """Creates a chain with its genesis event in a temporary directory"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta_json = os.path.join(self.test_dir, "cadena_custodia.json")
+        self.cadena = ChainOfCustody.crear(GENESIS, self.ruta_json)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def leer_documento(self):
+        with open(self.ruta_json, encoding="utf-8") as f:
+            return json.load(f)
+
+
+class TestCreacion(ChainTestCase):
+    """A new chain starts from the genesis event"""
+
+    def test_crear_escribe_journal_y_json(self):
+        """crear() should write the journal and the derived JSON document"""
+        self.assertTrue(os.path.exists(ruta_journal_para(self.ruta_json)))
+        documento = self.leer_documento()
+
+        self.assertEqual(documento["hash_genesis"], HASH_GENESIS)
+        self.assertEqual(documento["inicio"], GENESIS["timestamp"])
+        self.assertEqual(documento["eventos"],
+                         [dict(GENESIS, hash_evento=hash_evento(GENESIS))])
+        self.assertEqual(self.cadena.num_eventos, 1)
+
+    def test_sin_cadena_previa(self):
+        """Opening a chain with neither journal nor JSON should fail"""
+        with self.assertRaises(FileNotFoundError):
+            ChainOfCustody(os.path.join(self.test_dir, "otra.json"))
+
+
+class TestAgregar(ChainTestCase):
+    """Events are linked through the cached tail and committed in batches"""
+
+    def test_eventos_enlazados(self):
+        """Each event should point to the previous hash_actual"""
+        a = self.cadena.agregar("DOWNLOAD_FILE", "a" * 64, {"nombre_archivo": "a.pdf"})
+        b = self.cadena.agregar("DOWNLOAD_FILE", "b" * 64, {"nombre_archivo": "b.pdf"})
+
+        self.assertEqual((a["event_id"], a["hash_anterior"]), (2, HASH_GENESIS))
+        self.assertEqual((b["event_id"], b["hash_anterior"]), (3, "a" * 64))
+        self.assertEqual(self.cadena.pendientes, 2)
+
+    def test_commit_confirma_y_exporta(self):
+        """Pending events should reach the journal and JSON only on commit"""
+        self.cadena.agregar("DOWNLOAD_FILE", "a" * 64, {})
+        self.assertEqual(len(self.leer_documento()["eventos"]), 1)
+
+        self.assertEqual(self.cadena.commit(), 1)
+
+        self.assertEqual(len(self.leer_documento()["eventos"]), 2)
+        reabierta = ChainOfCustody(self.ruta_json)
+        self.assertEqual(reabierta.ultimo_hash, "a" * 64)
+        self.assertEqual(reabierta.num_eventos, 2)
+
+    def test_json_desfasado_al_abrir(self):
+        """A JSON document behind the journal should warn on open and be rewritten on commit"""
+        # Commit interrumpido antes de anexar al JSON
+        sin_json = ChainOfCustody(self.ruta_json, exportar=False)
+        sin_json.agregar("DOWNLOAD_FILE", "a" * 64, {})
+        sin_json.commit()
+
+        with self.assertWarns(RuntimeWarning):
+            cadena = ChainOfCustody(self.ruta_json)
+        self.assertTrue(cadena.json_desfasado)
+        self.assertEqual(cadena.commit(), 0)
+
+        self.assertEqual(len(self.leer_documento()["eventos"]), 2)
+        self.assertFalse(ChainOfCustody(self.ruta_json).json_desfasado)
+
+    def test_campos_extra(self):
+        """Optional event fields like prov should be kept after metadata"""
+        evento = self.cadena.agregar("POLICY_ANALYSIS_INTEGRATION", "c" * 64, {},
+                                     prov={"tool": "08_policy_analysis_integration.py"})
+        self.cadena.commit()
+
+        self.assertEqual(list(evento)[-3:], ["metadata", "prov", "hash_evento"])
+        self.assertEqual(self.leer_documento()["eventos"][-1], evento)
+
+    def test_excepcion_descarta_lote(self):
+        """An error inside the context manager should discard pending events"""
+        with self.assertRaises(RuntimeError):
+            with ChainOfCustody(self.ruta_json) as cadena:
+                cadena.agregar("DOWNLOAD_FILE", "a" * 64, {})
+                raise RuntimeError("fallo")
+
+        self.assertEqual(cadena.pendientes, 0)
+        self.assertEqual(cadena.ultimo_hash, HASH_GENESIS)
+        self.assertEqual(ChainOfCustody(self.ruta_json).num_eventos, 1)
+
+
+class TestConcurrencia(ChainTestCase):
+    """Parallel writers serialize on the journal lock"""
+
+    def test_escritores_paralelos(self):
+        """Events from concurrent processes should all be kept and chained"""
+        procesos = [
+            subprocess.Popen([sys.executable, "-c", ESCRITOR, SRC, self.ruta_json,
+                              f"ETAPA_{n}", "25"])
+            for n in range(4)
+        ]
+        for p in procesos:
+            self.assertEqual(p.wait(timeout=120), 0)
+
+        resultado = verificar_journal(ruta_journal_para(self.ruta_json))
+        self.assertTrue(resultado.valida, resultado)
+        self.assertEqual(resultado.num_eventos, 101)
+        eventos = self.leer_documento()["eventos"]
+        for n in range(4):
+            self.assertEqual(
+                [e["metadata"]["iteracion"] for e in eventos if e["action"] == f"ETAPA_{n}"],
+                list(range(25)))
+
+    def test_commit_reencadena_sobre_cola_ajena(self):
+        """A batch should be rebased onto events committed by another writer"""
+        otra = ChainOfCustody(self.ruta_json)
+        propio = self.cadena.agregar("AI_ANALYSIS", "a" * 64, {})
+        otra.agregar("POLICY_ANALYSIS_INTEGRATION", "b" * 64, {})
+        otra.commit()
+
+        self.cadena.commit()
+
+        self.assertEqual((propio["event_id"], propio["hash_anterior"]), (3, "b" * 64))
+        self.assertTrue(verificar_journal(ruta_journal_para(self.ruta_json)).valida)
+
+
+class TestMigracion(unittest.TestCase):
+    """An existing cadena_custodia.json is migrated on first open"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_migracion_al_abrir(self):
+        """The first open should create the journal from the JSON document"""
+        ruta_json = os.path.join(self.test_dir, "cadena_custodia.json")
+        with open(ruta_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": "1.0",
+                "proyecto": "Auditoría Gubernamental México - Sistema Norteamérica",
+                "hash_genesis": HASH_GENESIS,
+                "inicio": GENESIS["timestamp"],
+                "eventos": [GENESIS]
+            }, f, indent=2, ensure_ascii=False)
+
+        cadena = ChainOfCustody(ruta_json)
+        cadena.agregar("SYNC_GOOGLE_DRIVE", "d" * 64, {})
+        cadena.commit()
+
+        self.assertTrue(os.path.exists(ruta_journal_para(ruta_json)))
+        with open(ruta_json, encoding="utf-8") as f:
+            eventos = json.load(f)["eventos"]
+        self.assertEqual([e["action"] for e in eventos],
+                         ["GENESIS_VERIFICATION", "SYNC_GOOGLE_DRIVE"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
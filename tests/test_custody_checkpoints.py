@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for checkpointed incremental verification (coatlicue.custody.checkpoints)
+Tests that verification resumes from the last trusted checkpoint, that
+HMAC-signed checkpoints are enforced and that truncated or rewritten
+journals fall back to an earlier checkpoint.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.checkpoints import (
+    CheckpointStore, ruta_checkpoints_para, verificar_incremental
+)
+from coatlicue.custody.journal import CustodyJournal
+from coatlicue.custody.verify import HASH_GENESIS, ChainVerifier, sellar_evento
+
+
+def generar(desde, hasta, digest=HASH_GENESIS):
+    """Sealed, linked events desde..hasta (inclusive)"""
+    eventos = []
+    for i in range(desde, hasta + 1):
+        evento = {
+            "event_id": i,
+            "timestamp": "2026-01-14T12:00:00+00:00",
+            "action": "DOWNLOAD_FILE",
+            "hash_anterior": None if i == 1 else f"{i - 1:064x}",
+            "hash_actual": f"{i:064x}",
+            "metadata": {"nombre_archivo": f"formato_{i}.pdf"}
+        }
+        digest = sellar_evento(evento, digest)["hash_evento"]
+        eventos.append(evento)
+    return eventos
+
+
+class CheckpointTestCase(unittest.TestCase):
+    """Creates a temporary journal with 250 sealed events"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta = os.path.join(self.test_dir, "cadena_custodia.jsonl")
+        self.journal = CustodyJournal(self.ruta)
+        self.eventos = generar(1, 250)
+        self.journal.extend(self.eventos)
+        self.journal.flush()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def agregar(self, n):
+        ultimo = self.eventos[-1]
+        nuevos = generar(ultimo["event_id"] + 1, ultimo["event_id"] + n, ultimo["hash_evento"])
+        self.eventos.extend(nuevos)
+        self.journal.extend(nuevos)
+        self.journal.flush()
+
+
+class TestVerificacionIncremental(CheckpointTestCase):
+    """Verification only walks the suffix after the last checkpoint"""
+
+    def test_registra_y_reanuda(self):
+        """A second run should resume from the last checkpoint"""
+        resultado = verificar_incremental(self.ruta, intervalo=100)
+        self.assertTrue(resultado.valida, resultado)
+        self.assertEqual(resultado.desde, 0)
+        store = CheckpointStore(ruta_checkpoints_para(self.ruta))
+        self.assertEqual([c["event_id"] for c in store.checkpoints()], [100, 200])
+
+        self.agregar(30)
+        with mock.patch.object(ChainVerifier, "agregar", autospec=True,
+                               side_effect=ChainVerifier.agregar) as agregar:
+            resultado = verificar_incremental(self.ruta, intervalo=100)
+
+        self.assertTrue(resultado.valida, resultado)
+        self.assertEqual(resultado.desde, 200)
+        self.assertEqual(agregar.call_count, 80)
+        self.assertEqual(resultado.num_eventos, 280)
+        self.assertEqual(resultado.digest, self.eventos[-1]["hash_evento"])
+
+    def test_sufijo_editado(self):
+        """Tampering after the checkpoint should be detected"""
+        verificar_incremental(self.ruta, intervalo=100)
+        with open(self.ruta, "rb") as f:
+            datos = f.read()
+        datos = datos.replace(b"formato_240.pdf", b"formato_999.pdf")
+        with open(self.ruta, "wb") as f:
+            f.write(datos)
+
+        resultado = verificar_incremental(self.ruta, intervalo=100)
+
+        self.assertFalse(resultado.valida)
+        self.assertEqual(resultado.event_id, 240)
+
+    def test_bitacora_truncada(self):
+        """Checkpoints past a truncated journal should be skipped"""
+        verificar_incremental(self.ruta, intervalo=100)
+        store = CheckpointStore(ruta_checkpoints_para(self.ruta))
+        corte = store.checkpoints()[1]["offset"] - 1
+        with open(self.ruta, "r+b") as f:
+            f.truncate(corte)
+
+        resultado = verificar_incremental(self.ruta, intervalo=100)
+
+        self.assertTrue(resultado.valida, resultado)
+        self.assertEqual(resultado.desde, 100)
+        self.assertEqual(resultado.num_eventos, 199)
+
+
+class TestFirma(CheckpointTestCase):
+    """With a key configured only signed checkpoints are trusted"""
+
+    def test_checkpoint_sin_firma_se_ignora(self):
+        """Unsigned or forged checkpoints should not be resumed from"""
+        verificar_incremental(self.ruta, intervalo=100)  # sin clave
+
+        resultado = verificar_incremental(self.ruta, clave=b"secreto", intervalo=100)
+        self.assertEqual(resultado.desde, 0)
+
+        resultado = verificar_incremental(self.ruta, clave=b"secreto", intervalo=100)
+        self.assertEqual(resultado.desde, 200)
+
+        resultado = verificar_incremental(self.ruta, clave=b"otra", intervalo=100)
+        self.assertEqual(resultado.desde, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the append-only custody journal (coatlicue.custody.journal)
+Tests batched appends, recovery from torn writes, tail reads and the
+byte-exact export to cadena_custodia.json.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.journal import (
+    CustodyJournal, exportar_json, migrar_json, ultima_linea
+)
+
+REPO_CADENA = Path(__file__).parent.parent / "cadena_custodia.json"
+
+
+def evento(i, **extra):
+    return dict({
+        "event_id": i,
+        "timestamp": f"2026-01-14T12:00:{i % 60:02d}+00:00",
+        "action": "DOWNLOAD_FILE",
+        "hash_anterior": None if i == 1 else f"{i - 1:064x}",
+        "hash_actual": f"{i:064x}",
+        "metadata": {"descripcion": f"Evento número {i}", "tamaño_bytes": i * 10}
+    }, **extra)
+
+
+class JournalTestCase(unittest.TestCase):
+    """Creates a temporary journal"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta = os.path.join(self.test_dir, "cadena_custodia.jsonl")
+        self.journal = CustodyJournal(self.ruta)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class TestAnexado(JournalTestCase):
+    """Events are appended as lines, one write per batch"""
+
+    def test_lote_se_escribe_en_flush(self):
+        """Queued events should only reach disk on flush"""
+        self.journal.extend(evento(i) for i in range(1, 4))
+        self.assertFalse(os.path.exists(self.ruta))
+
+        self.assertEqual(self.journal.flush(), 3)
+        self.journal.append(evento(4))
+        self.journal.flush()
+
+        self.assertEqual([e["event_id"] for e in self.journal.eventos()], [1, 2, 3, 4])
+        self.assertEqual(self.journal.ultimo_evento(), evento(4))
+
+    def test_linea_incompleta_se_ignora_y_repara(self):
+        """A torn final line should be skipped by readers and truncated by writers"""
+        self.journal.extend([evento(1), evento(2)])
+        self.journal.flush()
+        with open(self.ruta, "ab") as f:
+            f.write(b'{"event_id": 3, "timest')
+
+        self.assertEqual(self.journal.ultimo_evento()["event_id"], 2)
+        self.assertEqual(len(list(self.journal.eventos())), 2)
+
+        self.journal.append(evento(3))
+        self.journal.flush()
+
+        self.assertEqual([e["event_id"] for e in self.journal.eventos()], [1, 2, 3])
+
+    def test_cola_con_lineas_largas(self):
+        """Tail reads should work across read-block boundaries"""
+        grande = evento(2, metadata={"texto": "x" * 200000})
+        self.journal.extend([evento(1), grande])
+        self.journal.flush()
+
+        self.assertEqual(json.loads(ultima_linea(self.ruta)), grande)
+
+
+class TestExportacion(JournalTestCase):
+    """The JSON document is derived from the journal"""
+
+    def test_exportacion_igual_a_json_dump(self):
+        """Export should be byte-identical to json.dump(indent=2)"""
+        eventos = [evento(i) for i in range(1, 6)]
+        self.journal.extend(eventos)
+        self.journal.flush()
+        destino = os.path.join(self.test_dir, "cadena.json")
+
+        self.assertEqual(exportar_json(self.ruta, destino, "Proyecto"), 5)
+
+        esperado = json.dumps({
+            "version": "1.0",
+            "proyecto": "Proyecto",
+            "hash_genesis": eventos[0]["hash_actual"],
+            "inicio": eventos[0]["timestamp"],
+            "eventos": eventos
+        }, indent=2, ensure_ascii=False)
+        with open(destino, encoding="utf-8") as f:
+            self.assertEqual(f.read(), esperado)
+
+    def test_migracion_ida_y_vuelta(self):
+        """Migrating the repository chain and exporting it back should be lossless"""
+        n = migrar_json(str(REPO_CADENA), self.ruta)
+        destino = os.path.join(self.test_dir, "cadena.json")
+        exportar_json(self.ruta, destino)
+
+        with open(REPO_CADENA, "rb") as a, open(destino, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual(self.journal.ultimo_evento()["event_id"], n)
+
+        with self.assertRaises(ValueError):
+            migrar_json(str(REPO_CADENA), self.ruta)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
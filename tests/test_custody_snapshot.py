@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for custody log compaction (coatlicue.custody.snapshot)
+Tests the materialized state, archived gzip segments with their hashes,
+appending and verifying from the snapshot without reading archived
+segments, and full audits and exports that include them.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody import journal
+from coatlicue.custody.chain import ChainOfCustody, ruta_journal_para
+from coatlicue.custody.checkpoints import verificar_incremental
+from coatlicue.custody.snapshot import (
+    cargar_snapshot, compactar, dir_segmentos_para
+)
+from coatlicue.custody.sqlite_store import CustodyIndex
+from coatlicue.hashing import hash_archivo
+
+GENESIS = {
+    "event_id": 1,
+    "timestamp": "2026-01-14T12:00:00+00:00",
+    "action": "GENESIS_VERIFICATION",
+    "hash_anterior": None,
+    "hash_actual": "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+    "metadata": {"descripcion": "Verificación de hash genesis"}
+}
+
+
+class SnapshotTestCase(unittest.TestCase):
+    """Creates a chain with downloads, a Merkle tree and an anchoring event"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta_json = os.path.join(self.test_dir, "cadena_custodia.json")
+        self.ruta_journal = ruta_journal_para(self.ruta_json)
+        self.cadena = ChainOfCustody.crear(GENESIS, self.ruta_json)
+        for i in range(3):
+            self.cadena.agregar("DOWNLOAD_FILE", f"{i:064x}", {"nombre_archivo": f"f{i}.pdf"})
+        self.cadena.agregar("VERIFIED_UNCHANGED", f"{9:064x}", {"nombre_archivo": "f1.pdf"})
+        self.cadena.agregar("CREATE_MERKLE_TREE", "a" * 64, {"num_archivos": 3})
+        self.cadena.agregar("BLOCKCHAIN_ANCHORING", "a" * 64, {"protocolo": "OpenTimestamps"})
+        self.cadena.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def leer_json(self):
+        with open(self.ruta_json, "rb") as f:
+            return f.read()
+
+
+class TestCompactacion(SnapshotTestCase):
+    """Compaction archives the live journal and materializes the state"""
+
+    def test_estado_materializado(self):
+        """The snapshot should hold the latest hash per file, Merkle root and anchoring"""
+        snapshot = compactar(self.ruta_journal)
+
+        estado = snapshot["estado"]
+        self.assertEqual(estado["archivos"]["f1.pdf"]["hash"], f"{9:064x}")
+        self.assertEqual(estado["archivos"]["f2.pdf"]["hash"], f"{2:064x}")
+        self.assertEqual(estado["merkle"]["hash_raiz"], "a" * 64)
+        self.assertEqual(estado["anclaje"]["event_id"], 7)
+        self.assertEqual(snapshot["digest"], self.cadena.digest)
+        self.assertEqual(os.path.getsize(self.ruta_journal), 0)
+
+    def test_segmento_con_hash(self):
+        """The archived segment should contain the original lines and match its SHA-256"""
+        with open(self.ruta_journal, "rb") as f:
+            original = f.read()
+
+        segmento = compactar(self.ruta_journal)["segmentos"][0]
+
+        ruta = os.path.join(dir_segmentos_para(self.ruta_journal), segmento["archivo"])
+        self.assertEqual(hash_archivo(ruta)[0], segmento["sha256"])
+        with gzip.open(ruta, "rb") as f:
+            self.assertEqual(f.read(), original)
+
+    def test_segundo_snapshot_acumula(self):
+        """A second compaction should continue the state and add a segment"""
+        compactar(self.ruta_journal)
+        cadena = ChainOfCustody(self.ruta_json)
+        cadena.agregar("DOWNLOAD_FILE", "b" * 64, {"nombre_archivo": "f0.pdf"})
+        cadena.commit()
+
+        snapshot = compactar(self.ruta_journal)
+
+        self.assertEqual(len(snapshot["segmentos"]), 2)
+        self.assertEqual(snapshot["estado"]["archivos"]["f0.pdf"]["hash"], "b" * 64)
+        self.assertEqual(snapshot["estado"]["merkle"]["hash_raiz"], "a" * 64)
+        self.assertEqual(snapshot["event_id"], 8)
+        self.assertEqual(compactar(self.ruta_journal), snapshot)  # Nada nuevo que archivar
+
+
+class TestLectoresDesdeSnapshot(SnapshotTestCase):
+    """Appending and verification start from the snapshot"""
+
+    def test_anexar_sin_leer_segmentos(self):
+        """The chain should continue from the snapshot even without its segments"""
+        compactar(self.ruta_journal)
+        shutil.rmtree(dir_segmentos_para(self.ruta_journal))
+
+        cadena = ChainOfCustody(self.ruta_json, exportar=False)
+        evento = cadena.agregar("AI_ANALYSIS", "c" * 64, {})
+        cadena.commit()
+
+        self.assertEqual((evento["event_id"], evento["hash_anterior"]), (8, "a" * 64))
+        resultado = cadena.verificar()
+        self.assertTrue(resultado.valida, resultado)
+        self.assertEqual((resultado.desde, resultado.num_eventos), (7, 8))
+
+    def test_exportacion_completa(self):
+        """The exported document should still contain the archived events"""
+        antes = self.leer_json()
+        compactar(self.ruta_journal)
+
+        cadena = ChainOfCustody(self.ruta_json)
+        cadena.exportar()
+        self.assertEqual(self.leer_json(), antes)
+
+        cadena.agregar("AI_ANALYSIS", "c" * 64, {})
+        cadena.commit()
+        eventos = json.loads(self.leer_json())["eventos"]
+        self.assertEqual([e["event_id"] for e in eventos], list(range(1, 9)))
+        self.assertEqual([e["event_id"] for e in cadena.eventos()], list(range(1, 9)))
+
+    def test_commit_exporta_sin_leer_segmentos(self):
+        """Commits should append to the JSON document without the archived segments"""
+        compactar(self.ruta_journal)
+        segmentos = dir_segmentos_para(self.ruta_journal)
+        shutil.move(segmentos, segmentos + ".aparte")
+
+        cadena = ChainOfCustody(self.ruta_json)
+        for i in range(2):
+            cadena.agregar("AI_ANALYSIS", f"{i:064x}", {"lote": i})
+            cadena.commit()
+        anexado = self.leer_json()
+
+        shutil.move(segmentos + ".aparte", segmentos)
+        cadena.exportar()
+        self.assertEqual(anexado, self.leer_json())
+
+    def test_documento_divergente_se_regenera(self):
+        """A torn or edited JSON document should be rewritten in full on the next commit"""
+        completo = self.leer_json()
+        with open(self.ruta_json, "r+b") as f:
+            f.truncate(len(completo) - 10)
+
+        self.cadena.agregar("AI_ANALYSIS", "c" * 64, {})
+        self.cadena.commit()
+
+        eventos = json.loads(self.leer_json())["eventos"]
+        self.assertEqual([e["event_id"] for e in eventos], list(range(1, 9)))
+
+    def test_anexado_interrumpido_no_altera_documento(self):
+        """A failure before the rename should leave the previous JSON document intact"""
+        anterior = self.leer_json()
+        self.cadena.agregar("AI_ANALYSIS", "c" * 64, {})
+        with mock.patch.object(journal.os, "replace", side_effect=OSError("interrumpido")):
+            with self.assertRaises(OSError):
+                self.cadena.commit()
+
+        self.assertEqual(self.leer_json(), anterior)
+        self.assertFalse([n for n in os.listdir(self.test_dir) if n.startswith("tmp_")])
+
+        self.cadena.agregar("AI_ANALYSIS", "d" * 64, {})
+        self.cadena.commit()
+        eventos = json.loads(self.leer_json())["eventos"]
+        self.assertEqual([e["event_id"] for e in eventos], list(range(1, 10)))
+
+    def test_auditoria_completa(self):
+        """A full audit should replay segments and detect tampering"""
+        compactar(self.ruta_journal)
+        self.assertTrue(verificar_incremental(self.ruta_journal, completa=True).valida)
+
+        segmento = cargar_snapshot(self.ruta_journal)["segmentos"][0]
+        ruta = os.path.join(dir_segmentos_para(self.ruta_journal), segmento["archivo"])
+        with gzip.open(ruta, "rb") as f:
+            datos = f.read().replace(b"f2.pdf", b"f7.pdf")
+        with gzip.open(ruta, "wb") as f:
+            f.write(datos)
+
+        resultado = verificar_incremental(self.ruta_journal, completa=True)
+        self.assertFalse(resultado.valida)
+        self.assertIn("SHA-256 del segmento", resultado.error)
+
+    def test_indice_incluye_archivados(self):
+        """The SQLite index should be rebuilt with archived events after compaction"""
+        with CustodyIndex(os.path.join(self.test_dir, "c.sqlite"), self.ruta_journal) as indice:
+            indice.sincronizar()
+            compactar(self.ruta_journal)
+            cadena = ChainOfCustody(self.ruta_json)
+            cadena.agregar("AI_ANALYSIS", "c" * 64, {})
+            cadena.commit()
+
+            indice.sincronizar()
+
+            self.assertEqual(indice.contar(), 8)
+            self.assertEqual(len(list(indice.buscar(accion="DOWNLOAD_FILE"))), 3)
+
+    def test_indice_tras_compactar_es_incremental(self):
+        """After compaction, a second sync should neither re-read segments nor rebuild"""
+        compactar(self.ruta_journal)
+        with CustodyIndex(os.path.join(self.test_dir, "c.sqlite"), self.ruta_journal) as indice:
+            self.assertEqual(indice.sincronizar(), 7)
+            segmentos = dir_segmentos_para(self.ruta_journal)
+            os.rename(segmentos, segmentos + ".movido")
+
+            self.assertEqual(indice.sincronizar(), 0)
+            self.assertEqual(indice.contar(), 7)
+            self.assertEqual(len(list(indice.buscar(accion="DOWNLOAD_FILE"))), 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
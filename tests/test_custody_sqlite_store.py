@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the SQLite custody index (coatlicue.custody.sqlite_store)
+Tests incremental synchronisation from the JSONL journal, indexed queries,
+rebuilds after the journal is rewritten and export to cadena_custodia.json.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.journal import CustodyJournal, exportar_json
+from coatlicue.custody.sqlite_store import CustodyIndex
+
+
+def evento(i, accion="DOWNLOAD_FILE"):
+    return {
+        "event_id": i,
+        "timestamp": f"2026-01-{1 + i // 100:02d}T12:00:00+00:00",
+        "action": accion,
+        "hash_anterior": None if i == 1 else f"{(i - 1) % 7:064x}",
+        "hash_actual": f"{i % 7:064x}",
+        "metadata": {"nombre_archivo": f"formato_{i % 5}.pdf", "descripción": "Señal"}
+    }
+
+
+class IndexTestCase(unittest.TestCase):
+    """Creates a temporary journal and its SQLite index"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta_journal = os.path.join(self.test_dir, "cadena_custodia.jsonl")
+        self.journal = CustodyJournal(self.ruta_journal)
+        self.journal.extend(evento(i, "SNAPSHOT_DIFF" if i % 10 == 0 else "DOWNLOAD_FILE")
+                            for i in range(1, 301))
+        self.journal.flush()
+        self.indice = CustodyIndex(os.path.join(self.test_dir, "cadena.sqlite"),
+                                   self.ruta_journal)
+
+    def tearDown(self):
+        self.indice.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class TestSincronizacion(IndexTestCase):
+    """Only new journal lines are indexed"""
+
+    def test_incremental(self):
+        """A second sync should index only the appended events"""
+        self.assertEqual(self.indice.sincronizar(), 300)
+        self.assertEqual(self.indice.sincronizar(), 0)
+
+        self.journal.extend([evento(301), evento(302)])
+        self.journal.flush()
+
+        self.assertEqual(self.indice.sincronizar(), 2)
+        self.assertEqual(self.indice.contar(), 302)
+        self.assertEqual(self.indice.evento(302), evento(302))
+
+    def test_bitacora_reescrita(self):
+        """A rewritten journal should trigger a full rebuild"""
+        self.indice.sincronizar()
+        os.remove(self.ruta_journal)
+        self.journal.extend([evento(1, "GENESIS_VERIFICATION")])
+        self.journal.flush()
+
+        self.indice.sincronizar()
+
+        self.assertEqual(self.indice.contar(), 1)
+        self.assertEqual(self.indice.evento(1)["action"], "GENESIS_VERIFICATION")
+
+
+class TestConsultas(IndexTestCase):
+    """Queries use the indexed columns"""
+
+    def setUp(self):
+        super().setUp()
+        self.indice.sincronizar()
+
+    def test_por_accion_y_hash(self):
+        """Filters should combine with AND"""
+        eventos = list(self.indice.buscar(accion="DOWNLOAD_FILE", hash_actual=f"{3:064x}"))
+
+        esperados = [i for i in range(1, 301) if i % 7 == 3 and i % 10]
+        self.assertEqual([e["event_id"] for e in eventos], esperados)
+
+    def test_por_archivo_y_fechas(self):
+        """Date bounds should accept ISO prefixes, with an exclusive upper bound"""
+        eventos = list(self.indice.buscar(nombre_archivo="formato_2.pdf",
+                                          desde="2026-01-02", hasta="2026-01-03"))
+
+        self.assertEqual([e["event_id"] for e in eventos],
+                         [i for i in range(100, 200) if i % 5 == 2])
+
+    def test_plan_usa_indices(self):
+        """Lookups by hash should not scan the table"""
+        plan = self.indice._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT evento FROM eventos WHERE hash_actual = ?", ("x",)
+        ).fetchall()
+
+        self.assertIn("idx_eventos_hash_actual", " ".join(str(f) for f in plan))
+
+    def test_exportacion_igual_a_bitacora(self):
+        """Export from the index should match the journal export byte for byte"""
+        desde_indice = os.path.join(self.test_dir, "indice.json")
+        desde_journal = os.path.join(self.test_dir, "journal.json")
+
+        self.assertEqual(self.indice.exportar_json(desde_indice), 300)
+        exportar_json(self.ruta_journal, desde_journal)
+
+        with open(desde_indice, "rb") as a, open(desde_journal, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
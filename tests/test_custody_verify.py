@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for cryptographic chaining of custody events (coatlicue.custody.verify)
+Tests that the event digest covers the full event content, that legacy
+events are folded into the chain and that the verifier reports the first
+broken link.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.custody.checkpoints import verificar_incremental
+from coatlicue.custody.journal import CustodyJournal
+from coatlicue.custody.verify import (
+    HASH_GENESIS, hash_evento, sellar_evento, verificar_eventos, verificar_journal
+)
+
+REPO_JOURNAL = Path(__file__).parent.parent / "cadena_custodia.jsonl"
+
+
+def cadena(n, sellar_desde=1):
+    """n linked events; events from `sellar_desde` on carry hash_evento"""
+    eventos, digest = [], HASH_GENESIS
+    for i in range(1, n + 1):
+        evento = {
+            "event_id": i,
+            "timestamp": f"2026-01-14T12:00:{i % 60:02d}+00:00",
+            "action": "DOWNLOAD_FILE",
+            "hash_anterior": None if i == 1 else f"{i - 1:064x}",
+            "hash_actual": f"{i:064x}",
+            "metadata": {"nombre_archivo": f"formato_{i}.pdf"}
+        }
+        if i >= sellar_desde:
+            sellar_evento(evento, digest)
+        digest = hash_evento(evento, digest)
+        eventos.append(evento)
+    return eventos
+
+
+class TestHashEvento(unittest.TestCase):
+    """The event digest commits to the content and the previous digest"""
+
+    def test_orden_de_claves_irrelevante(self):
+        """The digest should be computed over canonical JSON"""
+        evento = cadena(1)[0]
+        invertido = dict(reversed(list(evento.items())))
+
+        self.assertEqual(hash_evento(evento), hash_evento(invertido))
+
+    def test_depende_del_digest_anterior(self):
+        """The same event should hash differently after a different prefix"""
+        evento = cadena(1)[0]
+
+        self.assertNotEqual(hash_evento(evento, HASH_GENESIS), hash_evento(evento, "0" * 64))
+
+
+class TestVerificador(unittest.TestCase):
+    """The verifier streams events and stops at the first broken link"""
+
+    def test_cadena_valida(self):
+        """An untouched sealed chain should verify"""
+        eventos = cadena(50)
+
+        resultado = verificar_eventos(eventos)
+
+        self.assertTrue(resultado.valida, resultado)
+        self.assertEqual((resultado.num_eventos, resultado.sellados), (50, 50))
+        self.assertEqual(resultado.digest, eventos[-1]["hash_evento"])
+
+    def test_metadata_editada(self):
+        """Editing metadata of a sealed event should be reported at that event"""
+        eventos = cadena(50)
+        eventos[20]["metadata"]["nombre_archivo"] = "otro.pdf"
+
+        resultado = verificar_eventos(eventos)
+
+        self.assertFalse(resultado.valida)
+        self.assertEqual(resultado.event_id, 21)
+        self.assertEqual(resultado.num_eventos, 20)
+
+    def test_historial_previo_protegido(self):
+        """Legacy events should be committed by the first sealed event"""
+        eventos = cadena(10, sellar_desde=8)
+        self.assertTrue(verificar_eventos(eventos).valida)
+
+        eventos[2]["metadata"]["nombre_archivo"] = "otro.pdf"
+        resultado = verificar_eventos(eventos)
+
+        self.assertFalse(resultado.valida)
+        self.assertEqual(resultado.event_id, 8)
+
+    def test_sellos_eliminados(self):
+        """Editing an event and stripping the seals from it onwards should be reported"""
+        eventos = cadena(6)
+        eventos[3]["metadata"]["nombre_archivo"] = "otro.pdf"
+        for evento in eventos[3:]:
+            del evento["hash_evento"]
+
+        resultado = verificar_eventos(eventos)
+
+        self.assertFalse(resultado.valida)
+        self.assertEqual(resultado.event_id, 4)
+        self.assertIn("sin hash_evento", resultado.error)
+
+    def test_enlace_y_secuencia(self):
+        """Broken hash_anterior links and missing ids should be reported"""
+        eventos = cadena(10, sellar_desde=11)
+        eventos[4]["hash_anterior"] = "f" * 64
+        self.assertEqual(verificar_eventos(eventos).event_id, 5)
+
+        eventos = cadena(10)
+        del eventos[6]
+        self.assertEqual(verificar_eventos(eventos).event_id, 8)
+
+    def test_bitacora_del_repositorio(self):
+        """The repository chain should verify as a valid legacy chain"""
+        resultado = verificar_journal(str(REPO_JOURNAL))
+
+        self.assertTrue(resultado.valida, resultado)
+        self.assertGreater(resultado.num_eventos, 0)
+
+
+class TestVerificarJournal(unittest.TestCase):
+    """Verification reads the JSONL journal line by line"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta = os.path.join(self.test_dir, "cadena_custodia.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_journal_editado(self):
+        """A tampered line in the journal should be located"""
+        journal = CustodyJournal(self.ruta)
+        journal.extend(cadena(200))
+        journal.flush()
+        with open(self.ruta, encoding="utf-8") as f:
+            lineas = f.readlines()
+        evento = json.loads(lineas[149])
+        evento["action"] = "VERIFIED_UNCHANGED"
+        lineas[149] = json.dumps(evento, ensure_ascii=False) + "\n"
+        with open(self.ruta, "w", encoding="utf-8") as f:
+            f.writelines(lineas)
+
+        resultado = verificar_journal(self.ruta)
+
+        self.assertFalse(resultado.valida)
+        self.assertEqual(resultado.event_id, 150)
+
+    def test_journal_sin_sellos_al_final(self):
+        """Incremental and full verification should both reject stripped seals"""
+        journal = CustodyJournal(self.ruta)
+        journal.extend(cadena(6))
+        journal.flush()
+        self.assertTrue(verificar_incremental(self.ruta, intervalo=2).valida)
+
+        eventos = list(journal.eventos())
+        eventos[3]["metadata"]["nombre_archivo"] = "otro.pdf"
+        for evento in eventos[3:]:
+            del evento["hash_evento"]
+        with open(self.ruta, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in eventos)
+
+        for completa in (False, True):
+            resultado = verificar_incremental(self.ruta, completa=completa, registrar=False)
+            self.assertFalse(resultado.valida, completa)
+            self.assertEqual(resultado.event_id, 4)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the concurrent download engine (coatlicue.downloads.engine)
+Tests result ordering, worker bounds, per-host politeness limits,
+retries with backoff and the per-host circuit breaker.
+"""
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.downloads.engine import ConcurrentDownloader, DownloadTask
+from coatlicue.downloads.retry import CircuitBreaker, DownloadFailure, RetryPolicy
+
+
+class ContadorConcurrencia:
+    """Fake fetch that records the maximum simultaneous calls per host"""
+
+    def __init__(self, retardo=0.02):
+        self.retardo = retardo
+        self.lock = threading.Lock()
+        self.activos = {}
+        self.maximos = {}
+        self.total_activos = 0
+        self.maximo_total = 0
+
+    def __call__(self, url, destino):
+        host = url.split("/")[2]
+        with self.lock:
+            self.activos[host] = self.activos.get(host, 0) + 1
+            self.maximos[host] = max(self.maximos.get(host, 0), self.activos[host])
+            self.total_activos += 1
+            self.maximo_total = max(self.maximo_total, self.total_activos)
+        time.sleep(self.retardo)
+        with self.lock:
+            self.activos[host] -= 1
+            self.total_activos -= 1
+        return True, "application/pdf"
+
+
+def crear_tareas(hosts, por_host):
+    return [
+        DownloadTask(url=f"https://{h}/archivo-{i}.pdf", destino=f"{h}-{i}.pdf")
+        for i in range(por_host)
+        for h in hosts
+    ]
+
+
+class TestOrdenDeterminista(unittest.TestCase):
+    """Results must come back in input order regardless of completion order"""
+
+    def test_resultados_en_orden_de_entrada(self):
+        """Slow early tasks should not reorder the results"""
+        tareas = [DownloadTask(url=f"https://h{i}.mx/{i}", destino=str(i)) for i in range(10)]
+
+        def fetch(url, destino):
+            # The first tasks take the longest
+            time.sleep(0.002 * (10 - int(destino)))
+            return True, destino
+
+        resultados = ConcurrentDownloader(fetch, max_workers=10, intervalo_host=0).run(tareas)
+
+        self.assertEqual([r.task.destino for r in resultados], [t.destino for t in tareas])
+        self.assertEqual([r.info for r in resultados], [t.destino for t in tareas])
+
+    def test_excepcion_se_reporta_como_fallo(self):
+        """An exception in fetch should produce a failed result, not abort the batch"""
+        def fetch(url, destino):
+            if destino == "malo":
+                raise RuntimeError("conexión rechazada")
+            return True, "ok"
+
+        tareas = [
+            DownloadTask(url="https://a.mx/1", destino="bueno"),
+            DownloadTask(url="https://a.mx/2", destino="malo"),
+        ]
+        resultados = ConcurrentDownloader(fetch, intervalo_host=0).run(tareas)
+
+        self.assertTrue(resultados[0].exito)
+        self.assertFalse(resultados[1].exito)
+        self.assertIn("conexión rechazada", str(resultados[1].info))
+
+    def test_lista_vacia(self):
+        """An empty batch should return no results"""
+        self.assertEqual(ConcurrentDownloader(lambda u, d: (True, "")).run([]), [])
+
+
+class TestLimitesConcurrencia(unittest.TestCase):
+    """Global and per-host limits must be respected"""
+
+    def test_limite_global(self):
+        """Never more than max_workers downloads at once"""
+        fetch = ContadorConcurrencia()
+        tareas = crear_tareas([f"h{i}.mx" for i in range(8)], 2)
+
+        ConcurrentDownloader(fetch, max_workers=3, max_por_host=2, intervalo_host=0).run(tareas)
+
+        self.assertLessEqual(fetch.maximo_total, 3)
+
+    def test_limite_por_host(self):
+        """Never more than max_por_host downloads against the same host"""
+        fetch = ContadorConcurrencia()
+        tareas = crear_tareas(["www.gob.mx", "otro.mx"], 6)
+
+        ConcurrentDownloader(fetch, max_workers=8, max_por_host=2, intervalo_host=0).run(tareas)
+
+        self.assertLessEqual(fetch.maximos["www.gob.mx"], 2)
+        self.assertLessEqual(fetch.maximos["otro.mx"], 2)
+
+    def test_intervalo_entre_inicios_mismo_host(self):
+        """Starts against the same host should be spaced by intervalo_host"""
+        inicios = []
+
+        def fetch(url, destino):
+            inicios.append(time.monotonic())
+            return True, ""
+
+        tareas = crear_tareas(["www.gob.mx"], 4)
+        ConcurrentDownloader(fetch, max_workers=4, max_por_host=4, intervalo_host=0.05).run(tareas)
+
+        inicios.sort()
+        separaciones = [b - a for a, b in zip(inicios, inicios[1:])]
+        self.assertTrue(all(s >= 0.04 for s in separaciones), separaciones)
+
+    def test_intervalo_no_ocupa_trabajador_global(self):
+        """Waiting for a throttled host should not hold back other hosts"""
+        inicios = {}
+        comienzo = time.monotonic()
+
+        def fetch(url, destino):
+            inicios.setdefault(url.split("/")[2], []).append(time.monotonic() - comienzo)
+            return True, ""
+
+        tareas = crear_tareas(["lento.mx"], 2) + crear_tareas(["otro.mx"], 1)
+        ConcurrentDownloader(fetch, max_workers=1, max_por_host=2, intervalo_host=0.3).run(tareas)
+
+        self.assertLess(inicios["otro.mx"][0], 0.2)
+        self.assertGreaterEqual(inicios["lento.mx"][1], 0.25)
+
+    def test_parametros_invalidos(self):
+        """Zero workers should be rejected"""
+        with self.assertRaises(ValueError):
+            ConcurrentDownloader(lambda u, d: (True, ""), max_workers=0)
+
+
+class FetchConFallos:
+    """Fake fetch that fails a given number of times per URL"""
+
+    def __init__(self, fallos, reintentable=True):
+        self.fallos = dict(fallos)
+        self.reintentable = reintentable
+        self.llamadas = []
+
+    def __call__(self, url, destino):
+        self.llamadas.append(url)
+        if self.fallos.get(url, 0) > 0:
+            self.fallos[url] -= 1
+            return False, DownloadFailure("503 Service Unavailable", self.reintentable)
+        return True, "ok"
+
+
+class TestReintentos(unittest.TestCase):
+    """Transient failures should be retried with backoff"""
+
+    def setUp(self):
+        self.politica = RetryPolicy(max_intentos=4, espera_base=0.001, jitter=0)
+
+    def test_fallo_transitorio_se_reintenta(self):
+        """A URL that fails twice should succeed on the third attempt"""
+        fetch = FetchConFallos({"https://www.gob.mx/a.pdf": 2})
+        tareas = [DownloadTask(url="https://www.gob.mx/a.pdf", destino="a")]
+
+        resultado = ConcurrentDownloader(fetch, intervalo_host=0, politica=self.politica).run(tareas)[0]
+
+        self.assertTrue(resultado.exito)
+        self.assertEqual(resultado.intentos, 3)
+        self.assertEqual(len(resultado.latencias), 3)
+
+    def test_fallo_permanente_no_se_reintenta(self):
+        """A non-retryable failure (e.g. 404) should stop after one attempt"""
+        fetch = FetchConFallos({"https://www.gob.mx/a.pdf": 5}, reintentable=False)
+        tareas = [DownloadTask(url="https://www.gob.mx/a.pdf", destino="a")]
+
+        resultado = ConcurrentDownloader(fetch, intervalo_host=0, politica=self.politica).run(tareas)[0]
+
+        self.assertFalse(resultado.exito)
+        self.assertEqual(resultado.intentos, 1)
+
+    def test_intentos_agotados(self):
+        """Attempts should stop at max_intentos"""
+        fetch = FetchConFallos({"https://www.gob.mx/a.pdf": 10})
+        tareas = [DownloadTask(url="https://www.gob.mx/a.pdf", destino="a")]
+
+        resultado = ConcurrentDownloader(fetch, intervalo_host=0, politica=self.politica).run(tareas)[0]
+
+        self.assertFalse(resultado.exito)
+        self.assertEqual(resultado.intentos, 4)
+        self.assertEqual(len(fetch.llamadas), 4)
+
+    def test_reintentos_no_bloquean_descargas_sanas(self):
+        """While one task backs off, the single worker serves other tasks"""
+        politica = RetryPolicy(max_intentos=2, espera_base=0.2, jitter=0)
+        fetch = FetchConFallos({"https://a.mx/lento": 1})
+        tareas = [DownloadTask(url="https://a.mx/lento", destino="0")] + [
+            DownloadTask(url=f"https://b.mx/{i}", destino=str(i)) for i in range(1, 4)
+        ]
+
+        ConcurrentDownloader(fetch, max_workers=1, intervalo_host=0, politica=politica).run(tareas)
+
+        # The retry of the failing URL happens after the healthy downloads
+        self.assertEqual(fetch.llamadas[-1], "https://a.mx/lento")
+
+    def test_circuito_abierto_no_gasta_intentos(self):
+        """Waiting for an open circuit should not count as an attempt"""
+        politica = RetryPolicy(max_intentos=2, espera_base=0.001, jitter=0)
+        fetch = FetchConFallos({"https://a.mx/0": 1})
+        tareas = [DownloadTask(url=f"https://a.mx/{i}", destino=str(i)) for i in range(3)]
+
+        resultados = ConcurrentDownloader(
+            fetch, max_por_host=1, intervalo_host=0, politica=politica,
+            crear_circuito=lambda: CircuitBreaker(umbral_fallos=1, enfriamiento=0.1),
+        ).run(tareas)
+
+        self.assertTrue(all(r.exito for r in resultados))
+        self.assertEqual([r.intentos for r in resultados], [2, 1, 1])
+        self.assertEqual(len(fetch.llamadas), 4)
+
+    def test_fallo_permanente_no_cierra_circuito(self):
+        """A non-retryable failure should not reset the breaker's failure count"""
+        circuito = CircuitBreaker(umbral_fallos=2)
+
+        def fetch(url, destino):
+            if url.endswith("/2"):
+                return False, DownloadFailure("404 Not Found", reintentable=False)
+            return False, DownloadFailure("503 Service Unavailable")
+
+        tareas = [DownloadTask(url=f"https://a.mx/{i}", destino=str(i)) for i in (1, 2, 3)]
+
+        ConcurrentDownloader(fetch, max_por_host=1, intervalo_host=0,
+                             crear_circuito=lambda: circuito).run(tareas)
+
+        self.assertEqual(circuito.estado, CircuitBreaker.ABIERTO)
+
+    def test_espera_exponencial(self):
+        """Backoff should grow geometrically and respect the cap"""
+        politica = RetryPolicy(espera_base=1.0, factor=2.0, espera_maxima=5.0, jitter=0)
+
+        self.assertEqual([politica.espera(i) for i in range(1, 5)], [1.0, 2.0, 4.0, 5.0])
+
+
+class TestCortacircuitos(unittest.TestCase):
+    """Per-host circuit breaker state machine"""
+
+    def setUp(self):
+        self.ahora = 0.0
+        self.circuito = CircuitBreaker(umbral_fallos=2, enfriamiento=10.0,
+                                       reloj=lambda: self.ahora)
+
+    def test_se_abre_tras_umbral(self):
+        """Consecutive failures should open the circuit"""
+        self.circuito.registrar_fallo()
+        self.assertTrue(self.circuito.permitir())
+        self.circuito.registrar_fallo()
+
+        self.assertEqual(self.circuito.estado, CircuitBreaker.ABIERTO)
+        self.assertFalse(self.circuito.permitir())
+
+    def test_semiabierto_permite_una_prueba(self):
+        """After cooldown a single probe is allowed; success closes it"""
+        self.circuito.registrar_fallo()
+        self.circuito.registrar_fallo()
+        self.ahora = 10.0
+
+        self.assertTrue(self.circuito.permitir())
+        self.assertFalse(self.circuito.permitir())
+        self.circuito.registrar_exito()
+        self.assertEqual(self.circuito.estado, CircuitBreaker.CERRADO)
+
+    def test_prueba_fallida_reabre(self):
+        """A failed probe should reopen the circuit"""
+        self.circuito.registrar_fallo()
+        self.circuito.registrar_fallo()
+        self.ahora = 10.0
+        self.circuito.permitir()
+        self.circuito.registrar_fallo()
+
+        self.assertEqual(self.circuito.estado, CircuitBreaker.ABIERTO)
+        self.assertEqual(self.circuito.segundos_restantes(), 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for fetch backends (coatlicue.downloads.backends)
+Tests file:// and local-mirror fetching, conditional no-op re-fetches
+and scheme routing without network access.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.downloads.backends import (
+    FetchBackend, FetchRouter, FileBackend, MirrorBackend, crear_router
+)
+from coatlicue.downloads.manifest import DownloadManifest
+
+
+class BackendTestCase(unittest.TestCase):
+    """Creates a temporary directory with a source file"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.contenido = os.urandom(3 * 1024 * 1024 + 17)
+        self.origen = os.path.join(self.test_dir, "origen", "formato 1.pdf")
+        os.makedirs(os.path.dirname(self.origen))
+        with open(self.origen, "wb") as f:
+            f.write(self.contenido)
+        self.destino = os.path.join(self.test_dir, "descargas", "formato.pdf")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class TestFileBackend(BackendTestCase):
+    """file:// URLs are copied and hashed at disk speed"""
+
+    def test_copia_con_hash(self):
+        """The copy should match the source and report its SHA-256"""
+        url = Path(self.origen).as_uri()
+
+        exito, datos = FileBackend().fetch(url, self.destino)
+
+        self.assertTrue(exito, datos)
+        self.assertEqual(datos["hash_sha256"], hashlib.sha256(self.contenido).hexdigest())
+        self.assertEqual(datos["tamaño"], len(self.contenido))
+        self.assertEqual(datos["content_type"], "application/pdf")
+        with open(self.destino, "rb") as f:
+            self.assertEqual(f.read(), self.contenido)
+        self.assertFalse(os.path.exists(self.destino + ".part"))
+
+    def test_varios_digests_en_una_pasada(self):
+        """Extra algorithms should be computed over the same copied bytes"""
+        url = Path(self.origen).as_uri()
+
+        exito, datos = FileBackend(["sha512", "sha3_256"]).fetch(url, self.destino)
+
+        self.assertTrue(exito, datos)
+        self.assertEqual(datos["hashes"], {
+            "sha256": hashlib.sha256(self.contenido).hexdigest(),
+            "sha512": hashlib.sha512(self.contenido).hexdigest(),
+            "sha3_256": hashlib.sha3_256(self.contenido).hexdigest(),
+        })
+
+    def test_origen_sin_cambios_no_se_copia(self):
+        """An unchanged source with a manifest entry should be a no-op"""
+        url = Path(self.origen).as_uri()
+        manifiesto = DownloadManifest(os.path.join(self.test_dir, "manifiesto.json"))
+        _, datos = FileBackend().fetch(url, self.destino, manifiesto)
+        manifiesto.actualizar(url, "formato.pdf", datos["hash_sha256"], datos["tamaño"],
+                              datos["etag"], datos["last_modified"])
+        mtime = os.stat(self.destino).st_mtime_ns
+
+        exito, datos = FileBackend().fetch(url, self.destino, manifiesto)
+
+        self.assertTrue(exito)
+        self.assertTrue(datos["no_modificado"])
+        self.assertEqual(os.stat(self.destino).st_mtime_ns, mtime)
+
+    def test_origen_inexistente_no_reintentable(self):
+        """A missing source file should be a permanent failure"""
+        exito, info = FileBackend().fetch(Path(self.test_dir, "nope.pdf").as_uri(), self.destino)
+
+        self.assertFalse(exito)
+        self.assertFalse(info.reintentable)
+        self.assertFalse(os.path.exists(self.destino))
+
+
+class TestMirrorBackend(BackendTestCase):
+    """http(s) URLs are resolved against <raiz>/<host>/<ruta>"""
+
+    def test_resuelve_url_en_espejo(self):
+        """The mirror should serve the file without network access"""
+        espejo = os.path.join(self.test_dir, "espejo")
+        ruta = os.path.join(espejo, "www.gob.mx", "cms", "uploads", "formato 1.pdf")
+        os.makedirs(os.path.dirname(ruta))
+        shutil.copy(self.origen, ruta)
+
+        router = crear_router(espejo=espejo)
+        exito, datos = router.fetch("https://www.gob.mx/cms/uploads/formato%201.pdf", self.destino)
+
+        self.assertTrue(exito, datos)
+        self.assertEqual(datos["hash_sha256"], hashlib.sha256(self.contenido).hexdigest())
+        self.assertIsInstance(router.backends["https"], MirrorBackend)
+
+
+class TestFetchRouter(unittest.TestCase):
+    """The router dispatches by URL scheme"""
+
+    def test_despacho_por_esquema(self):
+        """Each scheme should reach its backend; unknown schemes fail permanently"""
+        class Registro(FetchBackend):
+            def __init__(self):
+                self.urls = []
+
+            def fetch(self, url, ruta_destino, manifiesto=None, dir_parciales=None):
+                self.urls.append(url)
+                return True, {}
+
+        http, archivo = Registro(), Registro()
+        router = FetchRouter({"https": http, "file": archivo})
+
+        router.fetch("https://gob.mx/a.pdf", "a.pdf")
+        router.fetch("file:///tmp/b.pdf", "b.pdf")
+        exito, info = router.fetch("ftp://gob.mx/c.pdf", "c.pdf")
+
+        self.assertEqual(http.urls, ["https://gob.mx/a.pdf"])
+        self.assertEqual(archivo.urls, ["file:///tmp/b.pdf"])
+        self.assertFalse(exito)
+        self.assertFalse(info.reintentable)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
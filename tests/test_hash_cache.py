@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the persistent hash cache (coatlicue.hash_cache)
+Tests cache hits on unchanged files, invalidation on stat changes,
+the racy-mtime guard and paranoid rehashing.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.hash_cache import HashCache
+
+
+class TestHashCache(unittest.TestCase):
+    """Unchanged files are served from the cache"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache = HashCache(os.path.join(self.test_dir, "cache.sqlite"))
+        self.rutas = []
+        for i in range(5):
+            ruta = os.path.join(self.test_dir, f"f{i}.bin")
+            self.escribir(ruta, os.urandom(1000 + i))
+            self.rutas.append(ruta)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def escribir(self, ruta, contenido, antiguedad=3600):
+        """Write a file with an mtime safely outside the racy window"""
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+        pasado = time.time() - antiguedad
+        os.utime(ruta, (pasado, pasado))
+
+    def test_segunda_pasada_desde_cache(self):
+        """A second pass should not re-read any file"""
+        primera = self.cache.hash_archivos(self.rutas)
+        self.assertEqual(self.cache.fallos, 5)
+
+        segunda = self.cache.hash_archivos(self.rutas)
+
+        self.assertEqual(self.cache.aciertos, 5)
+        self.assertEqual(segunda, primera)
+        with open(self.rutas[0], "rb") as f:
+            self.assertEqual(segunda[0].hash, hashlib.sha256(f.read()).hexdigest())
+
+    def test_persistente_entre_instancias(self):
+        """Entries should survive closing and reopening the cache"""
+        self.cache.hash_archivos(self.rutas)
+        self.cache.close()
+
+        self.cache = HashCache(self.cache.ruta)
+        self.cache.hash_archivos(self.rutas)
+
+        self.assertEqual(self.cache.aciertos, 5)
+
+    def test_cambio_invalida_entrada(self):
+        """Rewriting a file with the same size but a new mtime should rehash it"""
+        self.cache.hash_archivos(self.rutas)
+        nuevo = os.urandom(1000)
+        self.escribir(self.rutas[0], nuevo, antiguedad=60)
+
+        resultado = self.cache.hash_archivos(self.rutas)
+
+        self.assertEqual(self.cache.fallos, 6)
+        self.assertEqual(resultado[0].hash, hashlib.sha256(nuevo).hexdigest())
+
+    def test_archivo_reciente_no_se_guarda(self):
+        """Files modified within the racy window should not be cached"""
+        ruta = os.path.join(self.test_dir, "reciente.bin")
+        with open(ruta, "wb") as f:
+            f.write(b"reciente")
+
+        self.cache.hash_archivos([ruta])
+        self.cache.hash_archivos([ruta])
+
+        self.assertEqual(self.cache.aciertos, 0)
+
+    def test_paranoid_relee_todo(self):
+        """Paranoid mode should ignore cached digests"""
+        self.cache.hash_archivos(self.rutas)
+
+        self.cache.hash_archivos(self.rutas, paranoid=True)
+
+        self.assertEqual(self.cache.aciertos, 0)
+        self.assertEqual(self.cache.fallos, 10)
+
+    def test_purgar_entradas_obsoletas(self):
+        """Entries of deleted files should be purged"""
+        self.cache.hash_archivos(self.rutas)
+        os.remove(self.rutas[0])
+
+        self.assertEqual(self.cache.purgar(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the shared file hasher (coatlicue.hashing)
+Tests buffered and mmap reads, parallel hashing order and the
+sha256sum-compatible CLI.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.hashing import (
+    TAMAÑO_BUFER, digests_archivo, hash_archivo, hash_archivos, hash_bytes, main,
+    normalizar_algoritmos
+)
+
+
+class HashingTestCase(unittest.TestCase):
+    """Creates a temporary evidence tree"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.archivos = {}
+        for i, tamaño in enumerate([0, 1, TAMAÑO_BUFER, TAMAÑO_BUFER * 3 + 5]):
+            ruta = os.path.join(self.test_dir, "sub" if i % 2 else "", f"f{i}.bin")
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            contenido = os.urandom(tamaño)
+            with open(ruta, "wb") as f:
+                f.write(contenido)
+            self.archivos[ruta] = contenido
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class TestHashArchivo(HashingTestCase):
+    """Single-file hashing matches hashlib"""
+
+    def test_bufer_y_mmap_coinciden(self):
+        """Buffered reads and mmap should produce the reference digest"""
+        for ruta, contenido in self.archivos.items():
+            esperado = (hashlib.sha256(contenido).hexdigest(), len(contenido))
+            self.assertEqual(hash_archivo(ruta, usar_mmap=False), esperado)
+            self.assertEqual(hash_archivo(ruta, usar_mmap=True), esperado)
+
+    def test_otro_algoritmo(self):
+        """Any hashlib algorithm name should be accepted"""
+        ruta, contenido = next(iter(self.archivos.items()))
+        self.assertEqual(hash_archivo(ruta, "sha512")[0], hashlib.sha512(contenido).hexdigest())
+
+    def test_hash_de_contenido_leido(self):
+        """Hashing bytes already in memory should match hashing the file"""
+        for ruta, contenido in self.archivos.items():
+            self.assertEqual(hash_bytes(contenido), hash_archivo(ruta)[0])
+        self.assertEqual(hash_bytes(b"abc", "sha512"), hashlib.sha512(b"abc").hexdigest())
+
+
+class TestMultiDigest(HashingTestCase):
+    """Several digests are computed from a single read pass"""
+
+    def test_todos_los_digests_en_una_pasada(self):
+        """Each digest should match its hashlib reference"""
+        algoritmos = ["sha256", "sha512", "sha3_256"]
+        for ruta, contenido in self.archivos.items():
+            for usar_mmap in (False, True):
+                digests, tamaño = digests_archivo(ruta, algoritmos, usar_mmap)
+                self.assertEqual(tamaño, len(contenido))
+                for algoritmo in algoritmos:
+                    self.assertEqual(digests[algoritmo],
+                                     hashlib.new(algoritmo, contenido).hexdigest())
+
+    def test_normalizar_algoritmos(self):
+        """The primary algorithm goes first; unknown names are rejected"""
+        self.assertEqual(normalizar_algoritmos(["SHA-512", "sha3-256", "sha256"]),
+                         ["sha256", "sha512", "sha3_256"])
+        with self.assertRaises(ValueError):
+            normalizar_algoritmos(["no-existe"])
+
+    def test_hash_archivos_con_extras(self):
+        """Parallel hashing should report every requested digest"""
+        resultados = hash_archivos(self.archivos, algoritmos=["sha512"])
+
+        for r in resultados:
+            self.assertEqual(set(r.hashes), {"sha256", "sha512"})
+            self.assertEqual(r.hash, r.hashes["sha256"])
+
+
+class TestHashArchivos(HashingTestCase):
+    """Parallel hashing keeps input order and isolates failures"""
+
+    def test_orden_y_errores(self):
+        """Results should follow input order; a missing file gets an error"""
+        rutas = list(self.archivos) + [os.path.join(self.test_dir, "nope.bin")]
+
+        resultados = hash_archivos(rutas, workers=4)
+
+        self.assertEqual([r.ruta for r in resultados], rutas)
+        for r in resultados[:-1]:
+            self.assertEqual(r.hash, hashlib.sha256(self.archivos[r.ruta]).hexdigest())
+        self.assertIsNone(resultados[-1].hash)
+        self.assertIsNotNone(resultados[-1].error)
+
+
+class TestCLI(HashingTestCase):
+    """The CLI emits and verifies sha256sum-style sums"""
+
+    def test_generar_y_verificar(self):
+        """Sums produced by the CLI should verify, and detect tampering"""
+        salida = io.StringIO()
+        with redirect_stdout(salida):
+            self.assertEqual(main([self.test_dir]), 0)
+        sumas = os.path.join(tempfile.mkdtemp(), "sumas.txt")
+        self.addCleanup(shutil.rmtree, os.path.dirname(sumas))
+        with open(sumas, "w", encoding="utf-8") as f:
+            f.write(salida.getvalue())
+        self.assertEqual(len(salida.getvalue().splitlines()), len(self.archivos))
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main(["--verificar", sumas]), 0)
+
+        with open(next(iter(self.archivos)), "ab") as f:
+            f.write(b"x")
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            self.assertEqual(main(["--verificar", sumas]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
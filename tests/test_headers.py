@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the local Bitcoin block-header cache (coatlicue.headers)
+Tests header fields, proof-of-work and chaining checks, persistence and
+the offline import formats.
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.headers import (
+    BlockHeaderStore, hash_cabecera, main, raiz_merkle, tiempo, validar_cabecera
+)
+
+GENESIS = bytes.fromhex(
+    "0100000000000000000000000000000000000000000000000000000000000000"
+    "000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa"
+    "4b1e5e4a29ab5f49ffff001d1dac2b7c")
+BLOQUE_1 = bytes.fromhex(
+    "010000006fe28c0ab6f1b372c1a6a246ae63f74f931e8365e15a089c68d61900"
+    "00000000982051fd1e4ba744bbbe680e1fee14677ba1a3c3540bf7b1cdb606e8"
+    "57233e0e61bc6649ffff001d01e36299")
+
+
+class HeadersTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ruta = os.path.join(self.test_dir, "cabeceras_bitcoin.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class TestCabecera(unittest.TestCase):
+    """Header fields and proof of work"""
+
+    def test_campos_del_bloque_genesis(self):
+        """Hash, Merkle root and time should match the genesis block"""
+        self.assertEqual(hash_cabecera(GENESIS)[::-1].hex(),
+                         "000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f")
+        self.assertEqual(raiz_merkle(GENESIS)[::-1].hex(),
+                         "4a5e1e4baab89f3a32518a88c31bc87f618f76673e2cc77ab2127b7afdeda33b")
+        self.assertEqual(tiempo(GENESIS), 1231006505)
+        validar_cabecera(GENESIS)
+
+    def test_cabecera_sin_prueba_de_trabajo(self):
+        """A changed nonce or a wrong length should be rejected"""
+        with self.assertRaises(ValueError):
+            validar_cabecera(GENESIS[:-1] + b"\x00")
+        with self.assertRaises(ValueError):
+            validar_cabecera(GENESIS + b"\x00")
+
+
+class TestCache(HeadersTestCase):
+    """The cache on disk"""
+
+    def test_persistencia_y_duplicados(self):
+        """Headers should survive reopening; re-adding the same one is a no-op"""
+        cache = BlockHeaderStore(self.ruta)
+        self.assertEqual(cache.importar([(0, GENESIS), (1, BLOQUE_1)]), 2)
+        self.assertEqual(cache.importar([(1, BLOQUE_1)]), 0)
+
+        cache = BlockHeaderStore(self.ruta)
+        self.assertEqual(cache.alturas(), [0, 1])
+        self.assertEqual(cache.obtener(1), BLOQUE_1)
+        self.assertIsNone(cache.obtener(2))
+
+    def test_conflictos_y_encadenamiento(self):
+        """A different header for a stored height, or a broken link, should be rejected"""
+        cache = BlockHeaderStore(self.ruta)
+        cache.importar([(1, BLOQUE_1)])
+        with self.assertRaises(ValueError):
+            cache.agregar(1, GENESIS)
+        with self.assertRaises(ValueError):
+            cache.agregar(2, GENESIS)
+        self.assertTrue(cache.agregar(0, GENESIS))
+
+    def test_cli_importar(self):
+        """Text and contiguous binary header files should import"""
+        texto = os.path.join(self.test_dir, "cabeceras.txt")
+        with open(texto, "w") as f:
+            f.write(f"# altura cabecera\n1 {BLOQUE_1.hex()}\n")
+        binario = os.path.join(self.test_dir, "blockchain_headers")
+        with open(binario, "wb") as f:
+            f.write(GENESIS + BLOQUE_1)
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main(["importar", texto, "--cache", self.ruta]), 0)
+            self.assertEqual(main(["importar", binario, "--binario", "--cache", self.ruta]), 0)
+            with open(binario, "r+b") as f:
+                f.write(b"\x02")
+            self.assertEqual(main(["importar", binario, "--binario", "--cache", self.ruta]), 1)
+        self.assertEqual(BlockHeaderStore(self.ruta).alturas(), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
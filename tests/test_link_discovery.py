@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for link discovery (coatlicue.downloads.discovery)
+Tests streaming link extraction and ETag-cached incremental regeneration
+of enlaces_descarga.json against a local fixture HTTP server.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.downloads.discovery import descubrir_enlaces, extraer_enlaces
+
+PAGINA = """<html><head><meta charset="utf-8"><title>Formatos</title></head><body>
+<p>Formatos de auditoría</p>
+<a href="/cms/uploads/attachment/file/669152/formato-1.docx">Word</a>
+<a href="https://www.gob.mx/cms/uploads/attachment/file/669173/instructivo-1.pdf">
+  Instructivo   Formato 1
+</a>
+<a href="/buengobierno">Inicio</a>
+<a href="/cms/uploads/attachment/file/669168/formato-3.xlsx"><span>Excel</span></a>
+<a href="/cms/uploads/attachment/file/669152/formato-1.docx">Word (duplicado)</a>
+<a href="/cms/uploads/attachment/file/1/guía-á.pdf">Guía de revisión</a>
+</body></html>"""
+
+
+class CatalogoHandler(BaseHTTPRequestHandler):
+    """Serves a catalog page with ETag support"""
+
+    pagina = PAGINA
+    peticiones = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        CatalogoHandler.peticiones += 1
+        cuerpo = self.pagina.encode("utf-8")
+        etag = '"%s"' % hashlib.sha256(cuerpo).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class TestExtraccionEnlaces(unittest.TestCase):
+    """Links are extracted incrementally from byte fragments"""
+
+    def test_extrae_formatos_con_etiqueta(self):
+        """Only format links should be kept, with normalized labels"""
+        enlaces = extraer_enlaces([PAGINA.encode("utf-8")], "https://www.gob.mx/buengobierno/documentos/x")
+
+        self.assertEqual([e["text"] for e in enlaces],
+                         ["Word", "Instructivo Formato 1", "Excel", "Guía de revisión"])
+        self.assertEqual(enlaces[0]["url"],
+                         "https://www.gob.mx/cms/uploads/attachment/file/669152/formato-1.docx")
+
+    def test_fragmentos_pequeños_dan_mismo_resultado(self):
+        """Splitting the input (even inside UTF-8 sequences) must not change the output"""
+        datos = PAGINA.encode("utf-8")
+        fragmentos = [datos[i:i + 7] for i in range(0, len(datos), 7)]
+
+        self.assertEqual(extraer_enlaces(fragmentos, "https://www.gob.mx/"),
+                         extraer_enlaces([datos], "https://www.gob.mx/"))
+
+
+class TestDescubrimientoIncremental(unittest.TestCase):
+    """The link list is only rewritten when the link set changes"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), CatalogoHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/catalogo"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.enlaces = os.path.join(self.test_dir, "enlaces_descarga.json")
+        self.cache = os.path.join(self.test_dir, "cache.json")
+        CatalogoHandler.pagina = PAGINA
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def descubrir(self):
+        return descubrir_enlaces([self.url], self.enlaces, self.cache)
+
+    def test_primera_ejecucion_genera_lista(self):
+        """First run should write the link list"""
+        resumen = self.descubrir()
+
+        self.assertTrue(resumen["cambiado"])
+        with open(self.enlaces, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+    def test_pagina_sin_cambios_usa_cache(self):
+        """Second run should get a 304 and leave the list untouched"""
+        self.descubrir()
+        mtime = os.stat(self.enlaces).st_mtime_ns
+
+        resumen = self.descubrir()
+
+        self.assertFalse(resumen["cambiado"])
+        self.assertEqual(resumen["paginas_sin_cambios"], 1)
+        self.assertEqual(os.stat(self.enlaces).st_mtime_ns, mtime)
+
+    def test_reordenar_no_reescribe(self):
+        """Only a change of the link set should rewrite the list"""
+        self.descubrir()
+        with open(self.enlaces, encoding="utf-8") as f:
+            enlaces = json.load(f)
+        with open(self.enlaces, "w", encoding="utf-8") as f:
+            json.dump(list(reversed(enlaces)), f)
+        os.remove(self.cache)
+
+        resumen = self.descubrir()
+
+        self.assertFalse(resumen["cambiado"])
+
+    def test_enlace_nuevo_reescribe(self):
+        """A new link on the page should be detected and written"""
+        self.descubrir()
+        CatalogoHandler.pagina = PAGINA.replace(
+            "</body>", '<a href="/cms/uploads/attachment/file/9/formato-26.docx">Word</a></body>')
+
+        resumen = self.descubrir()
+
+        self.assertTrue(resumen["cambiado"])
+        self.assertEqual(len(resumen["agregados"]), 1)
+        self.assertTrue(resumen["agregados"][0].endswith("formato-26.docx"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
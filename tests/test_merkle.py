@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the binary Merkle tree (coatlicue.merkle)
+Tests RFC 6962 reference roots, O(log n) inclusion proofs for every leaf,
+tamper detection and the proofs written for hashes_archivos.json.
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue import merkle
+from coatlicue.merkle import (
+    MerkleTree, construir, hash_hoja, hash_nodo, main, verificar_prueba
+)
+
+# Certificate Transparency reference inputs and roots (RFC 6962)
+HOJAS_CT = [b"", b"\x00", b"\x10", b"\x20\x21", b"\x30\x31", b"\x40\x41\x42\x43",
+            bytes(range(0x50, 0x58)), bytes(range(0x60, 0x70))]
+RAICES_CT = {
+    1: "6e340b9cffb37a989ca544e6bb780a2c78901d3fb33738768511a30617afa01d",
+    2: "fac54203e7cc696cf0dfcb42c92a1d9dbaf70ad9e621f4bd8d98662f00e3c125",
+    3: "aeb6bcfe274b70a14fb067a5e5578264db0fa9b51af5e0ba159158f329e06e77",
+    5: "4e3bbb1f7b478dcfe71fb631631519a3bca12c9aefca1612bfce4c13a86264d4",
+    8: "5dc9da79a70659a9ad559cb701ded9a2ab9d823aad2f4960cfe370eff4604328",
+}
+
+
+def mth(hojas):
+    """Recursive Merkle Tree Hash exactly as written in RFC 6962 section 2.1"""
+    if len(hojas) == 1:
+        return hash_hoja(hojas[0])
+    k = 1 << ((len(hojas) - 1).bit_length() - 1)
+    return hash_nodo(mth(hojas[:k]), mth(hojas[k:]))
+
+
+def hashes_archivos(n):
+    return [{"nombre": f"formato_{i}.pdf", "hash": hashlib.sha256(b"%d" % i).hexdigest()}
+            for i in range(n)]
+
+
+class TestArbol(unittest.TestCase):
+    """Roots and proofs match RFC 6962"""
+
+    def test_vectores_de_referencia(self):
+        """Roots should match the Certificate Transparency test vectors"""
+        for n, raiz in RAICES_CT.items():
+            self.assertEqual(MerkleTree(HOJAS_CT[:n]).raiz.hex(), raiz)
+
+    def test_igual_a_la_definicion_recursiva(self):
+        """Level-by-level construction should equal the recursive definition"""
+        for n in range(1, 40):
+            hojas = [hashlib.sha256(b"%d" % i).digest() for i in range(n)]
+            self.assertEqual(MerkleTree(hojas).raiz, mth(hojas), n)
+
+    def test_pruebas_de_todas_las_hojas(self):
+        """Every leaf should have a valid proof of at most ceil(log2 n) hashes"""
+        for n in (1, 2, 7, 52, 64):
+            hojas = [hashlib.sha256(b"%d" % i).digest() for i in range(n)]
+            arbol = MerkleTree(hojas)
+            for i, hoja in enumerate(hojas):
+                ruta = arbol.prueba(i)
+                self.assertLessEqual(len(ruta), math.ceil(math.log2(n)))
+                self.assertTrue(verificar_prueba(hoja.hex(), ruta, arbol.raiz.hex()))
+
+    def test_prueba_alterada(self):
+        """A wrong leaf, sibling or side should not reach the root"""
+        hojas = [hashlib.sha256(b"%d" % i).digest() for i in range(10)]
+        arbol = MerkleTree(hojas)
+        raiz = arbol.raiz.hex()
+        ruta = arbol.prueba(3)
+
+        self.assertFalse(verificar_prueba(hojas[4].hex(), ruta, raiz))
+        otra = [dict(paso) for paso in ruta]
+        otra[1]["hash"] = "00" * 32
+        self.assertFalse(verificar_prueba(hojas[3].hex(), otra, raiz))
+        otra = [dict(paso) for paso in ruta]
+        otra[0]["lado"] = "izquierda" if otra[0]["lado"] == "derecha" else "derecha"
+        self.assertFalse(verificar_prueba(hojas[3].hex(), otra, raiz))
+
+    def test_hoja_no_se_confunde_con_nodo(self):
+        """An internal node presented as a leaf should not verify (domain separation)"""
+        hojas = [hashlib.sha256(b"%d" % i).digest() for i in range(4)]
+        arbol = MerkleTree(hojas)
+        nodo = arbol.nodo(1, 0)
+        self.assertFalse(verificar_prueba(nodo.hex(), arbol.prueba(2)[1:], arbol.raiz.hex()))
+
+
+class TestNivelesContiguos(unittest.TestCase):
+    """Batched and multi-process construction over contiguous buffers"""
+
+    def test_bufer_igual_a_lista(self):
+        """A buffer of concatenated digests should give the same levels as a list"""
+        for n in (1, 2, 3, 33):
+            hojas = [hashlib.sha256(b"%d" % i).digest() for i in range(n)]
+            self.assertEqual(MerkleTree(bytearray(b"".join(hojas))).niveles,
+                             MerkleTree(hojas).niveles, n)
+        with self.assertRaises(ValueError):
+            MerkleTree(b"\x00" * 33)
+        with self.assertRaises(ValueError):
+            MerkleTree(b"")
+
+    def test_lotes_en_procesos(self):
+        """Small batches spread across processes should give the same tree"""
+        hojas = [hashlib.sha256(b"%d" % i).digest() for i in range(301)]
+        esperado = MerkleTree(hojas, workers=1)
+        with mock.patch.object(merkle, "TAMAÑO_LOTE", 7), \
+                mock.patch.object(merkle, "UMBRAL_PARALELO", 16):
+            arbol = MerkleTree(b"".join(hojas), workers=2)
+        self.assertEqual(arbol.niveles, esperado.niveles)
+        self.assertEqual(arbol.raiz, mth(hojas))
+        self.assertEqual(arbol.prueba(300), esperado.prueba(300))
+
+
+class TestConstruir(unittest.TestCase):
+    """Tree and proofs for hashes_archivos.json"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_arbol_y_pruebas(self):
+        """Leaves should be sorted and every file should have a proof to the root"""
+        items = hashes_archivos(52)
+        resultado = construir(items)
+
+        arbol, pruebas = resultado["arbol"], resultado["pruebas"]
+        self.assertEqual(arbol["hashes_hojas"], sorted(item["hash"] for item in items))
+        self.assertEqual(arbol["num_hojas"], 52)
+        for item in items:
+            prueba = pruebas["pruebas"][item["nombre"]]
+            self.assertEqual(arbol["hashes_hojas"][prueba["indice"]], item["hash"])
+            self.assertTrue(verificar_prueba(item["hash"], prueba["ruta"], arbol["hash_raiz"]))
+        self.assertIsNone(construir([]))
+
+    def test_cli_verificar(self):
+        """The CLI should verify a single file against merkle_proofs.json"""
+        rutas, items = [], []
+        for i in range(5):
+            ruta = os.path.join(self.test_dir, f"formato_{i}.pdf")
+            with open(ruta, "wb") as f:
+                f.write(b"contenido %d" % i)
+            rutas.append(ruta)
+            items.append({"nombre": f"formato_{i}.pdf",
+                          "hash": hashlib.sha256(b"contenido %d" % i).hexdigest()})
+        ruta_hashes = os.path.join(self.test_dir, "hashes_archivos.json")
+        ruta_pruebas = os.path.join(self.test_dir, "merkle_proofs.json")
+        with open(ruta_hashes, "w") as f:
+            json.dump(items, f)
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main(["construir", "--hashes", ruta_hashes,
+                                   "--arbol", os.path.join(self.test_dir, "merkle_tree.json"),
+                                   "--pruebas", ruta_pruebas]), 0)
+            self.assertEqual(main(["verificar", rutas[2], "--pruebas", ruta_pruebas]), 0)
+            with open(rutas[2], "ab") as f:
+                f.write(b"!")
+            self.assertEqual(main(["verificar", rutas[2], "--pruebas", ruta_pruebas]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the append-only Merkle accumulator (coatlicue.mmr)
+Tests that every prefix root equals the RFC 6962 tree, consistency proofs
+between all sizes, persistence across runs and recovery from torn writes.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.merkle import MerkleTree
+from coatlicue.mmr import (
+    MerkleMountainRange, agregar_hashes, auditar, documento_consistencia, main,
+    verificar_consistencia
+)
+
+
+def digests(inicio, fin):
+    return [hashlib.sha256(b"%d" % i).digest() for i in range(inicio, fin)]
+
+
+class MMRTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.dir_mmr = os.path.join(self.test_dir, "merkle_mmr")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+
+class TestRaicesYPruebas(MMRTestCase):
+    """Roots and consistency proofs match RFC 6962"""
+
+    def test_raiz_de_cada_prefijo(self):
+        """The root of the first m leaves should equal a fresh MerkleTree over them"""
+        mmr = MerkleMountainRange(self.dir_mmr)
+        hojas = digests(0, 70)
+        for i in range(0, 70, 9):
+            mmr.agregar(hojas[i:i + 9])
+        self.assertEqual(mmr.num_hojas, 70)
+        for m in range(1, 71):
+            self.assertEqual(mmr.raiz(m), MerkleTree(hojas[:m]).raiz, m)
+
+    def test_consistencia_entre_todos_los_tamanos(self):
+        """Every older size should be provably a prefix of every newer one"""
+        mmr = MerkleMountainRange(self.dir_mmr)
+        mmr.agregar(digests(0, 20))
+        for n in range(1, 21):
+            raiz_n = mmr.raiz(n)
+            for m in range(1, n + 1):
+                prueba = mmr.prueba_consistencia(m, n)
+                self.assertTrue(verificar_consistencia(m, mmr.raiz(m), n, raiz_n, prueba), (m, n))
+
+    def test_prueba_alterada(self):
+        """A forged root, a swapped size or a modified proof hash should be rejected"""
+        mmr = MerkleMountainRange(self.dir_mmr)
+        mmr.agregar(digests(0, 13))
+        raiz_m, raiz_n = mmr.raiz(6), mmr.raiz(13)
+        prueba = mmr.prueba_consistencia(6, 13)
+
+        otra = MerkleMountainRange(os.path.join(self.test_dir, "otro"))
+        otra.agregar(digests(100, 106) + digests(6, 13))
+        self.assertFalse(verificar_consistencia(6, raiz_m, 13, otra.raiz(), prueba))
+        self.assertFalse(verificar_consistencia(5, raiz_m, 13, raiz_n, prueba))
+        self.assertFalse(verificar_consistencia(6, raiz_m, 13, raiz_n, prueba[:-1]))
+        for i in range(len(prueba)):
+            mala = list(prueba)
+            mala[i] = b"\x00" * 32
+            self.assertFalse(verificar_consistencia(6, raiz_m, 13, raiz_n, mala), i)
+
+
+class TestPersistencia(MMRTestCase):
+    """The accumulator on disk across runs"""
+
+    def test_reabrir_y_deduplicar(self):
+        """Reopening should keep the leaves and only append hashes not seen before"""
+        items = [{"nombre": f"formato_{i}.pdf", "hash": d.hex()}
+                 for i, d in enumerate(digests(0, 8))]
+        mmr = MerkleMountainRange(self.dir_mmr)
+        self.assertEqual(agregar_hashes(mmr, items), 8)
+        anterior = mmr.registrar_raiz()
+
+        items[0] = {"nombre": "formato_0.pdf", "hash": hashlib.sha256(b"nuevo").hexdigest()}
+        mmr = MerkleMountainRange(self.dir_mmr)
+        self.assertEqual(mmr.num_hojas, 8)
+        self.assertEqual(agregar_hashes(mmr, items), 1)
+        self.assertEqual(agregar_hashes(mmr, items), 0)
+        mmr.registrar_raiz()
+
+        self.assertEqual([r["num_hojas"] for r in mmr.historial()], [8, 9])
+        self.assertEqual(mmr.raiz(8).hex(), anterior["raiz"])
+        self.assertEqual(auditar(mmr), [])
+
+    def test_indice_de_hojas(self):
+        """The leaf index should be rebuilt if missing and follow truncated leaves"""
+        mmr = MerkleMountainRange(self.dir_mmr)
+        mmr.agregar(digests(0, 10))
+        self.assertEqual(mmr.posicion(digests(7, 8)[0]), 7)
+        self.assertIsNone(mmr.posicion(digests(10, 11)[0]))
+
+        del mmr
+        os.remove(os.path.join(self.dir_mmr, "indice_hojas.sqlite"))
+        mmr = MerkleMountainRange(self.dir_mmr)
+        self.assertEqual(mmr.posicion(digests(9, 10)[0]), 9)
+
+        with open(os.path.join(self.dir_mmr, "nivel_00.bin"), "r+b") as f:
+            f.truncate(6 * 32)
+        mmr = MerkleMountainRange(self.dir_mmr)
+        self.assertIsNone(mmr.posicion(digests(7, 8)[0]))
+        self.assertEqual(agregar_hashes(mmr, [{"hash": d.hex()} for d in digests(0, 10)]), 4)
+        self.assertEqual(mmr.raiz(), MerkleTree(digests(0, 6) + sorted(digests(6, 10))).raiz)
+
+    def test_reparar_escritura_interrumpida(self):
+        """Stray bytes and missing upper nodes should be repaired on open"""
+        mmr = MerkleMountainRange(self.dir_mmr)
+        mmr.agregar(digests(0, 12))
+        raiz = mmr.raiz()
+
+        with open(os.path.join(self.dir_mmr, "nivel_00.bin"), "ab") as f:
+            f.write(b"\xff" * 7)
+        os.remove(os.path.join(self.dir_mmr, "nivel_02.bin"))
+        with open(os.path.join(self.dir_mmr, "nivel_01.bin"), "r+b") as f:
+            f.truncate(3 * 32)
+
+        mmr = MerkleMountainRange(self.dir_mmr)
+        self.assertEqual(mmr.num_hojas, 12)
+        self.assertEqual(mmr.raiz(), raiz)
+        mmr.agregar(digests(12, 17))
+        self.assertEqual(mmr.raiz(), MerkleTree(digests(0, 17)).raiz)
+
+    def test_auditar_detecta_historial_alterado(self):
+        """A rewritten root in raices.jsonl should be reported"""
+        mmr = MerkleMountainRange(self.dir_mmr)
+        mmr.agregar(digests(0, 4))
+        mmr.registrar_raiz()
+        mmr.agregar(digests(4, 9))
+        mmr.registrar_raiz()
+
+        ruta = os.path.join(self.dir_mmr, "raices.jsonl")
+        with open(ruta) as f:
+            lineas = [json.loads(linea) for linea in f]
+        lineas[0]["raiz"] = "00" * 32
+        with open(ruta, "w") as f:
+            f.writelines(json.dumps(linea) + "\n" for linea in lineas)
+
+        self.assertEqual(len(auditar(MerkleMountainRange(self.dir_mmr))), 2)
+
+    def test_cli_verificar_documento(self):
+        """A standalone proof document should verify without the accumulator"""
+        mmr = MerkleMountainRange(self.dir_mmr)
+        mmr.agregar(digests(0, 11))
+        ruta = os.path.join(self.test_dir, "consistencia.json")
+        documento = documento_consistencia(mmr, 7, 11)
+        with open(ruta, "w") as f:
+            json.dump(documento, f)
+        shutil.rmtree(self.dir_mmr)
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main(["verificar", ruta]), 0)
+            documento["raiz_anterior"] = "11" * 32
+            with open(ruta, "w") as f:
+                json.dump(documento, f)
+            self.assertEqual(main(["verificar", ruta]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for the OpenTimestamps proof format (coatlicue.ots)
+Tests byte-exact parsing and serialization of real .ots files, malformed
+proofs, per-file proofs derived from a single Merkle root stamp, and
+offline verification against cached block headers.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue import ots
+from coatlicue.merkle import construir
+
+DIR_PRUEBAS_REPO = Path(__file__).parent.parent / "blockchain_proofs"
+GENESIS = bytes.fromhex(
+    "0100000000000000000000000000000000000000000000000000000000000000"
+    "000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa"
+    "4b1e5e4a29ab5f49ffff001d1dac2b7c")
+
+
+def sellar(digest):
+    """Root proof shaped like the one `ots stamp` writes (nonce, sha256, calendar)"""
+    timestamp = ots.Timestamp(digest)
+    nodo = timestamp.agregar(ots.Op(ots.OP_APPEND, b"\x11" * 16)).agregar(ots.Op(ots.OP_SHA256))
+    nodo.atestaciones.append(ots.atestacion_pendiente("https://alice.btc.calendar.opentimestamps.org"))
+    return ots.DetachedTimestampFile(ots.Op(ots.OP_SHA256), timestamp)
+
+
+class TestFormato(unittest.TestCase):
+    """Parsing and serialization of the binary format"""
+
+    @unittest.skipUnless(DIR_PRUEBAS_REPO.is_dir(), "no blockchain_proofs/ in the tree")
+    def test_pruebas_reales_ida_y_vuelta(self):
+        """Every .ots produced by the reference client should re-serialize byte for byte"""
+        rutas = sorted(DIR_PRUEBAS_REPO.glob("*.ots"))
+        for ruta in rutas:
+            datos = ruta.read_bytes()
+            archivo_ots = ots.DetachedTimestampFile.leer(datos)
+            self.assertEqual(archivo_ots.serializar(), datos, ruta.name)
+            self.assertTrue(all(a.tipo == "pendiente" for _, a in
+                                archivo_ots.timestamp.atestaciones_con_mensaje()))
+
+    def test_bifurcaciones_y_atestaciones(self):
+        """Forks, Bitcoin heights and unknown attestations should survive a round trip"""
+        timestamp = ots.Timestamp(hashlib.sha256(b"evidencia").digest())
+        rama = timestamp.agregar(ots.Op(ots.OP_PREPEND, b"\x01\x02"))
+        rama.agregar(ots.Op(ots.OP_SHA256)).atestaciones.append(ots.atestacion_bitcoin(358391))
+        otra = timestamp.agregar(ots.Op(ots.OP_APPEND, b"\x03")).agregar(ots.Op(ots.OP_RIPEMD160))
+        otra.atestaciones += [ots.atestacion_pendiente("https://b.example"),
+                              ots.Attestation(b"\x01" * 8, b"\xaa\xbb")]
+        original = ots.DetachedTimestampFile(ots.Op(ots.OP_SHA256), timestamp)
+
+        datos = original.serializar()
+        leido = ots.DetachedTimestampFile.leer(datos)
+
+        self.assertEqual(leido.serializar(), datos)
+        atestaciones = {str(a): m for m, a in leido.timestamp.atestaciones_con_mensaje()}
+        self.assertEqual(atestaciones["bitcoin bloque 358391"],
+                         hashlib.sha256(b"\x01\x02" + timestamp.mensaje).digest())
+        self.assertIn("pendiente en https://b.example", atestaciones)
+        self.assertIn("desconocida " + "01" * 8, atestaciones)
+
+    def test_pruebas_malformadas(self):
+        """Truncated data, a wrong header or an unknown operation should raise ValueError"""
+        datos = sellar(b"\x00" * 32).serializar()
+        for malos in (datos[:-3], b"X" + datos[1:], datos + b"\x00",
+                      datos.replace(b"\xf0\x10", b"\x99\x10", 1)):
+            with self.assertRaises(ValueError):
+                ots.DetachedTimestampFile.leer(malos)
+
+
+class TestDerivacion(unittest.TestCase):
+    """Per-file proofs derived from one Merkle root stamp"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.items = [{"nombre": f"formato_{i}.pdf", "hash": hashlib.sha256(b"%d" % i).hexdigest()}
+                      for i in range(7)]
+        resultado = construir(self.items)
+        self.pruebas = resultado["pruebas"]
+        self.ots_raiz = sellar(hashlib.sha256(bytes.fromhex(resultado["arbol"]["hash_raiz"])).digest())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_cada_archivo_llega_a_la_atestacion_de_la_raiz(self):
+        """Replaying a derived proof should reach the root's calendar commitment"""
+        (mensaje_raiz, atestacion_raiz), = self.ots_raiz.timestamp.atestaciones_con_mensaje()
+
+        escritos = ots.derivar_pruebas(self.ots_raiz, self.pruebas, self.test_dir)
+
+        self.assertEqual(len(escritos), 7)
+        for item in self.items:
+            archivo_ots = ots.cargar_ots(escritos[item["nombre"]])
+            self.assertEqual(archivo_ots.digest.hex(), item["hash"])
+            (mensaje, atestacion), = archivo_ots.timestamp.atestaciones_con_mensaje()
+            self.assertEqual((mensaje, atestacion), (mensaje_raiz, atestacion_raiz))
+
+    def test_ruta_ajena_a_la_raiz(self):
+        """A path that does not lead to the stamped root should be rejected"""
+        prueba = self.pruebas["pruebas"]["formato_0.pdf"]
+        with self.assertRaises(ValueError):
+            ots.derivar_ots(self.items[1]["hash"], prueba["ruta"], self.ots_raiz)
+
+
+def prueba_genesis(altura=0):
+    """Proof whose replayed message is the genesis block's Merkle root"""
+    timestamp = ots.Timestamp(GENESIS[36:68][::-1])
+    timestamp.agregar(ots.Op(ots.OP_REVERSE)).atestaciones.append(ots.atestacion_bitcoin(altura))
+    return ots.DetachedTimestampFile(ots.Op(ots.OP_SHA256), timestamp)
+
+
+class TestVerificacion(unittest.TestCase):
+    """Offline verification against cached block headers"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def guardar(self, nombre, archivo_ots):
+        ruta = os.path.join(self.test_dir, nombre)
+        ots.guardar_ots(ruta, archivo_ots)
+        return ruta
+
+    def test_atestacion_bitcoin_verificada(self):
+        """A Bitcoin attestation matching the cached header should verify with the block time"""
+        ruta = self.guardar("genesis.ots", prueba_genesis())
+
+        resultado = ots.verificar_ots(ruta, {0: GENESIS})
+
+        self.assertEqual(resultado.estado, ots.VERIFICADO)
+        self.assertEqual((resultado.altura, resultado.tiempo), (0, 1231006505))
+        self.assertTrue(resultado.fecha.startswith("2009-01-03T18:15:05"))
+
+    def test_cabecera_faltante_o_distinta(self):
+        """A missing header leaves the proof unverified; a different root invalidates it"""
+        ruta = self.guardar("genesis.ots", prueba_genesis(altura=5))
+        otra = GENESIS[:36] + b"\x00" * 32 + GENESIS[68:]
+
+        self.assertEqual(ots.verificar_ots(ruta, {0: GENESIS}).estado, ots.SIN_CABECERA)
+        self.assertEqual(ots.verificar_ots(ruta, {5: otra}).estado, ots.INVALIDO)
+        self.assertEqual(ots.alturas_bitcoin([self.test_dir]), {5})
+
+    def test_pendiente_y_malformada(self):
+        """Calendar-only proofs are pending; unreadable ones are reported, not raised"""
+        pendiente = self.guardar("pendiente.ots", sellar(b"\x01" * 32))
+        mala = os.path.join(self.test_dir, "mala.ots")
+        Path(mala).write_bytes(b"no es una prueba")
+
+        self.assertEqual(ots.verificar_ots(pendiente, {}).estado, ots.PENDIENTE)
+        self.assertEqual(ots.verificar_ots(mala, {}).estado, ots.INVALIDO)
+
+    def test_digest_del_archivo_sellado(self):
+        """The stamped file, found next to its proof or in dir_archivos, must match the digest"""
+        dir_archivos = os.path.join(self.test_dir, "formatos")
+        os.makedirs(dir_archivos)
+        original = os.path.join(dir_archivos, "formato.pdf")
+        Path(original).write_bytes(b"contenido")
+        ruta = self.guardar("formato.pdf.ots", sellar(hashlib.sha256(b"contenido").digest()))
+
+        resultado, = ots.verificar_lote([ruta], {}, dir_archivos)
+        self.assertEqual(resultado.estado, ots.PENDIENTE)
+        Path(original).write_bytes(b"alterado")
+        resultado, = ots.verificar_lote([ruta], {}, dir_archivos)
+        self.assertEqual(resultado.estado, ots.INVALIDO)
+
+    def test_lote_en_procesos(self):
+        """A batch spread across processes should give the same results, in order"""
+        for i in range(3):
+            self.guardar(f"genesis_{i}.ots", prueba_genesis())
+            self.guardar(f"pendiente_{i}.ots", sellar(bytes([i]) * 32))
+        rutas = ots.rutas_ots([self.test_dir])
+
+        esperado = ots.verificar_lote(rutas, {0: GENESIS}, workers=1)
+        with mock.patch.object(ots, "UMBRAL_PARALELO", 2):
+            resultados = ots.verificar_lote(rutas, {0: GENESIS}, workers=2)
+
+        self.assertEqual(resultados, esperado)
+        self.assertEqual([r.estado for r in resultados], [ots.VERIFICADO] * 3 + [ots.PENDIENTE] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Unit Tests for catalog snapshots (coatlicue.downloads.snapshots)
+Tests immutable snapshot files and the O(n) diff between runs.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add src to path to import the library
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from coatlicue.downloads.snapshots import (
+    crear_snapshot, cargar_snapshot, diff_snapshots, listar_snapshots, ultimo_snapshot
+)
+
+
+def entrada(url, h, nombre=None):
+    return {"url": url, "nombre": nombre or url.rsplit("/", 1)[-1], "hash_sha256": h,
+            "tamaño": 10, "timestamp": "2026-01-14T00:00:00+00:00"}
+
+
+class TestSnapshots(unittest.TestCase):
+    """Snapshots are immutable and ordered chronologically"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_snapshot_es_inmutable(self):
+        """A snapshot file should be read-only and never overwritten"""
+        fecha = datetime(2026, 1, 14, tzinfo=timezone.utc)
+        ruta = crear_snapshot([entrada("https://gob.mx/a.pdf", "a" * 64)], self.test_dir, fecha)
+
+        self.assertEqual(os.stat(ruta).st_mode & 0o222, 0, "Snapshot debe ser de sólo lectura")
+        with self.assertRaises(FileExistsError):
+            crear_snapshot([entrada("https://gob.mx/b.pdf", "b" * 64)], self.test_dir, fecha)
+        self.assertEqual(cargar_snapshot(ruta)["num_entradas"], 1)
+
+    def test_hash_snapshot_independiente_del_orden(self):
+        """Entry order should not change the snapshot hash"""
+        a = entrada("https://gob.mx/a.pdf", "a" * 64)
+        b = entrada("https://gob.mx/b.pdf", "b" * 64)
+
+        r1 = crear_snapshot([a, b], self.test_dir, datetime(2026, 1, 1, tzinfo=timezone.utc))
+        r2 = crear_snapshot([b, a], self.test_dir, datetime(2026, 1, 2, tzinfo=timezone.utc))
+
+        self.assertEqual(cargar_snapshot(r1)["hash_snapshot"], cargar_snapshot(r2)["hash_snapshot"])
+        self.assertEqual(listar_snapshots(self.test_dir), [r1, r2])
+        self.assertEqual(ultimo_snapshot(self.test_dir), r2)
+
+
+class TestDiffSnapshots(unittest.TestCase):
+    """Diff reports added, removed and modified formats"""
+
+    def test_diff_completo(self):
+        """Every kind of change should be detected by URL"""
+        anterior = {"entradas": [
+            entrada("https://gob.mx/igual.pdf", "1" * 64),
+            entrada("https://gob.mx/cambia.pdf", "2" * 64),
+            entrada("https://gob.mx/se-va.pdf", "3" * 64),
+        ]}
+        nuevo = {"entradas": [
+            entrada("https://gob.mx/igual.pdf", "1" * 64),
+            entrada("https://gob.mx/cambia.pdf", "4" * 64),
+            entrada("https://gob.mx/nuevo.pdf", "5" * 64),
+        ]}
+
+        diff = diff_snapshots(anterior, nuevo)
+
+        self.assertEqual([e["nombre"] for e in diff["agregados"]], ["nuevo.pdf"])
+        self.assertEqual([e["nombre"] for e in diff["eliminados"]], ["se-va.pdf"])
+        self.assertEqual(diff["modificados"][0]["hash_anterior"], "2" * 64)
+        self.assertEqual(diff["modificados"][0]["hash_nuevo"], "4" * 64)
+        self.assertEqual(diff["sin_cambios"], 1)
+
+    def test_diff_sin_cambios(self):
+        """Identical snapshots should produce an empty diff"""
+        snapshot = {"entradas": [entrada("https://gob.mx/a.pdf", "a" * 64)]}
+
+        diff = diff_snapshots(snapshot, snapshot)
+
+        self.assertEqual(diff["agregados"] + diff["eliminados"] + diff["modificados"], [])
+        self.assertEqual(diff["sin_cambios"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)